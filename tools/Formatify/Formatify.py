@@ -18,17 +18,15 @@
 
 import wx
 import os
-from PyPDF2 import PdfReader, PdfWriter
-from pdf2image import convert_from_path
-from fpdf import FPDF
-import pypandoc
-import pdflatex
-from docx import Document
-import pandas as pd
-from openpyxl import load_workbook
-from PIL import Image
-import zipfile
-import shutil
+
+from formatify_core import conversions_from, convert_file, file_format
+
+# Nombres de los formatos en los botones y mensajes
+FORMAT_LABELS = {
+    "docx": "Word", "xlsx": "Excel", "pdf": "PDF", "jpeg": "Imagen", "png": "Imagen",
+    "csv": "CSV", "txt": "Texto", "html": "HTML"
+}
+TARGET_LABELS = dict(FORMAT_LABELS, jpeg="Imagen (JPEG)", png="Imagen (PNG)")
 
 class MainApp(wx.App):
     def OnInit(self):
@@ -74,25 +72,11 @@ class FileConverterFrame(wx.Frame):
         # Limpiamos los botones anteriores
         self.buttons_sizer.Clear(True)
 
-        # Identificamos el tipo de archivo y generamos los botones de conversión correspondientes
-        if filepath.endswith('.docx'):
-            self.add_conversion_button("Convertir Word a PDF", self.convert_docx_to_pdf)
-            self.add_conversion_button("Convertir Word a Texto", self.convert_docx_to_text)
-        elif filepath.endswith('.xlsx'):
-            self.add_conversion_button("Convertir Excel a PDF", self.convert_xlsx_to_pdf)
-            self.add_conversion_button("Convertir Excel a CSV", self.convert_xlsx_to_csv)
-        elif filepath.endswith('.pdf'):
-            self.add_conversion_button("Convertir PDF a Texto", self.convert_pdf_to_text)
-            self.add_conversion_button("Convertir PDF a Imagen (JPEG)", self.convert_pdf_to_jpeg)
-            self.add_conversion_button("Convertir PDF a Imagen (PNG)", self.convert_pdf_to_png)
-        elif filepath.endswith(('.jpeg', '.jpg', '.png')):
-            self.add_conversion_button("Convertir Imagen a PDF", self.convert_image_to_pdf)
-        elif filepath.endswith('.csv'):
-            self.add_conversion_button("Convertir CSV a Excel", self.convert_csv_to_xlsx)
-        elif filepath.endswith('.txt'):
-            self.add_conversion_button("Convertir Texto a PDF", self.convert_text_to_pdf)
-        elif filepath.endswith('.html'):
-            self.add_conversion_button("Convertir HTML a PDF", self.convert_html_to_pdf)
+        # Un botón por cada conversión registrada para el tipo de archivo
+        source = file_format(filepath)
+        for conversion in conversions_from(source):
+            label = f"Convertir {FORMAT_LABELS.get(source, source.upper())} a {TARGET_LABELS[conversion.target]}"
+            self.add_conversion_button(label, lambda event, target=conversion.target: self.convert_selected(target))
 
         # Actualizamos la interfaz para mostrar los nuevos botones
         self.panel.Layout()
@@ -102,163 +86,22 @@ class FileConverterFrame(wx.Frame):
         button.Bind(wx.EVT_BUTTON, handler)
         self.buttons_sizer.Add(button, 0, wx.ALL, 5)
 
-    def convert_docx_to_pdf(self, event):
-        if not self.selected_file_path:
-            return
-        output_path = os.path.splitext(self.selected_file_path)[0] + ".pdf"
-        
-        # Leer contenido de .docx y escribirlo en un PDF
-        doc = Document(self.selected_file_path)
-        pdf = FPDF()
-        pdf.set_auto_page_break(auto=True, margin=10)
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        
-        for para in doc.paragraphs:
-            pdf.multi_cell(0, 10, para.text)
-        
-        pdf.output(output_path)
-        wx.MessageBox(f"Conversión DOCX a PDF completa. Archivo guardado en {output_path}.", "Conversión Exitosa", wx.OK | wx.ICON_INFORMATION)
-
-    def convert_docx_to_text(self, event):
+    def convert_selected(self, target):
         if not self.selected_file_path:
             return
-        output_path = os.path.splitext(self.selected_file_path)[0] + ".txt"
-        
-        # Leer el archivo DOCX y guardar el texto en un archivo TXT
-        doc = Document(self.selected_file_path)
-        with open(output_path, "w") as text_file:
-            for para in doc.paragraphs:
-                text_file.write(para.text + "\n")
-                
-        
-        wx.MessageBox(f"Conversión DOCX a Texto completa. Archivo guardado en {output_path}.", "Conversión Exitosa", wx.OK | wx.ICON_INFORMATION)
-
-
-    def convert_xlsx_to_pdf(self, event):
-        if not self.selected_file_path:
-            return
-        output_path = os.path.splitext(self.selected_file_path)[0] + ".pdf"
-        
-        # Leer contenido de .xlsx y escribirlo en un PDF
-        wb = load_workbook(self.selected_file_path)
-        sheet = wb.active
-        pdf = FPDF()
-        pdf.set_auto_page_break(auto=True, margin=10)
-        pdf.add_page()
-        pdf.set_font("Arial", size=10)
-        
-        for row in sheet.iter_rows(values_only=True):
-            row_data = "  ".join([str(cell) for cell in row if cell is not None])
-            pdf.cell(0, 10, row_data, ln=True)
-        
-        pdf.output(output_path)
-        wx.MessageBox(f"Conversión XLSX a PDF completa. Archivo guardado en {output_path}.", "Conversión Exitosa", wx.OK | wx.ICON_INFORMATION)
-
-    def convert_xlsx_to_csv(self, event):
-        if not self.selected_file_path:
-            return
-        output_path = os.path.splitext(self.selected_file_path)[0] + ".csv"
-        
-        # Convertir el contenido de .xlsx a .csv
-        df = pd.read_excel(self.selected_file_path)
-        df.to_csv(output_path, index=False)
-        
-        wx.MessageBox(f"Conversión XLSX a CSV completa. Archivo guardado en {output_path}.", "Conversión Exitosa", wx.OK | wx.ICON_INFORMATION)
-
-    def convert_pdf_to_text(self, event):
-        if not self.selected_file_path:
-            return
-        output_path = os.path.splitext(self.selected_file_path)[0] + ".txt"
-        
-        # Extraer texto de PDF y guardarlo en un archivo de texto
-        with open(self.selected_file_path, 'rb') as file:
-            pdf = PdfReader(file)
-            with open(output_path, 'w') as text_file:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        text_file.write(text + "\n")
-        
-        wx.MessageBox(f"Conversión PDF a Texto completa. Archivo guardado en {output_path}.", "Conversión Exitosa", wx.OK | wx.ICON_INFORMATION)
-
-    def convert_pdf_to_jpeg(self, event):
-        if not self.selected_file_path:
-            return
-        output_dir = os.path.splitext(self.selected_file_path)[0] + "_images"
-        os.makedirs(output_dir, exist_ok=True)
-
-        # Convertir PDF a imágenes JPEG
-        pages = convert_from_path(self.selected_file_path, dpi=200)
-        for i, page in enumerate(pages):
-            page.save(os.path.join(output_dir, f"page_{i + 1}.jpeg"), "JPEG")
-
-        wx.MessageBox(f"Conversión PDF a JPEG completa. Imágenes guardadas en {output_dir}.", "Conversión Exitosa", wx.OK | wx.ICON_INFORMATION)
-    
-    def convert_pdf_to_png(self, event):
-        if not self.selected_file_path:
-            return
-        output_dir = os.path.splitext(self.selected_file_path)[0] + "_images"
-        os.makedirs(output_dir, exist_ok=True)
-
-        # Convertir PDF a imágenes PNG
-        pages = convert_from_path(self.selected_file_path, dpi=200)
-        for i, page in enumerate(pages):
-            page.save(os.path.join(output_dir, f"page_{i + 1}.png"), "PNG")
-
-        wx.MessageBox(f"Conversión PDF a PNG completa. Imágenes guardadas en {output_dir}.", "Conversión Exitosa", wx.OK | wx.ICON_INFORMATION)
-
-
-    def convert_image_to_pdf(self, event):
-        if not self.selected_file_path:
-            return
-        output_path = os.path.splitext(self.selected_file_path)[0] + ".pdf"
-        
-        image = Image.open(self.selected_file_path)
-        pdf_image = image.convert("RGB")
-        pdf_image.save(output_path)
-
-        wx.MessageBox(f"Conversión Imagen a PDF completa. Archivo guardado en {output_path}.", "Conversión Exitosa", wx.OK | wx.ICON_INFORMATION)
-
-    def convert_csv_to_xlsx(self, event):
-        if not self.selected_file_path:
-            return
-        output_path = os.path.splitext(self.selected_file_path)[0] + ".xlsx"
-        
-        # Leer CSV y guardar en un archivo Excel
-        df = pd.read_csv(self.selected_file_path)
-        df.to_excel(output_path, index=False)
-
-        wx.MessageBox(f"Conversión CSV a Excel completa. Archivo guardado en {output_path}.", "Conversión Exitosa", wx.OK | wx.ICON_INFORMATION)
-
-    def convert_text_to_pdf(self, event):
-        if not self.selected_file_path:
-            return
-        output_path = os.path.splitext(self.selected_file_path)[0] + ".pdf"
-        
-        # Leer contenido de archivo de texto y escribir en PDF
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        
-        with open(self.selected_file_path, 'r') as file:
-            for line in file:
-                pdf.cell(0, 10, line.strip(), ln=True)
-        
-        pdf.output(output_path)
-        wx.MessageBox(f"Conversión Texto a PDF completa. Archivo guardado en {output_path}.", "Conversión Exitosa", wx.OK | wx.ICON_INFORMATION)
-
-    def convert_html_to_pdf(self, event):
-        if not self.selected_file_path:
-            return
-        output_path = os.path.splitext(self.selected_file_path)[0] + ".pdf"
-
+        source = file_format(self.selected_file_path).upper()
         try:
-            # Convertir HTML a PDF usando pypandoc
-            pypandoc.convert_file(self.selected_file_path, 'pdf', outputfile=output_path)
-            wx.MessageBox(f"Conversión HTML a PDF completa. Archivo guardado en {output_path}.", "Conversión Exitosa", wx.OK | wx.ICON_INFORMATION)
+            output_path, _ = convert_file(self.selected_file_path, target)
         except Exception as e:
-            wx.MessageBox(f"Error al convertir HTML a PDF: {str(e)}", "Error", wx.OK | wx.ICON_ERROR)
+            wx.MessageBox(f"Error al convertir {source} a {target.upper()}: {str(e)}", "Error", wx.OK | wx.ICON_ERROR)
+            return
+        if isinstance(output_path, list):
+            saved, output_path = "Archivos guardados en", ", ".join(output_path)
+        elif os.path.isdir(output_path):
+            saved = "Imágenes guardadas en"
+        else:
+            saved = "Archivo guardado en"
+        wx.MessageBox(f"Conversión {source} a {target.upper()} completa. {saved} {output_path}.", "Conversión Exitosa", wx.OK | wx.ICON_INFORMATION)
 
 
 
@@ -0,0 +1,155 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+# Compara el rasterizado de PDF a imágenes de Formatify con el método
+# anterior, que cargaba todas las páginas en una lista de imágenes PIL con
+# convert_from_path antes de guardarlas. Cada modo se ejecuta en un proceso
+# nuevo y se mide el tiempo, las páginas/s y la memoria máxima (RSS) del
+# proceso de Python y del mayor pdftoppm. Necesita pdf2image y poppler.
+#
+# Uso:
+#   python benchmarks/bench_pdf_images.py [-p PÁGINAS] [--dpi 200] [--format jpeg] [-j PROCESOS] [-o resultados.json]
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+FORMATIFY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("lista", "streaming", "paralelo")
+
+
+def make_pdf(path, pages):
+    # Páginas A4 con texto y figuras, para que pdftoppm tenga algo que dibujar
+    from PyPDF2 import PageObject, PdfWriter
+    from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica")
+    })
+    for number in range(1, pages + 1):
+        page = PageObject.create_blank_page(width=595, height=842)
+        content = [f"BT /F1 28 Tf 72 760 Td (Pagina {number}) Tj ET".encode()]
+        for row in range(40):
+            gray = (row * 7 + number) % 10 / 10
+            content.append(f"{gray} g 72 {100 + row * 15} {451 - row * 5} 10 re f".encode())
+        stream = DecodedStreamObject()
+        stream.set_data(b"\n".join(content))
+        page[NameObject("/Resources")] = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        writer.add_page(page)
+    with open(path, "wb") as file:
+        writer.write(file)
+
+
+def peak_rss_mb():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def children_rss_mb():
+    import resource
+
+    # ru_maxrss de RUSAGE_CHILDREN es el del mayor proceso hijo terminado
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+
+def run_mode(mode, pdf_path, output_dir, options, workers, queue):
+    sys.path.insert(0, FORMATIFY_DIR)
+    from pdf2image import convert_from_path
+    from formatify_core import render_pdf_pages
+
+    started = time.perf_counter()
+    if mode == "lista":
+        pages = convert_from_path(pdf_path, dpi=options["dpi"], grayscale=options["grayscale"])
+        for i, page in enumerate(pages):
+            page.save(os.path.join(output_dir, f"page_{i + 1}.{options['format']}"), options["format"].upper(), quality=options["quality"])
+        count = len(pages)
+    else:
+        count = render_pdf_pages(pdf_path, output_dir, options["format"], dpi=options["dpi"], grayscale=options["grayscale"],
+                                 quality=options["quality"], workers=1 if mode == "streaming" else workers)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    queue.put({
+        "pages": count,
+        "seconds": round(elapsed, 3),
+        "pages_per_s": round(count / elapsed, 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "pdftoppm_rss_mb": children_rss_mb(),
+    })
+
+
+def measure(mode, pdf_path, output_dir, options, workers):
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_mode, args=(mode, pdf_path, output_dir, options, workers, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rasterizado de PDF a imágenes: lista en memoria frente a streaming")
+    parser.add_argument("-p", "--pages", type=int, default=100, help="Páginas del PDF de prueba")
+    parser.add_argument("--pdf", default=None, help="Usar este PDF en lugar de generar uno")
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--format", choices=["jpeg", "png"], default="jpeg")
+    parser.add_argument("--quality", type=int, default=75)
+    parser.add_argument("--grayscale", action="store_true")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1, help="Procesos pdftoppm del modo paralelo")
+    parser.add_argument("--modes", default=",".join(MODES), help="Modos a medir, separados por comas")
+    parser.add_argument("-o", "--output", default=None, help="Guardar los resultados en este archivo JSON")
+    args = parser.parse_args()
+    options = {"dpi": args.dpi, "format": args.format, "quality": args.quality, "grayscale": args.grayscale}
+
+    work_dir = tempfile.mkdtemp(prefix="formatify_bench_")
+    try:
+        pdf_path = args.pdf
+        if pdf_path is None:
+            pdf_path = os.path.join(work_dir, "prueba.pdf")
+            make_pdf(pdf_path, args.pages)
+        results = {}
+        print(f"{'modo':10s} {'páginas':>7s} {'segundos':>9s} {'pág/s':>8s} {'RSS MB':>8s} {'pdftoppm MB':>12s}")
+        for mode in args.modes.split(","):
+            result = results[mode] = measure(mode, pdf_path, os.path.join(work_dir, mode), options, args.workers)
+            print(f"{mode:10s} {result['pages']:7d} {result['seconds']:9.2f} {result['pages_per_s']:8.1f} "
+                  f"{result['peak_rss_mb']:8.1f} {result['pdftoppm_rss_mb']:12.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"config": dict(options, pages=args.pages, workers=args.workers), "results": results}, file, indent=2)
+        print(f"Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
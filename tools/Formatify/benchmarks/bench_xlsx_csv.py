@@ -0,0 +1,159 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+# Compara la conversión de XLSX a CSV de Formatify, que recorre la hoja fila a
+# fila con openpyxl en modo de solo lectura, con la anterior basada en
+# pd.read_excel + to_csv. Cada modo se ejecuta en un proceso nuevo y se mide
+# el tiempo, las filas/s, los MB/s del XLSX y la memoria máxima (RSS).
+#
+# Uso:
+#   python benchmarks/bench_xlsx_csv.py [-r FILAS [FILAS ...]] [--xlsx libro.xlsx] [-o resultados.json]
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+FORMATIFY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("pandas", "streaming")
+
+
+def make_xlsx(path, rows, seed=0):
+    # Libro con columnas de tipos mezclados, escrito en modo write_only para
+    # que generar millones de filas no necesite memoria
+    from openpyxl import Workbook
+
+    rng = random.Random(seed)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Movimientos")
+    sheet.append(["id", "fecha", "cuenta", "concepto", "importe", "conciliado"])
+    start = datetime.datetime(2020, 1, 1)
+    for row in range(rows):
+        sheet.append([
+            row + 1,
+            start + datetime.timedelta(minutes=rng.randrange(2_000_000)),
+            f"ES{rng.randrange(10**10):010d}",
+            rng.choice(("Nómina", "Transferencia", "Recibo luz", "Compra material", "Devolución")),
+            round(rng.uniform(-5000, 5000), 2),
+            rng.random() < 0.5,
+        ])
+    workbook.save(path)
+
+
+def peak_rss_mb():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def run_mode(mode, xlsx_path, csv_path, rows, queue):
+    sys.path.insert(0, FORMATIFY_DIR)
+    try:
+        if mode == "pandas":
+            import pandas as pd
+
+            convert = lambda: pd.read_excel(xlsx_path).to_csv(csv_path, index=False)
+        else:
+            from formatify_core import convert_xlsx_to_csv
+
+            convert = lambda: convert_xlsx_to_csv(xlsx_path, csv_path)
+    except ImportError as e:
+        queue.put({"error": str(e)})
+        return
+    started = time.perf_counter()
+    try:
+        convert()
+    except Exception as e:
+        # El proceso padre espera un resultado en la cola
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+        return
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    megabytes = os.path.getsize(xlsx_path) / (1024 * 1024)
+    queue.put({
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_s": round(rows / elapsed, 1),
+        "mb_per_s": round(megabytes / elapsed, 2),
+        "peak_rss_mb": peak_rss_mb(),
+    })
+
+
+def measure(mode, xlsx_path, csv_path, rows):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_mode, args=(mode, xlsx_path, csv_path, rows, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="XLSX a CSV: pandas frente a streaming con openpyxl")
+    parser.add_argument("-r", "--rows", type=int, nargs="+", default=[10_000, 100_000], help="Filas de cada libro de prueba")
+    parser.add_argument("--xlsx", default=None, help="Usar este libro en lugar de generar uno")
+    parser.add_argument("--modes", default=",".join(MODES), help="Modos a medir, separados por comas")
+    parser.add_argument("-o", "--output", default=None, help="Guardar los resultados en este archivo JSON")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="formatify_bench_")
+    results = {}
+    try:
+        if args.xlsx:
+            from openpyxl import load_workbook
+
+            workbook = load_workbook(args.xlsx, read_only=True)
+            books = [(args.xlsx, workbook.worksheets[0].max_row or 0)]
+            workbook.close()
+        else:
+            books = []
+            for rows in args.rows:
+                xlsx_path = os.path.join(work_dir, f"libro_{rows}.xlsx")
+                make_xlsx(xlsx_path, rows)
+                books.append((xlsx_path, rows))
+
+        print(f"{'modo':10s} {'filas':>9s} {'segundos':>9s} {'filas/s':>10s} {'MB/s':>7s} {'RSS MB':>8s}")
+        for xlsx_path, rows in books:
+            for mode in args.modes.split(","):
+                result = measure(mode, xlsx_path, os.path.join(work_dir, f"{mode}.csv"), rows)
+                if "error" in result:
+                    print(f"{mode:10s} {rows:9d}  no disponible: {result['error']}")
+                    continue
+                results.setdefault(str(rows), {})[mode] = result
+                print(f"{mode:10s} {rows:9d} {result['seconds']:9.2f} {result['rows_per_s']:10.0f} "
+                      f"{result['mb_per_s']:7.2f} {result['peak_rss_mb']:8.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"results": results}, file, indent=2)
+        print(f"Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
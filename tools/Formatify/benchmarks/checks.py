@@ -0,0 +1,153 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+# Comprobaciones de regresión de errores ya corregidos. Cada comprobación
+# genera sus archivos en un directorio temporal; se ejecutan todas y el
+# proceso termina con código 1 si alguna falla.
+#
+# Uso:
+#   python benchmarks/checks.py
+
+import os
+import re
+import shutil
+import sys
+import tempfile
+import traceback
+import zipfile
+
+FORMATIFY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FORMATIFY_DIR)
+
+
+def xlsx_with_dimension(path, dimension, rows):
+    # Libro de una hoja cuyo <dimension ref> se sustituye por dimension (o se
+    # quita con None), como lo escriben algunos programas
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    original = path + ".orig"
+    workbook.save(original)
+    replacement = b"" if dimension is None else b'<dimension ref="' + dimension.encode() + b'"/>'
+    with zipfile.ZipFile(original) as source, zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            data = source.read(info)
+            if info.filename == "xl/worksheets/sheet1.xml":
+                data = re.sub(rb'<dimension ref="[^"]*"/>', replacement, data)
+            target.writestr(info, data)
+    os.remove(original)
+
+
+def check_xlsx_dimension(directory):
+    # El CSV tiene todas las celdas y todas las filas el mismo ancho aunque la
+    # dimensión declarada sea A1, falte o sea más estrecha que la hoja
+    from formatify_core import convert_xlsx_to_csv
+
+    rows = [["a", "b", "c"], [None, "x,y"], [], [None, "z"]]
+    expected = ["a,b,c", ',"x,y",', ",,", ",z,"]
+    cases = [(dimension, rows, expected) for dimension in ("A1", None, "A1:B4", "A1:C4")]
+    # Primera fila más estrecha que las siguientes y sin dimensión
+    cases.append((None, [["Informe"], ["a", "b"]], ["Informe,", "a,b"]))
+    for dimension, rows, expected in cases:
+        xlsx_path = os.path.join(directory, "libro.xlsx")
+        csv_path = os.path.join(directory, "libro.csv")
+        xlsx_with_dimension(xlsx_path, dimension, rows)
+        convert_xlsx_to_csv(xlsx_path, csv_path)
+        with open(csv_path, encoding="utf-8", newline="") as file:
+            lines = file.read().splitlines()
+        assert lines == expected, f"dimensión {dimension}: {lines}"
+
+
+def check_routes(directory):
+    # Solo se encadena a través de formatos que conservan los datos
+    from formatify_core import ConversionError, find_route
+
+    assert [conversion.target for conversion in find_route("csv", "pdf")] == ["xlsx", "pdf"]
+    for source, target in (("jpeg", "txt"), ("png", "jpeg"), ("csv", "txt"), ("html", "txt")):
+        try:
+            route = find_route(source, target)
+        except ConversionError:
+            continue
+        raise AssertionError(f"{source} -> {target}: {route}")
+
+
+def check_missing_input(directory):
+    # Una ruta o un patrón sin archivos cuenta como error
+    from formatify_engine import main
+
+    missing = os.path.join(directory, "no_existe.pdf")
+    assert main(["convert", missing, os.path.join(directory, "*.csv"), "-t", "txt", "-j", "1", "-q"]) == 1
+
+
+def check_pdf_page_range(directory):
+    # Un rango de páginas fuera del documento es un error y no deja carpeta;
+    # necesita poppler (pdftoppm y pdfinfo)
+    if shutil.which("pdftoppm") is None or shutil.which("pdfinfo") is None:
+        print("  (sin poppler: se omite check_pdf_page_range)")
+        return
+    from PyPDF2 import PdfWriter
+    from formatify_core import ConversionError, convert_pdf_to_images
+
+    source = os.path.join(directory, "corto.pdf")
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(width=200, height=200)
+    with open(source, "wb") as file:
+        writer.write(file)
+    output_dir = os.path.join(directory, "corto_images")
+    try:
+        convert_pdf_to_images(source, output_dir, "png", first_page=5, last_page=8)
+    except ConversionError:
+        pass
+    else:
+        raise AssertionError("el rango 5-8 de un PDF de 3 páginas no dio error")
+    assert not os.path.exists(output_dir)
+    assert convert_pdf_to_images(source, output_dir, "png", first_page=2, last_page=9) == 2
+    assert sorted(os.listdir(output_dir)) == ["page_2.png", "page_3.png"]
+
+
+CHECKS = [
+    check_xlsx_dimension,
+    check_routes,
+    check_missing_input,
+    check_pdf_page_range,
+]
+
+
+def main():
+    failures = 0
+    for check in CHECKS:
+        directory = tempfile.mkdtemp(prefix="formatify_check_")
+        try:
+            check(directory)
+            print(f"OK     {check.__name__}")
+        except Exception:
+            failures += 1
+            print(f"FALLO  {check.__name__}")
+            traceback.print_exc()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
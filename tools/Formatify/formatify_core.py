@@ -0,0 +1,502 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+# Conversiones de Formatify sin interfaz gráfica. Cada conversión se registra
+# por su par (formato de origen, formato de destino) y recibe la entrada y la
+# salida como ruta o como archivo binario abierto, de modo que las
+# conversiones encadenadas (CSV -> XLSX -> PDF) pasan de un paso al siguiente
+# en memoria sin escribir archivos intermedios. Las bibliotecas se importan
+# la primera vez que se usan, así que cada proceso del motor por lotes solo
+# carga las de los formatos que convierte.
+
+import csv
+import datetime
+import importlib.util
+import io
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, partial
+
+EXTENSION_ALIASES = {"jpg": "jpeg", "htm": "html", "text": "txt"}
+
+# Rasterizado de PDF: resolución, calidad JPEG (la de Pillow por defecto) y
+# páginas por cada llamada a pdftoppm
+DPI = 200
+JPEG_QUALITY = 75
+CHUNK_PAGES = 8
+RENDER_OPTIONS = ("dpi", "grayscale", "quality", "first_page", "last_page", "workers")
+CSV_OPTIONS = ("sheet", "delimiter", "encoding", "date_format", "float_format")
+ALL_SHEETS = "*"
+# Formatos que pueden ser un paso intermedio de una ruta: los que conservan
+# los datos del anterior para el siguiente (CSV -> XLSX -> PDF). Un PDF, un
+# TXT o una imagen intermedios producen rutas sin sentido, como JPEG -> PDF
+# -> TXT, que da un texto vacío, o PNG -> PDF -> JPEG.
+CHAIN_FORMATS = {"xlsx"}
+UNSAFE_FILENAME_RE = re.compile(r'[\\/:*?"<>|]+')
+
+
+class ConversionError(ValueError):
+    pass
+
+
+class Conversion:
+    def __init__(self, source, target, convert, modules=(), folder=False, options=()):
+        # folder: la conversión escribe varios archivos (una imagen por
+        # página) en una carpeta, así que solo puede ser el último paso.
+        # options: opciones de convert_file que acepta la conversión.
+        self.source = source
+        self.target = target
+        self.convert = convert
+        self.modules = tuple(modules)
+        self.folder = folder
+        self.options = tuple(options)
+
+    def missing_modules(self):
+        # find_spec comprueba si la biblioteca está instalada sin importarla
+        return [module for module in self.modules if importlib.util.find_spec(module) is None]
+
+    def available(self):
+        return not self.missing_modules()
+
+    def __repr__(self):
+        return f"Conversion({self.source!r}, {self.target!r})"
+
+
+CONVERSIONS = {}
+
+
+def register_conversion(source, target, modules=(), folder=False, options=()):
+    def register(convert):
+        CONVERSIONS[(source, target)] = Conversion(source, target, convert, modules, folder, options)
+        return convert
+    return register
+
+
+def file_format(filepath):
+    extension = os.path.splitext(filepath)[1][1:].lower()
+    return EXTENSION_ALIASES.get(extension, extension)
+
+
+def conversions_from(source):
+    return [conversion for (origin, _), conversion in CONVERSIONS.items() if origin == source]
+
+
+@lru_cache(maxsize=None)
+def find_route(source, target):
+    # Camino más corto de conversiones entre dos formatos (búsqueda en
+    # anchura sobre el grafo de CONVERSIONS, pasando solo por CHAIN_FORMATS).
+    # Devuelve la lista de pasos.
+    if source == target:
+        raise ConversionError(f"El archivo ya está en formato {target.upper()}")
+    if (source, target) in CONVERSIONS:
+        return (CONVERSIONS[(source, target)],)
+    routes = deque([(source, ())])
+    visited = {source}
+    while routes:
+        current, route = routes.popleft()
+        for conversion in conversions_from(current):
+            if conversion.target == target:
+                return route + (conversion,)
+            if conversion.folder or conversion.target not in CHAIN_FORMATS or conversion.target in visited:
+                continue
+            visited.add(conversion.target)
+            routes.append((conversion.target, route + (conversion,)))
+    raise ConversionError(f"No hay ninguna conversión de {source.upper()} a {target.upper()}")
+
+
+def all_routes():
+    formats = sorted({conversion.source for conversion in CONVERSIONS.values()})
+    targets = sorted({conversion.target for conversion in CONVERSIONS.values()})
+    for source in formats:
+        for target in targets:
+            if source == target:
+                continue
+            try:
+                yield source, target, find_route(source, target)
+            except ConversionError:
+                pass
+
+
+def output_path(filepath, target, output_dir=None):
+    base = os.path.splitext(filepath)[0]
+    if output_dir is not None:
+        base = os.path.join(output_dir, os.path.basename(base))
+    if find_route(file_format(filepath), target)[-1].folder:
+        return base + "_images"
+    return f"{base}.{target}"
+
+
+def convert_file(filepath, target, output=None, options=None):
+    # Devuelve (ruta de salida, [(paso, segundos), ...]). options (dpi,
+    # grayscale...) se pasan a los pasos que las declaran. Si el último paso
+    # escribe varios archivos (un CSV por hoja) la salida es su lista.
+    route = find_route(file_format(filepath), target)
+    for conversion in route:
+        missing = conversion.missing_modules()
+        if missing:
+            raise ConversionError(f"Falta la biblioteca para convertir {conversion.source.upper()} a {conversion.target.upper()}: {', '.join(missing)}")
+    output = output or output_path(filepath, target)
+    steps = []
+    source = filepath
+    for index, conversion in enumerate(route):
+        started = time.perf_counter()
+        step_options = {name: value for name, value in (options or {}).items() if name in conversion.options and value is not None}
+        if index == len(route) - 1:
+            output = conversion.convert(source, output, **step_options) or output
+        else:
+            buffer = io.BytesIO()
+            conversion.convert(source, buffer, **step_options)
+            buffer.seek(0)
+            source = buffer
+        steps.append((f"{conversion.source}->{conversion.target}", time.perf_counter() - started))
+    return output, steps
+
+
+@contextmanager
+def open_text(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "r", encoding="utf-8", errors="replace") as file:
+            yield file
+    else:
+        text = io.TextIOWrapper(source, encoding="utf-8", errors="replace")
+        try:
+            yield text
+        finally:
+            # Se devuelve el archivo binario sin cerrarlo
+            text.detach()
+
+
+def write_text(output, lines):
+    data = "".join(line + "\n" for line in lines).encode("utf-8")
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, "wb") as file:
+            file.write(data)
+    else:
+        output.write(data)
+
+
+def new_pdf(font_size):
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=10)
+    pdf.add_page()
+    pdf.set_font("Arial", size=font_size)
+    return pdf
+
+
+def save_pdf(pdf, output):
+    if isinstance(output, (str, os.PathLike)):
+        pdf.output(output)
+    else:
+        # Sin nombre de archivo fpdf2 devuelve el documento como bytearray
+        output.write(bytes(pdf.output()))
+
+
+@register_conversion("docx", "pdf", ("docx", "fpdf"))
+def convert_docx_to_pdf(source, output):
+    from docx import Document
+
+    pdf = new_pdf(12)
+    for para in Document(source).paragraphs:
+        pdf.multi_cell(0, 10, para.text)
+    save_pdf(pdf, output)
+
+
+@register_conversion("docx", "txt", ("docx",))
+def convert_docx_to_text(source, output):
+    from docx import Document
+
+    write_text(output, (para.text for para in Document(source).paragraphs))
+
+
+@register_conversion("xlsx", "pdf", ("openpyxl", "fpdf"))
+def convert_xlsx_to_pdf(source, output):
+    from openpyxl import load_workbook
+
+    sheet = load_workbook(source).active
+    pdf = new_pdf(10)
+    for row in sheet.iter_rows(values_only=True):
+        row_data = "  ".join([str(cell) for cell in row if cell is not None])
+        pdf.cell(0, 10, row_data, ln=True)
+    save_pdf(pdf, output)
+
+
+@contextmanager
+def open_text_output(output, encoding="utf-8"):
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, "w", encoding=encoding, newline="") as file:
+            yield file
+    else:
+        text = io.TextIOWrapper(output, encoding=encoding, newline="")
+        try:
+            yield text
+        finally:
+            text.flush()
+            text.detach()
+
+
+def cell_formatter(date_format=None, float_format=None):
+    # None si los valores se escriben tal cual: csv escribe None como campo
+    # vacío y str() del resto, igual que pandas con to_csv.
+    if date_format is None and float_format is None:
+        return None
+
+    def format_cell(value):
+        if date_format is not None and isinstance(value, (datetime.datetime, datetime.date)):
+            return value.strftime(date_format)
+        if float_format is not None and isinstance(value, float):
+            return float_format % value
+        return value
+
+    return format_cell
+
+
+class SheetTooWide(Exception):
+    pass
+
+
+def sheet_width(sheet):
+    return max((len(row) for row in sheet.iter_rows(values_only=True)), default=0)
+
+
+def padded_rows(sheet, width=None):
+    # Filas de exactamente width celdas, como las de to_csv de pandas. Sin
+    # width se toma el de la primera fila.
+    for row in sheet.iter_rows(values_only=True):
+        if width is None:
+            width = len(row)
+        elif len(row) > width:
+            raise SheetTooWide
+        yield tuple(row) + (None,) * (width - len(row))
+
+
+def write_rows(rows, output, delimiter, encoding, format_cell):
+    if format_cell is not None:
+        rows = ([format_cell(value) for value in row] for row in rows)
+    with open_text_output(output, encoding) as file:
+        # Mismo fin de línea que to_csv de pandas
+        csv.writer(file, delimiter=delimiter, lineterminator=os.linesep).writerows(rows)
+
+
+def write_sheet_csv(sheet, output, delimiter=",", encoding="utf-8", format_cell=None):
+    # En solo lectura openpyxl se fía de <dimension ref> y corta las celdas
+    # que quedan fuera; algunos programas escriben ref="A1" o no lo escriben
+    # (openpyxl en modo write_only tampoco). Se lee la hoja entera y se
+    # rellenan las filas hasta el ancho declarado o, sin él, el de la primera
+    # fila. Si una fila resulta más ancha, se mide el ancho real con una
+    # pasada por la hoja y se vuelve a escribir el CSV.
+    width = sheet.max_column if (sheet.max_column or 0) > 1 else None
+    sheet.reset_dimensions()
+    start = None if isinstance(output, (str, os.PathLike)) else output.tell()
+    try:
+        write_rows(padded_rows(sheet, width), output, delimiter, encoding, format_cell)
+    except SheetTooWide:
+        if start is not None:
+            output.seek(start)
+            output.truncate()
+        write_rows(padded_rows(sheet, sheet_width(sheet)), output, delimiter, encoding, format_cell)
+
+
+def select_sheets(workbook, sheet):
+    # sheet: nombre de la hoja, su número (desde 1) o ALL_SHEETS. Por
+    # defecto la primera, como pd.read_excel.
+    if sheet is None:
+        return workbook.worksheets[:1]
+    if sheet == ALL_SHEETS:
+        return workbook.worksheets
+    if sheet in workbook.sheetnames:
+        return [workbook[sheet]]
+    if str(sheet).isdigit() and 1 <= int(sheet) <= len(workbook.worksheets):
+        return [workbook.worksheets[int(sheet) - 1]]
+    raise ConversionError(f"El libro no tiene la hoja {sheet}; hojas: {', '.join(workbook.sheetnames)}")
+
+
+@register_conversion("xlsx", "csv", ("openpyxl",), options=CSV_OPTIONS)
+def convert_xlsx_to_csv(source, output, sheet=None, delimiter=",", encoding="utf-8", date_format=None, float_format=None):
+    from openpyxl import load_workbook
+
+    # En modo de solo lectura openpyxl recorre el XML de la hoja fila a fila
+    # y cada fila se escribe en el CSV según se lee, así que la memoria no
+    # depende del número de filas.
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheets = select_sheets(workbook, sheet)
+        format_cell = cell_formatter(date_format, float_format)
+        if len(sheets) == 1:
+            write_sheet_csv(sheets[0], output, delimiter, encoding, format_cell)
+            return None
+        if not isinstance(output, (str, os.PathLike)):
+            raise ConversionError("Solo se puede convertir una hoja cuando el CSV es un paso intermedio")
+        # Un CSV por hoja: informe.csv -> informe_Hoja1.csv, informe_Hoja2.csv...
+        base, extension = os.path.splitext(output)
+        outputs = []
+        for worksheet in sheets:
+            sheet_path = f"{base}_{UNSAFE_FILENAME_RE.sub('_', worksheet.title)}{extension}"
+            write_sheet_csv(worksheet, sheet_path, delimiter, encoding, format_cell)
+            outputs.append(sheet_path)
+        return outputs
+    finally:
+        workbook.close()
+
+
+@register_conversion("pdf", "txt", ("PyPDF2",))
+def convert_pdf_to_text(source, output):
+    from PyPDF2 import PdfReader
+
+    pdf = PdfReader(source)
+    write_text(output, (text for text in (page.extract_text() for page in pdf.pages) if text))
+
+
+def render_chunk(pdf_path, output_dir, image_format, first_page, last_page, dpi, grayscale, quality):
+    # pdftoppm se llama directamente: convert_from_path de pdf2image vuelve
+    # a ejecutar pdfinfo y pdftoppm -v en cada tramo. Cada página se escribe
+    # en output_dir en cuanto se rasteriza y no se carga ninguna en memoria;
+    # después se renombran a page_N.
+    prefix = os.path.join(output_dir, f".pdftoppm_{first_page}")
+    command = ["pdftoppm", "-r", str(dpi), "-f", str(first_page), "-l", str(last_page)]
+    if image_format == "jpeg":
+        command += ["-jpeg", "-jpegopt", f"quality={quality}"]
+    else:
+        command.append("-png")
+    if grayscale:
+        command.append("-gray")
+    result = subprocess.run(command + [pdf_path, prefix], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise ConversionError(f"pdftoppm no pudo rasterizar las páginas {first_page}-{last_page}: "
+                              f"{result.stderr.decode(errors='replace').strip()}")
+    # pdftoppm añade el número de página con ceros delante: .pdftoppm_9-09.jpg
+    pages = 0
+    for name in os.listdir(output_dir):
+        if name.startswith(os.path.basename(prefix) + "-"):
+            page = int(os.path.splitext(name)[0].rsplit("-", 1)[1])
+            os.replace(os.path.join(output_dir, name), os.path.join(output_dir, f"page_{page}.{image_format}"))
+            pages += 1
+    return pages
+
+
+def page_chunks(first_page, last_page, size):
+    for start in range(first_page, last_page + 1, size):
+        yield start, min(start + size - 1, last_page)
+
+
+def render_pdf_pages(pdf_path, output_dir, image_format, dpi=DPI, grayscale=False, quality=JPEG_QUALITY,
+                     first_page=None, last_page=None, workers=None, chunk_pages=CHUNK_PAGES):
+    from pdf2image import pdfinfo_from_path
+
+    # pdfinfo se ejecuta una sola vez por PDF
+    pages = pdfinfo_from_path(pdf_path)["Pages"]
+    requested = f"{first_page or 1}-{last_page or pages}"
+    first_page = max(1, first_page or 1)
+    last_page = min(pages, last_page or pages)
+    if first_page > last_page:
+        raise ConversionError(f"El PDF tiene {pages} páginas; el rango {requested} no incluye ninguna")
+    if workers is None:
+        # Dentro de un proceso del motor por lotes ya hay un proceso por núcleo
+        workers = (os.cpu_count() or 1) if multiprocessing.parent_process() is None else 1
+    render = partial(render_chunk, pdf_path, output_dir, image_format, dpi=dpi, grayscale=grayscale, quality=quality)
+    chunks = page_chunks(first_page, last_page, chunk_pages)
+    if workers == 1:
+        return sum(render(start, end) for start, end in chunks)
+    # Cada tramo de páginas lo rasteriza un proceso pdftoppm distinto; los
+    # hilos solo esperan a que terminen.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(lambda chunk: render(*chunk), chunks))
+
+
+def convert_pdf_to_images(source, output_dir, image_format, **options):
+    created = not os.path.isdir(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    try:
+        if isinstance(source, (str, os.PathLike)):
+            return render_pdf_pages(source, output_dir, image_format, **options)
+        # pdftoppm lee el PDF de un archivo (una vez por tramo de páginas)
+        with tempfile.NamedTemporaryFile(suffix=".pdf", dir=output_dir, delete=False) as file:
+            shutil.copyfileobj(source, file)
+        try:
+            return render_pdf_pages(file.name, output_dir, image_format, **options)
+        finally:
+            os.remove(file.name)
+    except Exception:
+        # No se deja una carpeta vacía que parezca una conversión terminada
+        if created and not os.listdir(output_dir):
+            os.rmdir(output_dir)
+        raise
+
+
+@register_conversion("pdf", "jpeg", ("pdf2image",), folder=True, options=RENDER_OPTIONS)
+def convert_pdf_to_jpeg(source, output_dir, **options):
+    convert_pdf_to_images(source, output_dir, "jpeg", **options)
+
+
+@register_conversion("pdf", "png", ("pdf2image",), folder=True, options=RENDER_OPTIONS)
+def convert_pdf_to_png(source, output_dir, **options):
+    convert_pdf_to_images(source, output_dir, "png", **options)
+
+
+def convert_image_to_pdf(source, output):
+    from PIL import Image
+
+    with Image.open(source) as image:
+        image.convert("RGB").save(output, "PDF")
+
+
+register_conversion("jpeg", "pdf", ("PIL",))(convert_image_to_pdf)
+register_conversion("png", "pdf", ("PIL",))(convert_image_to_pdf)
+
+
+@register_conversion("csv", "xlsx", ("pandas", "openpyxl"))
+def convert_csv_to_xlsx(source, output):
+    import pandas as pd
+
+    pd.read_csv(source).to_excel(output, index=False)
+
+
+@register_conversion("txt", "pdf", ("fpdf",))
+def convert_text_to_pdf(source, output):
+    pdf = new_pdf(12)
+    with open_text(source) as file:
+        for line in file:
+            pdf.cell(0, 10, line.strip(), ln=True)
+    save_pdf(pdf, output)
+
+
+@register_conversion("html", "pdf", ("pypandoc",))
+def convert_html_to_pdf(source, output):
+    import pypandoc
+
+    # pandoc solo escribe PDF en un archivo; si la salida es un paso
+    # intermedio se genera en una carpeta temporal y se copia.
+    with tempfile.TemporaryDirectory() as directory:
+        output_file = output if isinstance(output, (str, os.PathLike)) else os.path.join(directory, "salida.pdf")
+        if isinstance(source, (str, os.PathLike)):
+            pypandoc.convert_file(source, "pdf", outputfile=output_file)
+        else:
+            pypandoc.convert_text(source.read().decode("utf-8", "replace"), "pdf", format="html", outputfile=output_file)
+        if output_file is not output:
+            with open(output_file, "rb") as file:
+                shutil.copyfileobj(file, output)
@@ -0,0 +1,223 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+# Motor por lotes de Formatify sin interfaz gráfica. Convierte los archivos
+# indicados (rutas, carpetas o patrones como "informes/**/*.csv") al formato
+# de destino repartiéndolos entre varios procesos, y muestra el tiempo de
+# cada conversión. Si no hay conversión directa se encadenan varias en
+# memoria (ver formatify_core.find_route).
+#
+# Uso:
+#   python formatify_engine.py convert <ruta|patrón> [...] -t pdf [-o carpeta] [-j N] [-q]
+#   python formatify_engine.py convert informe.pdf -t png --dpi 150 --pages 1-20 --grayscale
+#   python formatify_engine.py convert cuentas.xlsx -t csv --sheet "*" --delimiter ";" --date-format %d/%m/%Y
+#   python formatify_engine.py formats
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from formatify_core import CONVERSIONS, ConversionError, all_routes, convert_file, file_format, find_route, output_path
+
+
+def has_route(filepath, target):
+    try:
+        find_route(file_format(filepath), target)
+        return True
+    except ConversionError:
+        return False
+
+
+def iter_inputs(patterns, target):
+    # Los archivos indicados uno a uno se devuelven siempre (si no se pueden
+    # convertir o no existen, el error aparece en su resultado); de las
+    # carpetas y los patrones solo los que tienen conversión al formato de
+    # destino. Un patrón sin ningún archivo también se devuelve, para que
+    # cuente como error.
+    seen = set()
+    for pattern in patterns:
+        if os.path.isfile(pattern):
+            paths, explicit = [pattern], True
+        elif os.path.isdir(pattern):
+            paths = (os.path.join(root, name) for root, _, names in os.walk(pattern) for name in sorted(names))
+            explicit = False
+        else:
+            paths, explicit = sorted(glob.glob(pattern, recursive=True)), False
+            if not paths:
+                yield pattern
+                continue
+        for path in paths:
+            if path in seen or not os.path.isfile(path):
+                continue
+            if explicit or has_route(path, target):
+                seen.add(path)
+                yield path
+
+
+def convert_job(file_path, target, output_dir=None, options=None):
+    cpu_before = time.process_time()
+    started = time.perf_counter()
+    result = {"filename": file_path, "conversion": f"{file_format(file_path)}->{target}", "output": None, "steps": []}
+    try:
+        if not os.path.isfile(file_path):
+            raise ConversionError("no existe ningún archivo con ese nombre o patrón")
+        output = output_path(file_path, target, output_dir)
+        result["output"], result["steps"] = convert_file(file_path, target, output, options)
+        outputs = result["output"] if isinstance(result["output"], list) else [result["output"]]
+        result["message"] = f"Archivo: {file_path} -> {', '.join(outputs)}"
+    except Exception as e:
+        result["message"] = f"ERROR: {file_path}: {e}"
+    result["wall"] = time.perf_counter() - started
+    result["cpu"] = time.process_time() - cpu_before
+    return result
+
+
+def run_jobs(file_paths, target, output_dir=None, workers=None, options=None):
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for file_path in file_paths:
+            yield convert_job(file_path, target, output_dir, options)
+        return
+
+    max_pending = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        try:
+            for file_path in file_paths:
+                pending.add(executor.submit(convert_job, file_path, target, output_dir, options))
+                if len(pending) < max_pending:
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def parse_pages(text):
+    # "5" o "3-10"; los extremos vacíos ("-10", "3-") van hasta el principio o el final
+    first, _, last = text.partition("-")
+    try:
+        first = int(first) if first else None
+        last = int(last) if last else (first if "-" not in text else None)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"rango de páginas no válido: {text}")
+    return first, last
+
+
+def failed(result):
+    return result["message"].startswith("ERROR")
+
+
+class BatchStats:
+    def __init__(self):
+        self.files = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+        # conversión -> [archivos, segundos reales, segundos de CPU]
+        self.conversions = {}
+
+    def add(self, result):
+        self.files += 1
+        if failed(result):
+            self.errors += 1
+            return
+        totals = self.conversions.setdefault(result["conversion"], [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += result["wall"]
+        totals[2] += result["cpu"]
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        lines = [f"Convertidos {self.files - self.errors} de {self.files} archivos en {elapsed:.2f} s - "
+                 f"{self.files / elapsed:.1f} archivos/s, {self.errors} errores"]
+        for conversion, (files, wall, cpu) in sorted(self.conversions.items(), key=lambda item: -item[1][1]):
+            lines.append(f"  {conversion}: {files} archivos, {wall:.2f} s reales, {cpu:.2f} s CPU, {wall / files * 1000:.1f} ms por archivo")
+        return "\n".join(lines)
+
+
+def format_result(result):
+    lines = [result["message"]]
+    if not failed(result):
+        steps = ", ".join(f"{step} {seconds * 1000:.1f} ms" for step, seconds in result["steps"])
+        lines.append(f"  {result['wall'] * 1000:.1f} ms (CPU {result['cpu'] * 1000:.1f} ms): {steps}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="formatify_engine", description="Conversión de archivos por lotes.")
+    parser.add_argument("command", choices=["convert", "formats"], help="convert: convertir archivos, formats: listar las conversiones disponibles")
+    parser.add_argument("paths", nargs="*", help="Archivos, carpetas o patrones (admite **)")
+    parser.add_argument("-t", "--to", dest="target", default=None, help="Formato de destino (pdf, txt, csv, xlsx, jpeg, png)")
+    parser.add_argument("-o", "--output-dir", default=None, help="Carpeta de salida (por defecto, junto a cada archivo)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Número de procesos (por defecto, uno por núcleo)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Mostrar solo el resumen final")
+    parser.add_argument("--dpi", type=int, default=None, help="PDF a imagen: resolución (por defecto, 200)")
+    parser.add_argument("--grayscale", action="store_true", default=None, help="PDF a imagen: páginas en escala de grises")
+    parser.add_argument("--quality", type=int, default=None, help="PDF a JPEG: calidad de 1 a 100 (por defecto, 75)")
+    parser.add_argument("--pages", type=parse_pages, default=(None, None), help="PDF a imagen: páginas a convertir, por ejemplo 3-10")
+    parser.add_argument("--sheet", default=None, help="XLSX a CSV: hoja por nombre o número (desde 1), o * para un CSV por hoja (por defecto, la primera)")
+    parser.add_argument("--delimiter", default=None, help="XLSX a CSV: separador de campos (por defecto, coma; \\t para tabulador)")
+    parser.add_argument("--encoding", default=None, help="XLSX a CSV: codificación (por defecto, utf-8; utf-8-sig para Excel)")
+    parser.add_argument("--date-format", default=None, help="XLSX a CSV: formato strftime de las fechas, por ejemplo %%d/%%m/%%Y")
+    parser.add_argument("--float-format", default=None, help="XLSX a CSV: formato de los decimales, por ejemplo %%.2f")
+    parser.add_argument("--render-workers", type=int, default=None, help="PDF a imagen: procesos pdftoppm por PDF (por defecto, uno por núcleo con -j 1)")
+    args = parser.parse_intermixed_args(argv)
+
+    if args.command == "formats":
+        for source, target, route in all_routes():
+            steps = " -> ".join([route[0].source] + [conversion.target for conversion in route])
+            status = "disponible" if all(conversion.available() for conversion in route) else "no disponible (falta la biblioteca)"
+            print(f"{source} a {target}: {steps} - {status}")
+        return 0
+    if not args.paths:
+        parser.error("hay que indicar al menos un archivo, carpeta o patrón")
+    if not args.target:
+        parser.error("hay que indicar el formato de destino con --to")
+    target = args.target.lower().lstrip(".")
+    if not any(conversion.target == target for conversion in CONVERSIONS.values()):
+        parser.error(f"formato de destino desconocido: {args.target}")
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    options = {
+        "dpi": args.dpi, "grayscale": args.grayscale, "quality": args.quality,
+        "first_page": args.pages[0], "last_page": args.pages[1], "workers": args.render_workers,
+        "sheet": args.sheet, "delimiter": args.delimiter.replace("\\t", "\t") if args.delimiter else None,
+        "encoding": args.encoding, "date_format": args.date_format, "float_format": args.float_format
+    }
+    stats = BatchStats()
+    for result in run_jobs(iter_inputs(args.paths, target), target, args.output_dir, args.workers, options):
+        stats.add(result)
+        if not args.quiet or failed(result):
+            print(format_result(result), flush=True)
+    print(stats.summary())
+    return 1 if stats.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,21 +17,21 @@
 # along with this program. If not, see <https://www.gnu.org/licenses/>.
 
 import wx
-import os
-from PyPDF2 import PdfReader, PdfWriter
-from docx import Document
-from openpyxl import load_workbook
-from pptx import Presentation
-from PIL import Image
-import zipfile
-import shutil
+import multiprocessing
+import threading
+import time
 from datetime import datetime
-import xml.etree.ElementTree as ET
-from mutagen import File as MutagenFile
-from hachoir.parser import createParser
-from hachoir.metadata import extractMetadata
-from hachoir.stream import FileOutputStream
-from hachoir.editor import createEditor
+from thot_core import analyze_metadata, remove_metadata_file
+from thot_engine import run_jobs, run_deduplicated, analyze_files, analyze_job, clean_job, deep_clean_job, BatchStats
+from thot_dedup import DedupStats
+from thot_instrument import TimingReport
+from thot_cache import MetadataCache
+from thot_index import MetadataIndex
+from thot_report import REPORT_WILDCARD, open_report, read_report, report_extension
+from thot_walk import Walker, WalkOptions, parse_size, parse_since
+
+# Intervalo mínimo entre envíos de resultados a la interfaz durante un análisis
+BATCH_INTERVAL = 0.2
 
 
 class MainApp(wx.App):
@@ -54,21 +54,38 @@ class MetadataAnalyzerFrame(wx.Frame):
         dark_mode_item = appearance_menu.Append(wx.ID_ANY, "Oscuro", "Cambiar a tema oscuro")
 
         options_menu.AppendSubMenu(appearance_menu, "Apariencia")
+        clear_cache_item = options_menu.Append(wx.ID_ANY, "Vaciar caché", "Eliminar los resultados de análisis guardados")
+        report_item = options_menu.Append(wx.ID_ANY, "Guardar informes en...", "Escribir los resultados de las carpetas en un informe JSONL, CSV o Parquet")
+        import_report_item = options_menu.Append(wx.ID_ANY, "Importar informe...", "Cargar un informe anterior sin volver a analizar los archivos")
+        walk_item = options_menu.Append(wx.ID_ANY, "Filtros de carpetas...", "Elegir qué archivos se procesan al recorrer una carpeta")
+        self.timing_item = options_menu.AppendCheckItem(wx.ID_ANY, "Medir tiempos por formato", "Mostrar al terminar los tiempos por extensión y los archivos más lentos")
+        self.deep_item = options_menu.AppendCheckItem(wx.ID_ANY, "Limpieza profunda de Office", "Eliminar también autores de cambios y comentarios, revisiones, customXml y metadatos de las imágenes incrustadas")
+        self.dedup_item = options_menu.AppendCheckItem(wx.ID_ANY, "Procesar una vez los archivos idénticos", "Analizar o limpiar una sola copia de cada archivo repetido y reutilizar el resultado. Los archivos se procesan según aparecen; se leen los que tienen un tamaño repetido")
         self.menu_bar.Append(options_menu, "Opciones")
         self.SetMenuBar(self.menu_bar)
 
         # Bind eventos para cambiar tema
         self.Bind(wx.EVT_MENU, self.set_light_mode, light_mode_item)
         self.Bind(wx.EVT_MENU, self.set_dark_mode, dark_mode_item)
+        self.Bind(wx.EVT_MENU, self.on_clear_cache, clear_cache_item)
+        self.Bind(wx.EVT_MENU, self.on_choose_report, report_item)
+        self.Bind(wx.EVT_MENU, self.on_import_report, import_report_item)
+        self.Bind(wx.EVT_MENU, self.on_walk_options, walk_item)
+
+        self.scan_worker = None
+        self.report_path = None
+        self.walk_options = WalkOptions()
 
         self.init_ui()
         self.apply_theme(self.current_theme)
 
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+
 
     def init_ui(self):
         self.panel = wx.Panel(self)
         self.main_sizer = wx.BoxSizer(wx.VERTICAL)
-        self.directory_metadata = []
+        self.metadata_index = MetadataIndex()
 
         instructions = wx.StaticText(self.panel, label="Seleccione una acción para analizar o limpiar los metadatos de archivos.")
         instruction_font = wx.Font(12, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL)
@@ -80,25 +97,25 @@ class MetadataAnalyzerFrame(wx.Frame):
         button_font = wx.Font(11, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD)
         button_size = (250, 50)
         
-        select_file_btn = wx.Button(self.panel, label="📄 Seleccionar Archivo", size=button_size)
-        select_file_btn.SetFont(button_font)
-        select_file_btn.Bind(wx.EVT_BUTTON, self.on_select_file)
-        buttons_sizer.Add(select_file_btn, pos=(0, 0), flag=wx.EXPAND | wx.ALL, border=5)
+        self.select_file_btn = wx.Button(self.panel, label="📄 Seleccionar Archivo", size=button_size)
+        self.select_file_btn.SetFont(button_font)
+        self.select_file_btn.Bind(wx.EVT_BUTTON, self.on_select_file)
+        buttons_sizer.Add(self.select_file_btn, pos=(0, 0), flag=wx.EXPAND | wx.ALL, border=5)
         
-        remove_file_btn = wx.Button(self.panel, label="🗑️ Eliminar Metadatos (Archivo)", size=button_size)
-        remove_file_btn.SetFont(button_font)
-        remove_file_btn.Bind(wx.EVT_BUTTON, self.on_remove_metadata_file)
-        buttons_sizer.Add(remove_file_btn, pos=(1, 0), flag=wx.EXPAND | wx.ALL, border=5)
+        self.remove_file_btn = wx.Button(self.panel, label="🗑️ Eliminar Metadatos (Archivo)", size=button_size)
+        self.remove_file_btn.SetFont(button_font)
+        self.remove_file_btn.Bind(wx.EVT_BUTTON, self.on_remove_metadata_file)
+        buttons_sizer.Add(self.remove_file_btn, pos=(1, 0), flag=wx.EXPAND | wx.ALL, border=5)
         
-        select_directory_btn = wx.Button(self.panel, label="📂 Seleccionar Carpeta", size=button_size)
-        select_directory_btn.SetFont(button_font)
-        select_directory_btn.Bind(wx.EVT_BUTTON, self.on_select_directory)
-        buttons_sizer.Add(select_directory_btn, pos=(0, 1), flag=wx.EXPAND | wx.ALL, border=5)
+        self.select_directory_btn = wx.Button(self.panel, label="📂 Seleccionar Carpeta", size=button_size)
+        self.select_directory_btn.SetFont(button_font)
+        self.select_directory_btn.Bind(wx.EVT_BUTTON, self.on_select_directory)
+        buttons_sizer.Add(self.select_directory_btn, pos=(0, 1), flag=wx.EXPAND | wx.ALL, border=5)
         
-        remove_directory_btn = wx.Button(self.panel, label="🗑️📂 Eliminar Metadatos (Carpeta)", size=button_size)
-        remove_directory_btn.SetFont(button_font)
-        remove_directory_btn.Bind(wx.EVT_BUTTON, self.on_remove_metadata_directory)
-        buttons_sizer.Add(remove_directory_btn, pos=(1, 1), flag=wx.EXPAND | wx.ALL, border=5)
+        self.remove_directory_btn = wx.Button(self.panel, label="🗑️📂 Eliminar Metadatos (Carpeta)", size=button_size)
+        self.remove_directory_btn.SetFont(button_font)
+        self.remove_directory_btn.Bind(wx.EVT_BUTTON, self.on_remove_metadata_directory)
+        buttons_sizer.Add(self.remove_directory_btn, pos=(1, 1), flag=wx.EXPAND | wx.ALL, border=5)
         
         clear_results_btn = wx.Button(self.panel, label="🧹 Limpiar Resultados", size=button_size)
         clear_results_btn.SetFont(button_font)
@@ -113,6 +130,7 @@ class MetadataAnalyzerFrame(wx.Frame):
         search_sizer.Add(search_label, 0, wx.ALL | wx.CENTER, 5)
 
         self.search_text_ctrl = wx.TextCtrl(self.panel, size=(300, -1))
+        self.search_text_ctrl.SetHint("Texto libre o Autor=X AND Fecha de creación<2020-01-01")
         search_sizer.Add(self.search_text_ctrl, 1, wx.ALL | wx.CENTER, 5)
 
         search_button = wx.Button(self.panel, label="🔍 Buscar")
@@ -125,6 +143,22 @@ class MetadataAnalyzerFrame(wx.Frame):
         buttons_sizer.AddGrowableCol(1, 1)
 
         self.main_sizer.Add(search_sizer, 0, wx.ALL | wx.EXPAND, 10)
+
+        # Progreso del análisis o limpieza de carpetas en segundo plano
+        progress_sizer = wx.BoxSizer(wx.HORIZONTAL)
+
+        self.progress_gauge = wx.Gauge(self.panel, range=1, size=(300, -1))
+        progress_sizer.Add(self.progress_gauge, 1, wx.ALL | wx.CENTER, 5)
+
+        self.progress_label = wx.StaticText(self.panel, label="")
+        progress_sizer.Add(self.progress_label, 1, wx.ALL | wx.CENTER, 5)
+
+        self.cancel_btn = wx.Button(self.panel, label="⛔ Cancelar")
+        self.cancel_btn.Bind(wx.EVT_BUTTON, self.on_cancel_scan)
+        self.cancel_btn.Disable()
+        progress_sizer.Add(self.cancel_btn, 0, wx.ALL | wx.CENTER, 5)
+
+        self.main_sizer.Add(progress_sizer, 0, wx.ALL | wx.EXPAND, 5)
         
         result_label = wx.StaticText(self.panel, label="Resultado:")
         result_font = wx.Font(12, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD)
@@ -133,6 +167,11 @@ class MetadataAnalyzerFrame(wx.Frame):
         
         self.result_text_metadata = wx.TextCtrl(self.panel, style=wx.TE_MULTILINE | wx.TE_READONLY | wx.HSCROLL, size=(750, 250))
         self.main_sizer.Add(self.result_text_metadata, 1, wx.ALL | wx.EXPAND, 10)
+
+        # Vista virtual para los resultados de carpetas: solo se generan las filas visibles
+        self.result_list = MetadataListCtrl(self.panel, self.metadata_index)
+        self.main_sizer.Add(self.result_list, 1, wx.ALL | wx.EXPAND, 10)
+        self.main_sizer.Hide(self.result_list)
         
         self.panel.SetSizer(self.main_sizer)
 
@@ -162,6 +201,8 @@ class MetadataAnalyzerFrame(wx.Frame):
 
         self.result_text_metadata.SetBackgroundColour(result_bg_color)
         self.result_text_metadata.SetForegroundColour(text_color)
+        self.result_list.SetBackgroundColour(result_bg_color)
+        self.result_list.SetForegroundColour(text_color)
 
         for child in self.panel.GetChildren():
             if isinstance(child, wx.StaticText):
@@ -180,13 +221,78 @@ class MetadataAnalyzerFrame(wx.Frame):
         self.apply_theme(self.current_theme)
         
 
+    def on_clear_cache(self, event):
+        cache = MetadataCache()
+        cache.invalidate()
+        cache.close()
+        wx.MessageBox("La caché de metadatos se ha vaciado.", "Caché vaciada", wx.OK | wx.ICON_INFORMATION)
+
+    def on_choose_report(self, event):
+        # Los análisis y limpiezas de carpetas siguientes escriben el informe a
+        # medida que termina cada archivo; cancelar el diálogo lo desactiva.
+        with wx.FileDialog(self, "Guardar informes en", wildcard=REPORT_WILDCARD, style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as file_dialog:
+            if file_dialog.ShowModal() == wx.ID_CANCEL:
+                self.report_path = None
+                self.progress_label.SetLabel("Informes desactivados")
+                return
+            path = file_dialog.GetPath()
+        try:
+            report_extension(path)
+        except ValueError as e:
+            wx.MessageBox(str(e), "Informe", wx.OK | wx.ICON_WARNING)
+            return
+        self.report_path = path
+        self.progress_label.SetLabel(f"Informe: {path}")
+
+    def on_walk_options(self, event):
+        with WalkOptionsDialog(self, self.walk_options) as dialog:
+            while dialog.ShowModal() == wx.ID_OK:
+                try:
+                    self.walk_options = dialog.get_options()
+                    return
+                except ValueError as e:
+                    wx.MessageBox(f"Valor no válido: {e}", "Filtros de carpetas", wx.OK | wx.ICON_WARNING)
+
+    def on_import_report(self, event):
+        if self.scan_worker:
+            return
+        with wx.FileDialog(self, "Importar informe", wildcard=REPORT_WILDCARD, style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as file_dialog:
+            if file_dialog.ShowModal() == wx.ID_CANCEL:
+                return
+            path = file_dialog.GetPath()
+
+        index = MetadataIndex()
+        try:
+            with wx.BusyCursor():
+                for result in read_report(path):
+                    index.add(result)
+        except Exception as e:
+            wx.MessageBox(f"ERROR: No se pudo importar el informe: {e}", "Error", wx.OK | wx.ICON_ERROR)
+            return
+
+        self.set_metadata_index(index)
+        self.result_list.show_files(range(len(index)))
+        self.show_result_list(True)
+        self.add_listbox(index.tags())
+        self.progress_label.SetLabel(f"Importados {len(index)} archivos de {path}")
+
+    def show_result_list(self, show):
+        self.main_sizer.Show(self.result_list, show)
+        self.main_sizer.Show(self.result_text_metadata, not show)
+        self.panel.Layout()
+
+    def set_metadata_index(self, index):
+        self.metadata_index = index
+        self.result_list.set_index(index)
+
     def on_select_file(self, event):
         self.remove_listbox()
+        self.show_result_list(False)
         with wx.FileDialog(self, "Seleccione un archivo", style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as file_dialog:
             if file_dialog.ShowModal() == wx.ID_CANCEL:
                 return
             path = file_dialog.GetPath()
-            metadata = analyze_metadata(self, path)
+            metadata = analyze_metadata(path, self.result_text_metadata.AppendText)
             self.display_metadata(metadata)
 
     def on_select_directory(self, event):
@@ -196,17 +302,100 @@ class MetadataAnalyzerFrame(wx.Frame):
             directory_path = dir_dialog.GetPath()
             if not directory_path:
                 return None  
-            
-            metadata = analyze_metadata_directory(self, directory_path)
-            self.display_directory_metadata(metadata)
 
-            tags = set()
-            for file_data in metadata:
-                metadata_dict = file_data.get("metadata", {})
-                if isinstance(metadata_dict, dict):
-                    tags.update(metadata_dict.keys())
-            
-            self.add_listbox(list(tags))
+            self.remove_listbox()
+            self.set_metadata_index(MetadataIndex())
+            self.show_result_list(True)
+            self.start_scan(analyze_job, directory_path)
+
+    def start_scan(self, job, directory_path):
+        self.scan_worker = ScanWorker(self, job, directory_path, report_path=self.report_path, dedup=self.dedup_item.IsChecked(),
+                                      timing=self.timing_item.IsChecked(), walk_options=self.walk_options)
+        self.set_scan_running(True)
+        self.scan_worker.start()
+
+    def set_scan_running(self, running):
+        for button in (self.select_file_btn, self.remove_file_btn, self.select_directory_btn, self.remove_directory_btn):
+            button.Enable(not running)
+        self.cancel_btn.Enable(running)
+        if running:
+            self.progress_gauge.SetValue(0)
+            self.progress_label.SetLabel("Iniciando...")
+
+    def on_cancel_scan(self, event):
+        if self.scan_worker:
+            self.scan_worker.cancel_event.set()
+            self.cancel_btn.Disable()
+            self.progress_label.SetLabel("Cancelando...")
+
+    def on_close(self, event):
+        if self.scan_worker:
+            self.scan_worker.cancel_event.set()
+        event.Skip()
+
+    def on_worker_batch(self, worker, batch):
+        if not self or worker is not self.scan_worker:
+            return
+        if worker.job is analyze_job:
+            first_id = len(self.metadata_index)
+            for file_data in batch:
+                self.metadata_index.add(file_data)
+            self.result_list.add_files(range(first_id, len(self.metadata_index)))
+        else:
+            self.result_text_metadata.AppendText("".join(f"{result['message']}\n" for result in batch))
+        self.update_progress(worker)
+
+    def on_worker_done(self, worker, error):
+        if not self or worker is not self.scan_worker:
+            return
+        self.scan_worker = None
+        self.set_scan_running(False)
+        if worker.total is None and not worker.cancel_event.is_set():
+            worker.total = worker.stats.files
+        self.update_progress(worker)
+
+        if error:
+            wx.MessageBox(f"ERROR: Error al procesar la carpeta: {error}", "Error", wx.OK | wx.ICON_ERROR)
+        elif worker.stats.files == 0:
+            if worker.job is analyze_job:
+                self.show_result_list(False)
+                self.result_text_metadata.Clear()
+                self.result_text_metadata.AppendText(f"Advertencia: No se encontraron metadatos o no se seleccionaron archivos válidos.\n")
+            else:
+                self.result_text_metadata.AppendText(f"Advertencia: No se pudo eliminar los metadatos o no se seleccionaron archivos válidos.\n")
+
+        status = "Cancelado. " if worker.cancel_event.is_set() else ""
+        summary = worker.stats.summary() + "\n" + worker.walker.summary()
+        if worker.dedup_stats is not None:
+            summary += "\n" + worker.dedup_stats.summary()
+        if worker.cache_summary:
+            summary += "\n" + worker.cache_summary
+        self.progress_label.SetLabel(status + summary)
+
+        if worker.job is analyze_job:
+            self.add_listbox(self.metadata_index.tags())
+        if worker.timing is not None:
+            wx.MessageBox(worker.timing.summary(), "Tiempos por formato", wx.OK | wx.ICON_INFORMATION)
+
+    def update_progress(self, worker):
+        done = worker.stats.files
+        if worker.total is None and worker.walker.finished:
+            worker.total = worker.walker.found
+        total = worker.total
+        if total is None:
+            self.progress_gauge.Pulse()
+            self.progress_label.SetLabel(f"Procesados: {done} - Encontrados: {worker.walker.found} - buscando archivos...")
+            return
+
+        remaining = max(total - done, 0)
+        self.progress_gauge.SetRange(max(total, 1))
+        self.progress_gauge.SetValue(min(done, total))
+        if done:
+            eta = worker.stats.elapsed() / done * remaining
+            minutes, seconds = divmod(int(eta), 60)
+            self.progress_label.SetLabel(f"Procesados: {done} - Restantes: {remaining} - Tiempo estimado: {minutes:02d}:{seconds:02d}")
+        else:
+            self.progress_label.SetLabel(f"Procesados: 0 - Restantes: {remaining}")
 
 
     def add_listbox(self, tags):
@@ -251,29 +440,24 @@ class MetadataAnalyzerFrame(wx.Frame):
             self.filter_metadata_by_tag(selected_tag)
 
     def filter_metadata_by_tag(self, tag):
-        self.result_text_metadata.Clear()
-        all_values = []
-
-        for file_data in self.directory_metadata:
-            filename = file_data.get("filename", "Archivo desconocido")
-            metadata = file_data.get("metadata", {})
-            if isinstance(metadata, dict) and tag in metadata:
-                all_values.append((filename, metadata[tag]))
-
-        if all_values:
-            for filename, value in all_values:
-                self.result_text_metadata.AppendText(f"Archivo: {filename}\n")
-                self.result_text_metadata.AppendText(f"  {tag}: {value}\n\n")
+        file_ids = self.metadata_index.files_with_tag(tag)
+
+        if file_ids:
+            self.result_list.show_tag(tag, file_ids)
+            self.show_result_list(True)
         else:
+            self.show_result_list(False)
+            self.result_text_metadata.Clear()
             self.result_text_metadata.AppendText(f"No se encontraron valores para la etiqueta: {tag}\n")
 
     def on_remove_metadata_file(self, event):
         self.remove_listbox()
+        self.show_result_list(False)
         with wx.FileDialog(self, "Seleccione un archivo", style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as file_dialog:
             if file_dialog.ShowModal() == wx.ID_CANCEL:
                 return
             path = file_dialog.GetPath()
-            result = remove_metadata_file(self, path)
+            result = remove_metadata_file(path, self.result_text_metadata.AppendText, self.deep_item.IsChecked())
             self.display_result(result)
 
     def on_remove_metadata_directory(self, event):
@@ -284,14 +468,18 @@ class MetadataAnalyzerFrame(wx.Frame):
             directory_path = dir_dialog.GetPath()
             if not directory_path:
                 return None
-            results = remove_metadata_directory(self, directory_path)
-            self.display_directory_results(results)
+            self.show_result_list(False)
+            self.result_text_metadata.Clear()
+            self.start_scan(deep_clean_job if self.deep_item.IsChecked() else clean_job, directory_path)
 
 
     def on_clear_results(self, event):
+        if self.scan_worker:
+            return
         self.remove_listbox()
         self.result_text_metadata.Clear()
-        self.directory_metadata = []
+        self.set_metadata_index(MetadataIndex())
+        self.show_result_list(False)
 
     def on_search(self, event):
         search_text = self.search_text_ctrl.GetValue().strip()
@@ -299,33 +487,19 @@ class MetadataAnalyzerFrame(wx.Frame):
             wx.MessageBox("Por favor, introduzca un texto para buscar.", "Sin texto", wx.OK | wx.ICON_WARNING)
             return
 
-        found_results = []
-
-        for file_data in self.directory_metadata:
-            filename = file_data.get("filename", "Archivo desconocido")
-            metadata = file_data.get("metadata", {})
-            metadata_text = ""
-
-            # Convertir todo el contenido de los metadatos en una cadena de texto
-            if isinstance(metadata, dict):
-                metadata_text = "\n".join(f"{key}: {value}" for key, value in metadata.items())
-            elif isinstance(metadata, str):
-                metadata_text = metadata  # Si es un string ya está listo
+        # Búsqueda libre o consulta por etiquetas, p. ej. "Autor=X AND Fecha de creación<2020-01-01"
+        found_results = self.metadata_index.find(search_text)
 
-            # Buscar el texto en el contenido
-            if search_text.lower() in metadata_text.lower():
-                found_results.append(f"Archivo: {filename}\n{metadata_text}\n")
-
-        self.result_text_metadata.Clear()
         if found_results:
-            for result in found_results:
-                self.result_text_metadata.AppendText(result + "\n")
+            self.result_list.show_files(found_results)
+            self.show_result_list(True)
         else:
             wx.MessageBox(f"No se encontró el texto '{search_text}' en los resultados.", "Sin coincidencias", wx.OK | wx.ICON_INFORMATION)
 
 
 
     def display_metadata(self, data):
+        self.show_result_list(False)
         self.result_text_metadata.Clear()
         if data:
             for key, value in data.items():
@@ -334,293 +508,285 @@ class MetadataAnalyzerFrame(wx.Frame):
             self.result_text_metadata.AppendText(f"Advertencia: No se encontraron metadatos o el archivo seleccionado es inválido.\n")
 
     def display_result(self, data):
+        self.show_result_list(False)
         self.result_text_metadata.Clear()
         if data:
             self.result_text_metadata.AppendText(f"{data}\n")
         else:
             self.result_text_metadata.AppendText(f"Advertencia: No se pudo eliminar los metadatos o el archivo seleccionado es inválido.\n")
 
-    def display_directory_metadata(self, data):
-        self.directory_metadata = data  
-        self.result_text_metadata.Clear()
-        if data:
-            for file_data in data:
-                filename = file_data.get("filename", "Archivo desconocido")
-                metadata = file_data.get("metadata", {})
-                self.result_text_metadata.AppendText(f"Archivo: {filename}\n")
-                if isinstance(metadata, dict):
-                    for key, value in metadata.items():
-                        self.result_text_metadata.AppendText(f"  {key}: {value}\n")
-                else:
-                    self.result_text_metadata.AppendText(f"  {metadata}\n")
-                self.result_text_metadata.AppendText("\n" + "-" * 40 + "\n\n")
-        else:
-            self.result_text_metadata.AppendText(f"Advertencia: No se encontraron metadatos o no se seleccionaron archivos válidos.\n")
 
-    def display_directory_results(self, data):
-        self.result_text_metadata.Clear()
-        if data:
-            for message in data:
-                self.result_text_metadata.AppendText(f"{message}\n")
-        else:
-            self.result_text_metadata.AppendText(f"Advertencia: No se pudo eliminar los metadatos o no se seleccionaron archivos válidos.\n")
-
-
-def analyze_metadata(self, filepath):
-    try:
-        if filepath.endswith('.pdf'):
-            with open(filepath, 'rb') as file:
-                pdf = PdfReader(file)
-                if pdf.is_encrypted:
-                    self.result_text_metadata.AppendText(f"Advertencia: El documento está firmado digitalmente. No se puede analizar.\n")
-                info = pdf.metadata
-                return info
-        elif filepath.endswith('.docx'):
-            doc = Document(filepath)
-            metadata = {}
-            props = doc.core_properties
-            return {
-                "Identificador": props.identifier or "N/A",
-                "Título": props.title or "N/A",
-                "Tema": props.subject or "N/A",
-                "Autor": props.author or "N/A",
-                "Última modificación": props.last_modified_by or "N/A",
-                "Fecha de creación": props.created or "N/A",
-                "Última modificación": props.modified or "N/A",
-                "Categoría": props.category or "N/A",
-                "Idioma": props.language or "N/A",
-                "Estado del contenido": props.content_status or "N/A",
-                "Palabras clave": props.keywords or "N/A",
-                "Revisión": props.revision or "N/A",
-                "Última impresión": props.last_printed or "N/A",
-                "Comentarios": props.comments or "N/A",
-                "Versión": props.version or "N/A"
-            }
-        elif filepath.endswith('.xlsx'):
-            workbook = load_workbook(filepath, read_only=True)
-            props = workbook.properties
-            return {
-                "Identificador": props.identifier or "N/A",
-                "Título": props.title or "N/A",
-                "Tema": props.subject or "N/A",
-                "Descripción": props.description or "N/A",
-                "Autor": props.creator or "N/A",
-                "Última modificación": props.lastModifiedBy or "N/A",
-                "Fecha de creación": props.created or "N/A",
-                "Última modificación": props.modified or "N/A",
-                "Categoría": props.category or "N/A",
-                "Idioma": props.language or "N/A",
-                "Estado del contenido": props.contentStatus or "N/A",
-                "Palabras clave": props.keywords or "N/A",
-                "Revisión": props.revision or "N/A",
-                "Última impresión": props.lastPrinted or "N/A",
-                "Versión": props.version or "N/A"
-            }
-        elif filepath.endswith('.pptx'):
-            presentation = Presentation(filepath)
-            props = presentation.core_properties
-            return {
-                "Identificador": props.identifier or "N/A",
-                "Título": props.title or "N/A",
-                "Tema": props.subject or "N/A",
-                "Autor": props.author or "N/A",
-                "Última modificación": props.last_modified_by or "N/A",
-                "Fecha de creación": props.created or "N/A",
-                "Última modificación": props.modified or "N/A",
-                "Categoría": props.category or "N/A",
-                "Idioma": props.language or "N/A",
-                "Estado del contenido": props.content_status or "N/A",
-                "Tipo de contenido": props.content_type or "N/A",
-                "Palabras clave": props.keywords or "N/A",
-                "Revisión": props.revision or "N/A",
-                "Última impresión": props.last_printed or "N/A",
-                "Comentarios": props.comments or "N/A",
-                "Versión": props.version or "N/A"
-            }
-        elif filepath.endswith(('.jpg', '.jpeg', '.png')):
-            image = Image.open(filepath)
-            metadata = image.info
-            return metadata
-        elif filepath.endswith('.zip'):
-            estadisticas = os.stat(filepath)
-            print(estadisticas)
-            metadata = {
-                "Ruta": os.path.abspath(filepath) or "N/A",
-                "Tamaño": estadisticas.st_size or "N/A",
-                "Fecha de creación": datetime.fromtimestamp(estadisticas.st_birthtime).strftime("%Y-%m-%d %H:%M:%S") or "N/A",
-                "Última modificación": datetime.fromtimestamp(estadisticas.st_mtime).strftime("%Y-%m-%d %H:%M:%S") or "N/A",
-                "Último acceso": datetime.fromtimestamp(estadisticas.st_atime).strftime("%Y-%m-%d %H:%M:%S") or "N/A",
-                "Modo permisos": estadisticas.st_mode or "N/A",  
-                "Número inodo": estadisticas.st_ino or "N/A",  
-                "Dispositivo": estadisticas.st_dev or "N/A",  
-                "Número enlaces": estadisticas.st_nlink or "N/A",  
-                "Propietario UID": estadisticas.st_uid or "N/A",
-                "Grupo GID": estadisticas.st_gid or "N/A"
-            }
-            return metadata
-        elif filepath.endswith(('.mp3', '.flac', '.wav', '.ogg')):
-            audio = MutagenFile(filepath)
-            return audio.tags if audio else "No tags found"
-        elif filepath.endswith(('.mp4', '.mkv', '.avi', '.mov')):
-            parser = createParser(filepath)
-            if not parser:
-                return "Unable to parse video file"
-            metadata = extractMetadata(parser)
-            return metadata.exportDictionary() if metadata else "No metadata found"
-        
-    except Exception as e:
-        self.result_text_metadata.AppendText(f"ERROR: Error inesperado al analizar los metadatos: {e}")
-
-
-def remove_metadata_pdf(self, filepath):
-    try:
-        reader = PdfReader(filepath)
-        if reader.is_encrypted:
-            self.result_text_metadata.AppendText(f"Advertencia: El documento PDF está firmado digitalmente. No se pueden eliminar los metadatos.\n")
-        writer = PdfWriter()
-        for page in range(len(reader.pages)):
-            writer.add_page(reader.pages[page])
-        writer.add_metadata({})
-        with open(filepath, "wb") as f:
-            writer.write(f)    
-    except Exception as e:
-        self.result_text_metadata.AppendText(f"ERROR: Error inesperado al eliminar metadatos del PDF: {e}")
-
-
-def remove_metadata_audio(filepath):
-    audio = MutagenFile(filepath, easy=True)
-    if not audio:
-        return f"No metadata found in {filepath}."
-    
-    audio.delete()
-    audio.save()
-
-
-def remove_metadata_video(filepath):
-
-    parser = createParser(filepath)
-    if not parser:
-        return f"Unable to parse video file {filepath}."
-    
-    editor = createEditor(parser)
-    if not editor:
-        return f"Unable to create editor for {filepath}."
-    
-    for field in list(editor.iterFields()):
-        editor.removeField(field)
-    
-    output_filepath = filepath.replace(".mp4", "_cleaned.mp4") 
-    with open(output_filepath, "wb") as output_file:
-        stream = FileOutputStream(output_file)
-        editor.writeInto(stream)
-
-def remove_metadata_office(self, filepath):
-    temp_dir = "temp_file"
-    file_extension = filepath.split('.')[-1]
-    
-    with zipfile.ZipFile(filepath, 'r') as zip_ref:
-        zip_ref.extractall(temp_dir)
-    
-    metadata_files = {
-        'docx': ['docProps/core.xml', 'docProps/app.xml'],
-        'xlsx': ['docProps/core.xml', 'docProps/app.xml'],
-        'pptx': ['docProps/core.xml', 'docProps/app.xml']
-    }
-    
-    if file_extension not in metadata_files:
-        self.result_text_metadata.AppendText(f"Formato de archivo no soportado para eliminación de metadatos\n")
-    
-    for meta_file in metadata_files[file_extension]:
-        meta_path = os.path.join(temp_dir, meta_file)
-        if os.path.exists(meta_path):
-            tree = ET.parse(meta_path)
-            root = tree.getroot()
-            for elem in root.iter():
-                elem.clear()
-            tree.write(meta_path)
-
-    with zipfile.ZipFile(filepath, 'w') as zip_ref:
-        for folder_name, subfolders, filenames in os.walk(temp_dir):
-            for filename in filenames:
-                file_path = os.path.join(folder_name, filename)
-                zip_ref.write(file_path, os.path.relpath(file_path, temp_dir))
-
-    shutil.rmtree(temp_dir)
-
-def remove_metadata_image(filepath):
-    image = Image.open(filepath)
-    info = image.info
-    if info:
-        image.info.clear()
-    image.save(filepath)
-
-def remove_metadata_file(self, filepath):
-    try:
-        extension = os.path.splitext(filepath)[1].lower() 
-        if extension in ['.jpg', '.jpeg', '.png']:
-            remove_metadata_image(filepath)
-            return f"Archivo: {os.path.basename(filepath)} - Los metadatos se eliminaron correctamente."
-        elif extension == '.pdf':
-            remove_metadata_pdf(self, filepath)
-            return f"Archivo: {os.path.basename(filepath)} - Los metadatos se eliminaron correctamente."
-        elif extension in ['.docx', '.xlsx', '.pptx']:
-            remove_metadata_office(self, filepath)
-            return f"Archivo: {os.path.basename(filepath)} - Los metadatos se eliminaron correctamente."
-        elif extension in ['.mp3', '.flac', '.wav', '.ogg']:
-            remove_metadata_audio(filepath)
-            return f"Archivo: {os.path.basename(filepath)} - Los metadatos se eliminaron correctamente."
-        elif extension in ['.mp4', '.mkv', '.avi', '.mov']:
-            remove_metadata_video(filepath)
-            return f"Archivo: {os.path.basename(filepath)} - Los metadatos se eliminaron correctamente."
+class MetadataListCtrl(wx.ListCtrl):
+    # Lista virtual de resultados (Archivo, Etiqueta, Valor). Cada fila es el
+    # id de un archivo (cabecera, que se expande con doble clic o con las
+    # flechas) o una tupla (id de archivo, posición o etiqueta). wx solo pide
+    # el texto de las filas visibles.
+    COLUMNS = ("Archivo", "Etiqueta", "Valor")
+    EXPAND_ALL_LIMIT = 200
+
+    def __init__(self, parent, index):
+        super(MetadataListCtrl, self).__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_HRULES, size=(750, 250))
+        for column, (label, width) in enumerate(zip(self.COLUMNS, (350, 200, 400))):
+            self.InsertColumn(column, label, width=width)
+        self.Bind(wx.EVT_LIST_COL_CLICK, self.on_column_click)
+        self.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.on_item_activated)
+        self.Bind(wx.EVT_LIST_KEY_DOWN, self.on_key_down)
+        self.set_index(index)
+
+    def set_index(self, index):
+        self.index = index
+        self.tag = None
+        self.file_ids = []
+        self.expanded = set()
+        self.rows = []
+        self.sort_column = None
+        self.sort_reverse = False
+        self.child_sort = None
+        self.SetItemCount(0)
+        self.Refresh()
+
+    def children(self, file_id):
+        return self.index.pairs(file_id)
+
+    def child_positions(self, file_id):
+        positions = list(range(len(self.children(file_id))))
+        if self.child_sort:
+            column, reverse = self.child_sort
+            pairs = self.children(file_id)
+            positions.sort(key=lambda position: pairs[position][column - 1].lower(), reverse=reverse)
+        return positions
+
+    def filename(self, file_id):
+        return self.index.filename(file_id)
+
+    def show_files(self, file_ids):
+        self.tag = None
+        self.file_ids = list(file_ids)
+        self.expanded = set(self.file_ids) if len(self.file_ids) <= self.EXPAND_ALL_LIMIT else set()
+        self.rebuild_rows()
+
+    def add_files(self, file_ids):
+        # Durante un análisis las filas nuevas se añaden al final sin reconstruir
+        if self.tag is not None:
+            return
+        for file_id in file_ids:
+            self.file_ids.append(file_id)
+            self.rows.append(file_id)
+        self.SetItemCount(len(self.rows))
+
+    def show_tag(self, tag, file_ids):
+        self.tag = tag
+        self.sort_column = None
+        self.file_ids = list(file_ids)
+        self.rows = [(file_id, tag) for file_id in self.file_ids]
+        self.SetItemCount(len(self.rows))
+        self.Refresh()
+
+    def rebuild_rows(self):
+        rows = []
+        for file_id in self.file_ids:
+            rows.append(file_id)
+            if file_id in self.expanded:
+                rows.extend((file_id, position) for position in self.child_positions(file_id))
+        self.rows = rows
+        self.SetItemCount(len(self.rows))
+        self.Refresh()
+
+    def toggle(self, item):
+        row = self.rows[item]
+        if self.tag is not None or not isinstance(row, int):
+            return
+        if row in self.expanded:
+            self.expanded.discard(row)
+            end = item + 1
+            while end < len(self.rows) and not isinstance(self.rows[end], int):
+                end += 1
+            del self.rows[item + 1:end]
         else:
-            return f"Archivo: {os.path.basename(filepath)} - Tipo de archivo no soportado para eliminación de metadatos."
-    except Exception as e:
-        return f"ERROR: No se pudo procesar el archivo {os.path.basename(filepath)}. Error: {e}"
-
-
-
-def remove_metadata_directory(self, directory_path):
-    try:
-        info_list = []
-        for root, dirs, files in os.walk(directory_path):
-            for file in files:
-                file_path = os.path.join(root, file) 
-                try:
-                    result = remove_metadata_file(self, file_path)  
-                    if result:
-                        info_list.append(result)
-                    else:
-                        info_list.append(f"Archivo: {file_path} - No se pudo eliminar los metadatos o no es compatible.")
-                except Exception as file_error:
-                    info_list.append(f"ERROR: No se pudo procesar {file_path}. Error: {file_error}")
-        return info_list
-    except Exception as e:
-        return [f"Error general al procesar el directorio: {e}"]
-
-
-
-
-def analyze_metadata_directory(self, directory_path):
-    try:
-        info_list = []
-        for root, dirs, files in os.walk(directory_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                info = analyze_metadata(self, file_path)
-                info_list.append({
-                    "filename": file_path,
-                    "metadata": info
-                })
-        return info_list
-    except Exception as e:
-        self.result_text_metadata.AppendText(f"ERROR: Error analyzing files in directory: {e}\n")
-
+            self.expanded.add(row)
+            self.rows[item + 1:item + 1] = [(row, position) for position in self.child_positions(row)]
+        self.SetItemCount(len(self.rows))
+        self.Refresh()
+
+    def OnGetItemText(self, item, column):
+        row = self.rows[item]
+        if isinstance(row, int):
+            if column == 0:
+                marker = "▾" if row in self.expanded else "▸"
+                return f"{marker} {self.filename(row)}"
+            if column == 2:
+                return f"{len(self.children(row))} etiquetas"
+            return ""
+
+        file_id, key = row
+        if isinstance(key, int):
+            pair = self.children(file_id)[key]
+            return "" if column == 0 else pair[column - 1]
+        if column == 0:
+            return self.filename(file_id)
+        if column == 1:
+            return key
+        return self.index.value(file_id, key)
+
+    def on_item_activated(self, event):
+        self.toggle(event.GetIndex())
+
+    def on_key_down(self, event):
+        item = event.GetIndex()
+        key = event.GetKeyCode()
+        if 0 <= item < len(self.rows) and isinstance(self.rows[item], int):
+            expanded = self.rows[item] in self.expanded
+            if (key == wx.WXK_RIGHT and not expanded) or (key == wx.WXK_LEFT and expanded):
+                self.toggle(item)
+                return
+        event.Skip()
+
+    def on_column_click(self, event):
+        column = event.GetColumn()
+        self.sort_reverse = self.sort_column == column and not self.sort_reverse
+        self.sort_column = column
+
+        if self.tag is not None:
+            if column == 0:
+                self.rows.sort(key=lambda row: self.filename(row[0]).lower(), reverse=self.sort_reverse)
+            elif column == 2:
+                self.rows.sort(key=lambda row: self.index.value(row[0], self.tag).lower(), reverse=self.sort_reverse)
+            self.Refresh()
+            return
 
-def clear_results_metadata(result_text):
-    result_text.Clear()
-    wx.MessageBox("Text area has been cleared.", "Results cleared", wx.OK | wx.ICON_INFORMATION)
+        # Por archivo se ordenan las cabeceras; por etiqueta o valor, las filas de cada archivo
+        if column == 0:
+            self.file_ids.sort(key=lambda file_id: self.filename(file_id).lower(), reverse=self.sort_reverse)
+        else:
+            self.child_sort = (column, self.sort_reverse)
+        self.rebuild_rows()
+
+
+class WalkOptionsDialog(wx.Dialog):
+    # Los globs se escriben separados por punto y coma; los campos vacíos no
+    # filtran.
+    def __init__(self, parent, options):
+        super(WalkOptionsDialog, self).__init__(parent, title="Filtros de carpetas")
+        grid = wx.FlexGridSizer(cols=2, vgap=5, hgap=10)
+        grid.AddGrowableCol(1)
+
+        def add_field(label, value):
+            field = wx.TextCtrl(self, value=value, size=(260, -1))
+            grid.Add(wx.StaticText(self, label=label), 0, wx.ALIGN_CENTER_VERTICAL)
+            grid.Add(field, 1, wx.EXPAND)
+            return field
+
+        since = datetime.fromtimestamp(options.modified_since).date().isoformat() if options.modified_since is not None else ""
+        self.include_field = add_field("Incluir (globs):", "; ".join(options.include))
+        self.exclude_field = add_field("Excluir (globs):", "; ".join(options.exclude))
+        self.min_size_field = add_field("Tamaño mínimo (ej. 10K):", str(options.min_size or ""))
+        self.max_size_field = add_field("Tamaño máximo (ej. 2G):", str(options.max_size or ""))
+        self.since_field = add_field("Modificados desde (AAAA-MM-DD):", since)
+        self.depth_field = add_field("Profundidad máxima:", "" if options.max_depth is None else str(options.max_depth))
+
+        self.hidden_check = wx.CheckBox(self, label="Incluir archivos y carpetas ocultos")
+        self.hidden_check.SetValue(options.hidden)
+        self.symlinks_check = wx.CheckBox(self, label="Seguir enlaces simbólicos a carpetas")
+        self.symlinks_check.SetValue(options.follow_symlinks)
+        self.supported_check = wx.CheckBox(self, label="Solo archivos de formatos soportados")
+        self.supported_check.SetValue(options.supported_only)
+        self.sniff_check = wx.CheckBox(self, label="Comprobar por contenido los archivos sin extensión conocida")
+        self.sniff_check.SetValue(options.sniff_unknown)
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(grid, 0, wx.ALL | wx.EXPAND, 10)
+        for check in (self.hidden_check, self.symlinks_check, self.supported_check, self.sniff_check):
+            sizer.Add(check, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        sizer.Add(self.CreateStdDialogButtonSizer(wx.OK | wx.CANCEL), 0, wx.ALL | wx.EXPAND, 10)
+        self.SetSizerAndFit(sizer)
+
+    def get_options(self):
+        def globs(field):
+            return [pattern.strip() for pattern in field.GetValue().split(";") if pattern.strip()]
+
+        def optional(field, parse):
+            text = field.GetValue().strip()
+            return parse(text) if text else None
+
+        return WalkOptions(
+            include=globs(self.include_field),
+            exclude=globs(self.exclude_field),
+            min_size=optional(self.min_size_field, parse_size),
+            max_size=optional(self.max_size_field, parse_size),
+            modified_since=optional(self.since_field, parse_since),
+            max_depth=optional(self.depth_field, int),
+            hidden=self.hidden_check.GetValue(),
+            follow_symlinks=self.symlinks_check.GetValue(),
+            supported_only=self.supported_check.GetValue(),
+            sniff_unknown=self.sniff_check.GetValue()
+        )
+
+
+class ScanWorker(threading.Thread):
+    # Ejecuta el análisis o la limpieza de una carpeta fuera del hilo de la
+    # interfaz y envía los resultados por lotes con wx.CallAfter.
+    def __init__(self, frame, job, directory_path, workers=None, report_path=None, dedup=False, timing=False, walk_options=None):
+        super(ScanWorker, self).__init__(daemon=True)
+        self.frame = frame
+        self.job = job
+        self.directory_path = directory_path
+        self.workers = workers
+        self.report_path = report_path
+        self.dedup_stats = DedupStats() if dedup else None
+        self.timing = TimingReport() if timing else None
+        # El recorrido va contando los archivos mientras se procesan los
+        # primeros; el total se conoce en cuanto termina
+        self.walker = Walker([directory_path], walk_options)
+        self.cancel_event = threading.Event()
+        self.stats = BatchStats()
+        self.total = None
+        self.cache_summary = None
+
+    def run(self):
+        batch = []
+        last_flush = 0
+        error = None
+        cache = None
+        report = None
+        try:
+            if self.report_path:
+                report = open_report(self.report_path)
+            file_paths = self.walker
+            instrument = self.timing is not None
+            if self.job is analyze_job:
+                # La conexión SQLite pertenece al hilo que la crea
+                cache = MetadataCache()
+                results = analyze_files(file_paths, self.workers, self.cancel_event, cache, self.dedup_stats, instrument)
+            elif self.dedup_stats is not None:
+                results = run_deduplicated(self.job, file_paths, self.workers, self.cancel_event, stats=self.dedup_stats, instrument=instrument)
+            else:
+                results = run_jobs(self.job, file_paths, self.workers, self.cancel_event, instrument=instrument)
+            for result in results:
+                self.stats.add(result)
+                if self.timing is not None:
+                    self.timing.add(result)
+                if report is not None:
+                    report.write(result)
+                batch.append(result)
+                now = time.perf_counter()
+                if now - last_flush >= BATCH_INTERVAL:
+                    wx.CallAfter(self.frame.on_worker_batch, self, batch)
+                    batch = []
+                    last_flush = now
+        except Exception as e:
+            error = e
+        finally:
+            if report is not None:
+                report.close()
+            if cache is not None:
+                cache.close()
+                self.cache_summary = cache.summary()
+        if batch:
+            wx.CallAfter(self.frame.on_worker_batch, self, batch)
+        wx.CallAfter(self.frame.on_worker_done, self, error)
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = MainApp()
     app.MainLoop()
@@ -0,0 +1,181 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Rendimiento del análisis y la limpieza por formato sobre un corpus sintético
+# (ver corpus.py). Para cada formato y operación se mide, en un proceso nuevo,
+# archivos/s, MB/s, latencia p50/p95/p99 y memoria máxima (RSS). Los
+# resultados se pueden guardar en JSON y comparar con una ejecución anterior.
+#
+# Uso:
+#   python benchmarks/bench_formats.py [-n ARCHIVOS] [--formats pdf,mp4] [-o resultados.json] [--baseline anterior.json]
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from corpus import DEFAULT_SIZES, add_size_arguments, generate_corpus, parse_formats
+
+THOTCLEAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OPERATIONS = ("analyze", "clean")
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb():
+    # VmHWM se reinicia con exec; ru_maxrss en Linux conserva el máximo del
+    # proceso padre, así que solo se usa donde no hay /proc.
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB y macOS en bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_operation(operation, paths, queue):
+    # Se ejecuta en un proceso nuevo para que la memoria máxima sea la de
+    # este formato y esta operación solamente.
+    sys.path.insert(0, THOTCLEAN_DIR)
+    from thot_engine import analyze_job, clean_job, failed
+
+    job = analyze_job if operation == "analyze" else clean_job
+    # Un análisis previo sin medir carga las bibliotecas del formato, para
+    # que el tiempo de importación no aparezca como latencia del primer archivo.
+    analyze_job(paths[0])
+    latencies = []
+    total_bytes = 0
+    errors = 0
+    started = time.perf_counter()
+    for path in paths:
+        total_bytes += os.path.getsize(path)
+        file_started = time.perf_counter()
+        result = job(path)
+        latencies.append(time.perf_counter() - file_started)
+        errors += failed(result)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+
+    latencies.sort()
+    megabytes = total_bytes / (1024 * 1024)
+    queue.put({
+        "files": len(paths),
+        "megabytes": round(megabytes, 3),
+        "seconds": round(elapsed, 4),
+        "files_per_s": round(len(paths) / elapsed, 2),
+        "mb_per_s": round(megabytes / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "errors": errors,
+        "peak_rss_mb": peak_rss_mb(),
+    })
+
+
+def measure(operation, paths):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=run_operation, args=(operation, paths, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def compare(results, baseline):
+    print("\nComparación con la referencia (archivos/s y p95):")
+    for name, operations in results.items():
+        for operation, current in operations.items():
+            previous = baseline.get("results", {}).get(name, {}).get(operation)
+            if not previous or not previous.get("files_per_s"):
+                continue
+            speed = (current["files_per_s"] / previous["files_per_s"] - 1) * 100
+            p95 = (current["p95_ms"] / previous["p95_ms"] - 1) * 100 if previous.get("p95_ms") else 0.0
+            print(f"  {name:5s} {operation:7s} {speed:+7.1f}% archivos/s  {p95:+7.1f}% p95")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendimiento de ThotClean por formato")
+    add_size_arguments(parser)
+    parser.add_argument("-o", "--output", default=None, help="Guardar los resultados en este archivo JSON")
+    parser.add_argument("--baseline", default=None, help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--work-dir", default=None, help="Carpeta para el corpus (por defecto, una temporal que se borra al terminar)")
+    args = parser.parse_args()
+    formats = parse_formats(parser, args.formats)
+    sizes = {name: getattr(args, name) for name in DEFAULT_SIZES}
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="thotclean_bench_")
+    try:
+        corpus = generate_corpus(os.path.join(work_dir, "corpus"), formats, args.count, sizes, args.seed)
+        results = {}
+        print(f"{'formato':7s} {'operación':9s} {'arch/s':>9s} {'MB/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'RSS MB':>7s} errores")
+        for name, paths in corpus.items():
+            results[name] = {}
+            for operation in OPERATIONS:
+                if operation == "clean":
+                    # La limpieza modifica los archivos: se trabaja sobre una copia
+                    clean_dir = os.path.join(work_dir, "clean", name)
+                    shutil.rmtree(clean_dir, ignore_errors=True)
+                    shutil.copytree(os.path.dirname(paths[0]), clean_dir)
+                    paths = [os.path.join(clean_dir, os.path.basename(path)) for path in paths]
+                result = measure(operation, paths)
+                results[name][operation] = result
+                rss = f"{result['peak_rss_mb']:7.1f}" if result["peak_rss_mb"] is not None else "      -"
+                print(
+                    f"{name:7s} {operation:9s} {result['files_per_s']:9.1f} {result['mb_per_s']:8.1f} "
+                    f"{result['p50_ms']:8.2f} {result['p95_ms']:8.2f} {result['p99_ms']:8.2f} {rss} {result['errors']}"
+                )
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"count": args.count, "seed": args.seed, "formats": formats, "sizes": sizes},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
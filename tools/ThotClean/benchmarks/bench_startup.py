@@ -0,0 +1,70 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Mide el tiempo de arranque en frío de un proceso que importa el motor de
+# ThotClean, comparado con importar todas las bibliotecas de formatos al
+# cargar el módulo (como hacía ThotClean antes del registro de formatos).
+#
+# Uso:
+#   python benchmarks/bench_startup.py [-n REPETICIONES]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+THOTCLEAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER_IMPORTS = (
+    "import PyPDF2, docx, openpyxl, pptx, PIL.Image, mutagen, "
+    "hachoir.parser, hachoir.metadata, hachoir.stream, hachoir.editor"
+)
+
+CASES = {
+    "registro perezoso": "import thot_engine",
+    "importación completa": f"{EAGER_IMPORTS}; import thot_engine",
+    "registro + solo PyPDF2": "import thot_engine; from PyPDF2 import PdfReader",
+}
+
+
+def time_process(code):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=THOTCLEAN_DIR, check=True)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque de ThotClean")
+    parser.add_argument("-n", "--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    results = {}
+    for name, code in CASES.items():
+        time_process(code)  # calienta la caché de disco y de bytecode
+        samples = [time_process(code) for _ in range(args.repeat)]
+        results[name] = statistics.median(samples)
+        print(f"{name:25s} mediana {results[name] * 1000:7.1f} ms  (mín. {min(samples) * 1000:.1f} ms)")
+
+    gain = results["importación completa"] - results["registro perezoso"]
+    print(f"Ahorro por proceso: {gain * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+# Comprobaciones de regresión de errores ya corregidos. Cada comprobación
+# genera sus archivos en un directorio temporal; se ejecutan todas y el
+# proceso termina con código 1 si alguna falla.
+#
+# Uso:
+#   python benchmarks/checks.py
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import traceback
+import zipfile
+
+THOTCLEAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, THOTCLEAN_DIR)
+
+from corpus import AUTHOR, DEFAULT_SIZES, make_pdf  # noqa: E402
+
+
+def pdf_bytes(directory, rng_seed=0):
+    import random
+
+    path = os.path.join(directory, "informe.pdf")
+    make_pdf(path, random.Random(rng_seed), dict(DEFAULT_SIZES, pdf_pages=1))
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def check_stored_pdf_in_zip(directory):
+    # Un zip cuyo primer miembro es un PDF sin comprimir contiene %PDF- en el
+    # primer KB, pero sigue siendo un zip
+    from thot_sniff import sniff_file
+
+    path = os.path.join(directory, "documentos.zip")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as archive:
+        archive.writestr("informe.pdf", pdf_bytes(directory))
+    kind, _ = sniff_file(path)
+    assert kind == "zip", f"detectado como {kind}"
+
+    # El mismo zip dentro de otro se recorre en lugar de analizarse como PDF
+    import thot_core  # noqa: F401  registra los manejadores
+    from thot_archive import SEPARATOR, analyze_archive
+
+    outer = os.path.join(directory, "exterior.zip")
+    with zipfile.ZipFile(outer, "w", zipfile.ZIP_STORED) as archive:
+        archive.write(path, "documentos.zip")
+    metadata = analyze_archive(outer, lambda message: None)
+    prefix = "documentos.zip" + SEPARATOR + "informe.pdf" + SEPARATOR
+    assert any(tag.startswith(prefix) for tag in metadata), sorted(metadata)
+
+
+def check_cache_without_timing(directory):
+    # Un acierto de la caché no debe traer los tiempos ni el representante de
+    # la ejecución que lo guardó
+    from thot_cache import MetadataCache
+    from thot_engine import analyze_job
+    from thot_instrument import run_instrumented
+
+    path = os.path.join(directory, "informe.pdf")
+    with open(path, "wb") as file:
+        file.write(pdf_bytes(directory))
+    cache = MetadataCache(os.path.join(directory, "cache.sqlite"))
+    try:
+        result = run_instrumented(analyze_job, path)
+        result["duplicate_of"] = os.path.join(directory, "otro.pdf")
+        cache.store(result)
+        cached = cache.lookup(path)
+    finally:
+        cache.close()
+    assert cached is not None and cached["metadata"] == result["metadata"]
+    assert "timing" not in cached and "duplicate_of" not in cached, sorted(cached)
+
+
+def build_pdf(objects, trailer):
+    # PDF de una sola revisión con los objetos dados (número -> cuerpo) y su
+    # tabla xref
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for number, body in sorted(objects.items()):
+        offsets[number] = len(output)
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    size = max(objects) + 1
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for number in range(1, size):
+        output += b"%010d 00000 n \n" % offsets[number] if number in offsets else b"0000000000 65535 f \n"
+    output += b"trailer\n<< /Size %d /Root 1 0 R %s >>\nstartxref\n%d\n%%%%EOF\n" % (size, trailer, xref)
+    return bytes(output)
+
+
+PDF_PAGES = {
+    1: b"<< /Type /Catalog /Pages 2 0 R >>",
+    2: b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+    3: b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 200 200] >>",
+}
+
+
+def check_pdf_info_forms(directory):
+    # /Info directo en el trailer y valores de /Info en objetos aparte: el
+    # archivo se limpia y el nombre no queda en ningún sitio
+    import thot_core  # noqa: F401  registra los manejadores
+    from PyPDF2 import PdfReader
+    from thot_core import remove_metadata_file
+
+    cases = {
+        "directo.pdf": build_pdf(PDF_PAGES, b"/Info << /Author (Carol) /Title (Informe) >>"),
+        "indirectos.pdf": build_pdf(
+            {**PDF_PAGES, 4: b"<< /Author 5 0 R /Title 6 0 R /Producer (bench) >>",
+             5: b"(Carol \\(contabilidad\\) (RR.HH.))", 6: b"<4361726F6C>"}, b"/Info 4 0 R"),
+    }
+    for name, content in cases.items():
+        path = os.path.join(directory, name)
+        with open(path, "wb") as file:
+            file.write(content)
+        message = remove_metadata_file(path, lambda text: None)
+        assert "correctamente" in message, f"{name}: {message}"
+        with open(path, "rb") as file:
+            cleaned = file.read()
+        assert b"Carol" not in cleaned and b"4361726F6C" not in cleaned, name
+        reader = PdfReader(path)
+        assert len(reader.pages) == 1 and not any(reader.metadata or {}), f"{name}: {reader.metadata}"
+
+
+def riff_chunk(chunk_id, data):
+    return chunk_id + struct.pack("<I", len(data)) + data + b"\0" * (len(data) & 1)
+
+
+def riff_list(list_type, *chunks):
+    return riff_chunk(b"LIST", list_type + b"".join(chunks))
+
+
+def check_avi_info(directory):
+    # LIST/INFO y la fecha IDIT de un AVI pasan a ser JUNK sin mover nada
+    import thot_core  # noqa: F401  registra los manejadores
+    from thot_core import remove_metadata_file
+
+    frame = riff_chunk(b"00dc", bytes(range(256)) * 4)
+    movi = riff_list(b"movi", frame)
+    hdrl = riff_list(
+        b"hdrl",
+        riff_chunk(b"avih", struct.pack("<14I", 40000, 0, 0, 0x10, 1, 0, 1, 0, 16, 16, 0, 0, 0, 0)),
+        riff_list(b"strl", riff_chunk(b"strh", b"vidsMJPG" + bytes(48)), riff_chunk(b"strf", bytes(40)),
+                  riff_list(b"INFO", riff_chunk(b"INAM", b"Pista de Carol\0"))),
+        riff_chunk(b"IDIT", b"MON JAN 01 10:00:00 2024\n\0"),
+    )
+    info = riff_list(b"INFO", riff_chunk(b"IART", b"Carol\0"), riff_chunk(b"ISFT", b"bench\0"))
+    index = riff_chunk(b"idx1", struct.pack("<4s3I", b"00dc", 0x10, 4, len(frame) - 8))
+    body = b"AVI " + hdrl + info + movi + index
+    content = b"RIFF" + struct.pack("<I", len(body)) + body
+    path = os.path.join(directory, "video.avi")
+    with open(path, "wb") as file:
+        file.write(content)
+
+    message = remove_metadata_file(path, lambda text: None)
+    assert "correctamente" in message, message
+    with open(path, "rb") as file:
+        cleaned = file.read()
+    assert len(cleaned) == len(content)
+    assert b"Carol" not in cleaned and b"2024" not in cleaned and b"bench" not in cleaned
+    assert cleaned.index(movi) == content.index(movi) and cleaned.endswith(index)
+
+
+def check_watch_forgets_deleted(directory):
+    # La identidad de un archivo limpiado se olvida al borrarlo
+    import threading
+    import time
+
+    from thot_engine import clean_job
+    from thot_watch import FolderWatcher
+
+    watched = os.path.join(directory, "entrada")
+    os.makedirs(watched)
+    watcher = FolderWatcher([watched], clean_job, workers=1, debounce=0.05)
+    results = []
+    thread = threading.Thread(target=watcher.run, kwargs={"on_result": results.append})
+    thread.start()
+
+    def wait_for(condition):
+        deadline = time.monotonic() + 20
+        while not condition():
+            assert time.monotonic() < deadline, (results, watcher.cleaned)
+            time.sleep(0.05)
+
+    try:
+        time.sleep(0.2)
+        path = os.path.join(watched, "informe.pdf")
+        with open(path, "wb") as file:
+            file.write(pdf_bytes(directory))
+        wait_for(lambda: path in watcher.cleaned)
+        os.remove(path)
+        wait_for(lambda: path not in watcher.cleaned)
+    finally:
+        watcher.stop()
+        thread.join()
+    assert watcher.stats.cleaned == 1 and watcher.stats.errors == 0, watcher.stats.summary()
+
+
+CHECKS = [
+    check_stored_pdf_in_zip,
+    check_cache_without_timing,
+    check_pdf_info_forms,
+    check_avi_info,
+    check_watch_forgets_deleted,
+]
+
+
+def main():
+    failures = 0
+    for check in CHECKS:
+        directory = tempfile.mkdtemp(prefix="thotclean_check_")
+        try:
+            check(directory)
+            print(f"OK     {check.__name__}")
+        except Exception:
+            failures += 1
+            print(f"FALLO  {check.__name__}")
+            traceback.print_exc()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
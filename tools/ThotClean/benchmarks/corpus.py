@@ -0,0 +1,367 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Generador de corpus sintéticos para las pruebas de rendimiento. Con la misma
+# semilla y los mismos tamaños se obtienen los mismos documentos, con
+# metadatos en todos los sitios que ThotClean analiza o limpia.
+#
+# Uso:
+#   python benchmarks/corpus.py DIRECTORIO [-n ARCHIVOS] [--formats pdf,jpeg,...]
+
+import argparse
+import io
+import os
+import random
+import struct
+
+AUTHOR = "Ana Pérez"
+COMPANY = "Ejemplo S.A."
+XMP_PACKET = (
+    '<?xpacket begin="﻿" id="W5M0MpCehiHzreSzNTczkc9d"?>'
+    '<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+    '<rdf:Description xmlns:dc="http://purl.org/dc/elements/1.1/"><dc:creator>' + AUTHOR + '</dc:creator>'
+    '</rdf:Description></rdf:RDF></x:xmpmeta><?xpacket end="w"?>'
+).encode("utf-8")
+XMP_UUID = bytes.fromhex("BE7ACFCB97A942E89C71999491E3AFAC")
+
+# Tamaños por defecto; todos se pueden cambiar desde la línea de órdenes
+DEFAULT_SIZES = {
+    "pdf_pages": 20,
+    "image_pixels": 1024,
+    "office_images": 3,
+    "audio_kb": 512,
+    "video_kb": 4096,
+}
+
+
+def noise(rng, length):
+    return rng.getrandbits(8 * length).to_bytes(length, "little") if length else b""
+
+
+def test_image(rng, pixels, image_format):
+    from PIL import Image
+
+    # Degradado con ruido: se comprime de forma realista sin ser aleatorio puro
+    image = Image.linear_gradient("L").resize((pixels, pixels)).convert("RGB")
+    image.putpixel((rng.randrange(pixels), rng.randrange(pixels)), (255, 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def make_pdf(path, rng, sizes):
+    from PyPDF2 import PdfWriter
+
+    writer = PdfWriter()
+    for _ in range(sizes["pdf_pages"]):
+        writer.add_blank_page(595, 842)
+    writer.add_outline_item("Capítulo 1", 0)
+    writer.add_metadata({"/Author": AUTHOR, "/Title": f"Informe {rng.randrange(10000)}", "/Creator": "bench"})
+    with open(path, "wb") as file:
+        writer.write(file)
+
+
+def make_docx(path, rng, sizes):
+    from docx import Document
+
+    document = Document()
+    document.core_properties.author = AUTHOR
+    document.core_properties.title = f"Documento {rng.randrange(10000)}"
+    for index in range(sizes["office_images"]):
+        document.add_paragraph(f"Figura {index}")
+        document.add_picture(io.BytesIO(test_image(rng, sizes["image_pixels"] // 2, "PNG")))
+    document.save(path)
+
+
+def make_xlsx(path, rng, sizes):
+    from openpyxl import Workbook
+    from openpyxl.drawing.image import Image as SheetImage
+
+    workbook = Workbook()
+    workbook.properties.creator = AUTHOR
+    sheet = workbook.active
+    for row in range(200):
+        sheet.append([row, rng.random(), f"texto {row}"])
+    for index in range(sizes["office_images"]):
+        sheet.add_image(SheetImage(io.BytesIO(test_image(rng, sizes["image_pixels"] // 2, "PNG"))), f"E{1 + index * 20}")
+    workbook.save(path)
+
+
+def make_pptx(path, rng, sizes):
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    presentation = Presentation()
+    presentation.core_properties.author = AUTHOR
+    for index in range(sizes["office_images"]):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[5])
+        slide.shapes.title.text = f"Diapositiva {index}"
+        slide.shapes.add_picture(io.BytesIO(test_image(rng, sizes["image_pixels"] // 2, "PNG")), Inches(1), Inches(1.5))
+    presentation.save(path)
+
+
+def jpeg_segment(marker, payload):
+    return struct.pack(">BBH", 0xFF, marker, len(payload) + 2) + payload
+
+
+def make_jpeg(path, rng, sizes):
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(test_image(rng, sizes["image_pixels"], "PNG")))
+    exif = Image.Exif()
+    exif[0x013B] = AUTHOR  # Artist
+    exif[0x010F] = "Cámara de pruebas"  # Make
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", exif=exif, quality=85)
+    data = buffer.getvalue()
+
+    # XMP (APP1) e IPTC (APP13, recurso 8BIM 0x0404) justo después de SOI
+    iptc = b"\x1c\x02\x50" + struct.pack(">H", len(AUTHOR.encode())) + AUTHOR.encode()
+    resource = b"8BIM\x04\x04\x00\x00" + struct.pack(">I", len(iptc)) + iptc + (b"\x00" if len(iptc) % 2 else b"")
+    segments = jpeg_segment(0xE1, b"http://ns.adobe.com/xap/1.0/\x00" + XMP_PACKET)
+    segments += jpeg_segment(0xED, b"Photoshop 3.0\x00" + resource)
+    with open(path, "wb") as file:
+        file.write(data[:2] + segments + data[2:])
+
+
+def make_png(path, rng, sizes):
+    from PIL import Image
+    from PIL.PngImagePlugin import PngInfo
+
+    image = Image.open(io.BytesIO(test_image(rng, sizes["image_pixels"], "PNG")))
+    info = PngInfo()
+    info.add_text("Author", AUTHOR)
+    info.add_itxt("XML:com.adobe.xmp", XMP_PACKET.decode("utf-8"))
+    image.save(path, "PNG", pnginfo=info)
+
+
+def mp3_frames(rng, length):
+    # Tramas MPEG-1 Layer III de 128 kbps a 44,1 kHz (417 bytes) con datos
+    # aleatorios: suficiente para que los lectores reconozcan el formato.
+    frames = []
+    for _ in range(max(1, length // 417)):
+        frames.append(b"\xff\xfb\x90\x64" + noise(rng, 413))
+    return b"".join(frames)
+
+
+def make_mp3(path, rng, sizes):
+    from mutagen.id3 import ID3, TIT2, TPE1, APIC
+
+    with open(path, "wb") as file:
+        file.write(mp3_frames(rng, sizes["audio_kb"] * 1024))
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text=f"Pista {rng.randrange(1000)}"))
+    tags.add(TPE1(encoding=3, text=AUTHOR))
+    tags.add(APIC(encoding=3, mime="image/png", type=3, data=test_image(rng, 256, "PNG")))
+    tags.save(path, v1=2)
+
+
+def flac_block(block_type, data, last=False):
+    return bytes(((0x80 if last else 0) | block_type,)) + len(data).to_bytes(3, "big") + data
+
+
+def make_flac(path, rng, sizes):
+    # STREAMINFO de 44,1 kHz estéreo de 16 bits, VORBIS_COMMENT y PICTURE
+    streaminfo = struct.pack(">HH", 4096, 4096) + bytes(6)
+    streaminfo += ((44100 << 44) | (1 << 41) | (15 << 36) | 44100).to_bytes(8, "big") + bytes(16)
+    comments = [f"ARTIST={AUTHOR}".encode(), f"TITLE=Pista {rng.randrange(1000)}".encode()]
+    vorbis = struct.pack("<I", 5) + b"bench" + struct.pack("<I", len(comments))
+    vorbis += b"".join(struct.pack("<I", len(comment)) + comment for comment in comments)
+    image = test_image(rng, 256, "PNG")
+    picture = struct.pack(">II", 3, 9) + b"image/png" + struct.pack(">I", 0)
+    picture += struct.pack(">IIIII", 256, 256, 24, 0, len(image)) + image
+    with open(path, "wb") as file:
+        file.write(b"fLaC" + flac_block(0, streaminfo) + flac_block(4, vorbis) + flac_block(6, picture, last=True))
+        file.write(noise(rng, sizes["audio_kb"] * 1024))
+
+
+OGG_CRC_TABLE = []
+for _byte in range(256):
+    _crc = _byte << 24
+    for _ in range(8):
+        _crc = ((_crc << 1) ^ 0x04C11DB7) if _crc & 0x80000000 else _crc << 1
+    OGG_CRC_TABLE.append(_crc & 0xFFFFFFFF)
+
+
+def ogg_page(serial, sequence, granule, packet, header_type=0):
+    segments = [255] * (len(packet) // 255) + [len(packet) % 255]
+    header = struct.pack("<4sBBqIII", b"OggS", 0, header_type, granule, serial, sequence, 0)
+    page = bytearray(header + bytes((len(segments),)) + bytes(segments) + packet)
+    crc = 0
+    for byte in page:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ OGG_CRC_TABLE[(crc >> 24) ^ byte]
+    page[22:26] = struct.pack("<I", crc)
+    return bytes(page)
+
+
+def make_ogg(path, rng, sizes):
+    # Ogg Opus: OpusHead, OpusTags y páginas de datos de menos de 64 KB
+    serial = rng.randrange(1 << 31)
+    head = b"OpusHead" + struct.pack("<BBHIhB", 1, 2, 312, 48000, 0, 0)
+    comments = [f"ARTIST={AUTHOR}".encode()]
+    tags = b"OpusTags" + struct.pack("<I", 5) + b"bench" + struct.pack("<I", len(comments))
+    tags += b"".join(struct.pack("<I", len(comment)) + comment for comment in comments)
+    with open(path, "wb") as file:
+        file.write(ogg_page(serial, 0, 0, head, header_type=0x02))
+        file.write(ogg_page(serial, 1, 0, tags))
+        remaining = sizes["audio_kb"] * 1024
+        sequence = 2
+        while remaining > 0:
+            packet = b"\xfc" + noise(rng, min(remaining, 250))
+            remaining -= len(packet)
+            last = remaining <= 0
+            file.write(ogg_page(serial, sequence, sequence * 960, packet, header_type=0x04 if last else 0))
+            sequence += 1
+
+
+def make_wav(path, rng, sizes):
+    import wave
+    from mutagen.wave import WAVE
+    from mutagen.id3 import TIT2, TPE1
+
+    with wave.open(path, "wb") as output:
+        output.setnchannels(2)
+        output.setsampwidth(2)
+        output.setframerate(44100)
+        output.writeframes(noise(rng, sizes["audio_kb"] * 1024 // 4 * 4))
+    audio = WAVE(path)
+    audio.add_tags()
+    audio.tags.add(TIT2(encoding=3, text=f"Pista {rng.randrange(1000)}"))
+    audio.tags.add(TPE1(encoding=3, text=AUTHOR))
+    audio.save()
+
+
+def mp4_box(box_type, payload):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def make_mp4(path, rng, sizes):
+    # ftyp, moov (una pista con stco) con udta/©xyz y meta, uuid XMP y mdat
+    chunk_size = 64 * 1024
+    chunks = max(1, sizes["video_kb"] * 1024 // chunk_size)
+    ftyp = mp4_box(b"ftyp", b"isom\x00\x00\x02\x00isomiso2mp41")
+    xmp = mp4_box(b"uuid", XMP_UUID + XMP_PACKET)
+
+    def moov(offsets):
+        stco = mp4_box(b"stco", bytes(4) + struct.pack(">I", len(offsets)) + b"".join(struct.pack(">I", offset) for offset in offsets))
+        stsz = mp4_box(b"stsz", bytes(4) + struct.pack(">II", chunk_size, len(offsets)))
+        stbl = mp4_box(b"stbl", mp4_box(b"stsd", bytes(8)) + stsz + stco)
+        # mvhd y mdhd versión 0 con escala de tiempo 1000 y 10 s de duración
+        timing = bytes(12) + struct.pack(">II", 1000, 10000)
+        mdia = mp4_box(b"mdia", mp4_box(b"mdhd", timing + bytes(4)) + mp4_box(b"minf", stbl))
+        trak = mp4_box(b"trak", mp4_box(b"tkhd", bytes(84)) + mdia)
+        udta = mp4_box(b"udta", mp4_box(b"\xa9xyz", b"\x00\x12\x15\xc7+40.4168-003.7038/"))
+        meta = mp4_box(b"meta", bytes(4) + mp4_box(b"hdlr", bytes(24)))
+        return mp4_box(b"moov", mp4_box(b"mvhd", timing + bytes(80)) + trak + udta + meta)
+
+    base = len(ftyp) + len(moov([0] * chunks)) + len(xmp) + 8
+    with open(path, "wb") as file:
+        file.write(ftyp + moov([base + index * chunk_size for index in range(chunks)]) + xmp)
+        file.write(struct.pack(">I4s", 8 + chunks * chunk_size, b"mdat"))
+        for _ in range(chunks):
+            file.write(noise(rng, chunk_size))
+
+
+def ebml_size(length):
+    width = next(width for width in range(1, 9) if length < (1 << (7 * width)) - 1)
+    return ((1 << (7 * width)) | length).to_bytes(width, "big")
+
+
+def ebml(element_id, payload):
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + ebml_size(len(payload)) + payload
+
+
+def make_mkv(path, rng, sizes):
+    info = ebml(0x2AD7B1, b"\x0f\x42\x40") + ebml(0x4D80, b"bench muxer") + ebml(0x5741, b"bench writer")
+    info += ebml(0x7BA9, f"Grabación de {AUTHOR}".encode()) + ebml(0x4461, struct.pack(">q", rng.randrange(1 << 40)))
+    tracks = ebml(0x1654AE6B, ebml(0xAE, ebml(0xD7, b"\x01") + ebml(0x83, b"\x01") + ebml(0x86, b"V_UNCOMPRESSED")))
+    tag = ebml(0x7373, ebml(0x67C8, ebml(0x45A3, b"ARTIST") + ebml(0x4487, AUTHOR.encode())))
+    clusters = b""
+    block_size = 32 * 1024
+    for index in range(max(1, sizes["video_kb"] * 1024 // block_size)):
+        block = ebml(0xA3, b"\x81\x00\x00\x80" + noise(rng, block_size))
+        clusters += ebml(0x1F43B675, ebml(0xE7, struct.pack(">H", index)) + block)
+    segment = ebml(0x1549A966, info) + tracks + clusters + ebml(0x1254C367, tag)
+    with open(path, "wb") as file:
+        file.write(ebml(0x1A45DFA3, ebml(0x4282, b"matroska")) + ebml(0x18538067, segment))
+
+
+GENERATORS = {
+    "pdf": ("pdf", make_pdf),
+    "docx": ("docx", make_docx),
+    "xlsx": ("xlsx", make_xlsx),
+    "pptx": ("pptx", make_pptx),
+    "jpeg": ("jpg", make_jpeg),
+    "png": ("png", make_png),
+    "mp3": ("mp3", make_mp3),
+    "flac": ("flac", make_flac),
+    "ogg": ("ogg", make_ogg),
+    "wav": ("wav", make_wav),
+    "mp4": ("mp4", make_mp4),
+    "mkv": ("mkv", make_mkv),
+}
+
+
+def generate_corpus(directory, formats=None, count=10, sizes=None, seed=0):
+    # Devuelve {formato: [rutas]}; cada formato va en su propia carpeta.
+    sizes = dict(DEFAULT_SIZES, **(sizes or {}))
+    corpus = {}
+    for name in formats or GENERATORS:
+        extension, generator = GENERATORS[name]
+        format_directory = os.path.join(directory, name)
+        os.makedirs(format_directory, exist_ok=True)
+        rng = random.Random(f"{seed}-{name}")
+        paths = []
+        for index in range(count):
+            path = os.path.join(format_directory, f"{name}_{index:05d}.{extension}")
+            generator(path, rng, sizes)
+            paths.append(path)
+        corpus[name] = paths
+    return corpus
+
+
+def add_size_arguments(parser):
+    parser.add_argument("-n", "--count", type=int, default=10, help="Archivos por formato")
+    parser.add_argument("--formats", default=",".join(GENERATORS), help="Formatos separados por comas")
+    parser.add_argument("--seed", type=int, default=0)
+    for name, value in DEFAULT_SIZES.items():
+        parser.add_argument("--" + name.replace("_", "-"), type=int, default=value, dest=name)
+
+
+def parse_formats(parser, text):
+    formats = [name.strip() for name in text.split(",") if name.strip()]
+    unknown = [name for name in formats if name not in GENERATORS]
+    if unknown:
+        parser.error(f"formatos desconocidos: {', '.join(unknown)} (disponibles: {', '.join(GENERATORS)})")
+    return formats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un corpus sintético para las pruebas de rendimiento")
+    parser.add_argument("directory")
+    add_size_arguments(parser)
+    args = parser.parse_args()
+    sizes = {name: getattr(args, name) for name in DEFAULT_SIZES}
+    corpus = generate_corpus(args.directory, parse_formats(parser, args.formats), args.count, sizes, args.seed)
+    for name, paths in corpus.items():
+        total = sum(os.path.getsize(path) for path in paths)
+        print(f"{name:5s} {len(paths)} archivos, {total / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+# Análisis de los documentos contenidos en un .zip sin extraerlos a disco. Se
+# recorre el directorio central y cada miembro de un formato soportado se
+# descomprime en un SpooledTemporaryFile (en memoria si es pequeño) y se pasa
+# al mismo manejador que si fuera un archivo suelto. Los zip anidados se
+# recorren igual, hasta MAX_DEPTH niveles.
+#
+# Contra las bombas zip cada archivo de nivel superior tiene un presupuesto de
+# miembros y de bytes descomprimidos que comparten todos sus zip anidados; el
+# tamaño declarado se comprueba antes de descomprimir y se vuelve a comprobar
+# al leer.
+#
+# Los resultados se devuelven como "miembro › etiqueta": valor. Con muchos
+# miembros, y si no se está ya dentro de un proceso del pool del motor, los
+# documentos se analizan en paralelo.
+
+import multiprocessing
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from thot_core import plain_metadata
+from thot_formats import HANDLERS_BY_EXTENSION, HANDLERS_BY_KIND, detect_stream_handler
+from thot_io import TEMP_PREFIX
+from thot_sniff import sniff_header
+
+MAX_DEPTH = 3
+MAX_MEMBERS = 10000
+MAX_EXPANDED_SIZE = 512 * 1024 * 1024
+# Los miembros más grandes que esto pasan de memoria a un temporal
+SPOOL_SIZE = 16 * 1024 * 1024
+SNIFF_SIZE = 1024
+COPY_SIZE = 1024 * 1024
+PARALLEL_MIN_MEMBERS = 8
+SEPARATOR = " › "
+
+
+class ArchiveLimitError(Exception):
+    pass
+
+
+class ArchiveBudget:
+    def __init__(self, members=MAX_MEMBERS, expanded_size=MAX_EXPANDED_SIZE):
+        self.members = members
+        self.expanded_size = expanded_size
+        self.exhausted = None
+
+    def take(self, info):
+        # Devuelve False (y recuerda el motivo) si el miembro no cabe
+        if self.members <= 0:
+            self.exhausted = f"más de {MAX_MEMBERS} miembros"
+            return False
+        if info.file_size > self.expanded_size:
+            self.exhausted = f"más de {MAX_EXPANDED_SIZE // (1024 * 1024)} MB descomprimidos"
+            return False
+        self.members -= 1
+        self.expanded_size -= info.file_size
+        return True
+
+
+def spool_member(package, info):
+    # Descomprime el miembro sin pasar de su tamaño declarado (que ya está
+    # descontado del presupuesto)
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE, prefix=TEMP_PREFIX)
+    try:
+        with package.open(info) as member:
+            remaining = info.file_size
+            while True:
+                chunk = member.read(min(COPY_SIZE, remaining + 1))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                if remaining < 0:
+                    raise ArchiveLimitError("el miembro ocupa más de lo declarado")
+                spool.write(chunk)
+        spool.seek(0)
+        return spool
+    except BaseException:
+        spool.close()
+        raise
+
+
+def member_kind(package, info):
+    # Tipo del miembro por la extensión o, si no se conoce, por sus primeros
+    # bytes; None si no es de ningún formato soportado
+    extension = os.path.splitext(info.filename)[1].lower()
+    handler = HANDLERS_BY_EXTENSION.get(extension)
+    if handler is not None:
+        return handler.kinds[0]
+    with package.open(info) as member:
+        kind = sniff_header(member.read(SNIFF_SIZE))
+    return kind if kind in HANDLERS_BY_KIND else None
+
+
+def add_result(metadata, name, result):
+    if isinstance(result, dict):
+        for tag, value in result.items():
+            metadata[name + SEPARATOR + str(tag)] = value
+    elif result is not None:
+        metadata[name] = result
+
+
+def analyze_spooled(spool, name, log):
+    handler, header = detect_stream_handler(spool, name)
+    if handler is None or handler.analyze is None:
+        return None
+    return plain_metadata(handler.analyze(spool, log, header))
+
+
+def analyze_member(archive_path, name):
+    # Tarea del pool: cada proceso abre el zip por su cuenta
+    messages = []
+    try:
+        with zipfile.ZipFile(archive_path) as package:
+            info = package.getinfo(name)
+            with spool_member(package, info) as spool:
+                return analyze_spooled(spool, name, messages.append), messages
+    except Exception as e:
+        messages.append(f"Advertencia: no se pudo analizar {name}: {e}\n")
+        return None, messages
+
+
+def analyze_archive(source, log, depth=0, budget=None, prefix=""):
+    # source es la ruta del zip o un zip ya abierto en memoria (anidado)
+    budget = budget or ArchiveBudget()
+    metadata = {}
+    leaves = []
+    with zipfile.ZipFile(source) as package:
+        if package.comment:
+            metadata[prefix + "Comentario del zip"] = package.comment.decode("utf-8", "replace")
+        for info in package.infolist():
+            if info.is_dir():
+                continue
+            name = prefix + info.filename
+            if info.flag_bits & 0x1:
+                log(f"Advertencia: {name} está cifrado y no se analiza.\n")
+                continue
+            try:
+                kind = member_kind(package, info)
+            except (zipfile.BadZipFile, NotImplementedError, EOFError, OSError) as e:
+                log(f"Advertencia: no se pudo leer {name}: {e}\n")
+                continue
+            if kind is None:
+                continue
+            if not budget.take(info):
+                log(f"Advertencia: se dejó de analizar {prefix or 'el zip'} al superar el límite ({budget.exhausted}).\n")
+                break
+            if kind != "zip":
+                leaves.append(info)
+                continue
+            if depth + 1 > MAX_DEPTH:
+                log(f"Advertencia: {name} supera la profundidad máxima de zip anidados ({MAX_DEPTH}).\n")
+                continue
+            try:
+                with spool_member(package, info) as spool:
+                    # Un .docx, .xlsx o .pptx sin extensión también empieza
+                    # como un zip
+                    handler, header = detect_stream_handler(spool, name)
+                    if handler is HANDLERS_BY_KIND.get("zip"):
+                        metadata.update(analyze_archive(spool, log, depth + 1, budget, name + SEPARATOR))
+                    elif handler is not None and handler.analyze is not None:
+                        add_result(metadata, name, plain_metadata(handler.analyze(spool, log, header)))
+            except Exception as e:
+                log(f"Advertencia: no se pudo analizar {name}: {e}\n")
+
+        # Solo el zip de nivel superior, abierto por ruta, se reparte entre
+        # procesos; cada uno abre el archivo y descomprime su miembro.
+        parallel = (isinstance(source, (str, os.PathLike)) and len(leaves) >= PARALLEL_MIN_MEMBERS
+                    and multiprocessing.parent_process() is None)
+        if parallel:
+            workers = min(len(leaves), os.cpu_count() or 1)
+            names = [info.filename for info in leaves]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for name, (result, messages) in zip(names, executor.map(analyze_member, [source] * len(names), names)):
+                    for message in messages:
+                        log(message)
+                    add_result(metadata, prefix + name, result)
+            return metadata
+
+        for info in leaves:
+            name = prefix + info.filename
+            try:
+                with spool_member(package, info) as spool:
+                    add_result(metadata, name, analyze_spooled(spool, name, log))
+            except Exception as e:
+                log(f"Advertencia: no se pudo analizar {name}: {e}\n")
+    return metadata
@@ -0,0 +1,177 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Eliminación de etiquetas de audio sin mover los datos de audio. Las
+# etiquetas del principio del archivo se sustituyen por relleno del mismo
+# tamaño y las del final se truncan:
+#
+#   MP3: la etiqueta ID3v2 queda como una etiqueta vacía con relleno (incluidas
+#        las imágenes APIC) y se truncan ID3v1 y APEv2.
+#   FLAC: los bloques VORBIS_COMMENT y PICTURE pasan a ser bloques PADDING.
+#   WAV: los chunks LIST/INFO e id3 pasan a ser chunks JUNK.
+#
+# Los demás formatos (Ogg) se limpian con mutagen, que sí puede reescribir el
+# archivo entero.
+
+import os
+import struct
+
+from thot_io import read_exact
+from thot_sniff import MPEG_SNIFF_SIZE, is_mpeg_audio
+
+ZERO_BLOCK = bytes(1024 * 1024)
+ID3V1_SIZE = 128
+ID3V1_ENHANCED_SIZE = 227
+APE_FOOTER_SIZE = 32
+APE_HAS_HEADER = 0x80000000
+FLAC_PADDING = 1
+FLAC_DROP_BLOCKS = {4, 6}  # VORBIS_COMMENT y PICTURE
+WAV_DROP_CHUNKS = {b"id3 ", b"ID3 "}
+
+
+def syncsafe(data):
+    return (data[0] & 0x7F) << 21 | (data[1] & 0x7F) << 14 | (data[2] & 0x7F) << 7 | (data[3] & 0x7F)
+
+
+def to_syncsafe(value):
+    return bytes(((value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F))
+
+
+def write_zeros(target, length):
+    while length:
+        chunk = ZERO_BLOCK[:min(length, len(ZERO_BLOCK))]
+        target.write(chunk)
+        length -= len(chunk)
+
+
+def blank_id3v2(target, offset=0):
+    # Devuelve los bytes reescritos y la posición siguiente a la etiqueta.
+    target.seek(offset)
+    header = target.read(10)
+    if len(header) < 10 or header[:3] != b"ID3":
+        return 0, offset
+    total = 10 + syncsafe(header[6:10]) + (10 if header[5] & 0x10 else 0)
+    # Etiqueta vacía del mismo tamaño: sin pie ni encabezado extendido y el
+    # resto como relleno, que los lectores ignoran.
+    target.seek(offset)
+    target.write(header[:5] + b"\x00" + to_syncsafe(total - 10))
+    write_zeros(target, total - 10)
+    return total, offset + total
+
+
+def trailing_tags_start(source, file_size):
+    # Inicio de las etiquetas del final (APEv2, ID3v1 y su versión ampliada),
+    # que pueden aparecer en cualquier orden.
+    end = file_size
+    while True:
+        start = end
+        if start >= ID3V1_SIZE:
+            source.seek(start - ID3V1_SIZE)
+            if source.read(3) == b"TAG":
+                start -= ID3V1_SIZE
+                if start >= ID3V1_ENHANCED_SIZE:
+                    source.seek(start - ID3V1_ENHANCED_SIZE)
+                    if source.read(4) == b"TAG+":
+                        start -= ID3V1_ENHANCED_SIZE
+        if start >= APE_FOOTER_SIZE:
+            source.seek(start - APE_FOOTER_SIZE)
+            footer = source.read(APE_FOOTER_SIZE)
+            if footer[:8] == b"APETAGEX":
+                size, _, flags = struct.unpack("<III", footer[12:24])
+                ape_start = start - size - (APE_FOOTER_SIZE if flags & APE_HAS_HEADER else 0)
+                if ape_start >= 0:
+                    start = ape_start
+        if start == end:
+            return end
+        end = start
+
+
+def strip_mp3(target, file_size):
+    rewritten, _ = blank_id3v2(target)
+    end = trailing_tags_start(target, file_size)
+    if end < file_size:
+        target.truncate(end)
+    return rewritten, file_size - end
+
+
+def strip_flac(target, file_size):
+    # Algunos programas ponen una etiqueta ID3v2 delante de fLaC
+    rewritten, offset = blank_id3v2(target)
+    target.seek(offset)
+    if target.read(4) != b"fLaC":
+        raise ValueError("No es un archivo FLAC")
+    offset += 4
+    last = False
+    while not last:
+        target.seek(offset)
+        header = read_exact(target, 4)
+        last = bool(header[0] & 0x80)
+        block_type = header[0] & 0x7F
+        length = int.from_bytes(header[1:4], "big")
+        if block_type in FLAC_DROP_BLOCKS:
+            target.seek(offset)
+            target.write(bytes((header[0] & 0x80 | FLAC_PADDING,)) + header[1:4])
+            write_zeros(target, length)
+            rewritten += 4 + length
+        offset += 4 + length
+    end = trailing_tags_start(target, file_size)
+    if end < file_size:
+        target.truncate(end)
+    return rewritten, file_size - end
+
+
+def strip_wav(target, file_size):
+    target.seek(0)
+    riff = read_exact(target, 12)
+    end = min(file_size, 8 + struct.unpack("<I", riff[4:8])[0])
+    rewritten = 0
+    offset = 12
+    while offset + 8 <= end:
+        target.seek(offset)
+        chunk_id, size = struct.unpack("<4sI", read_exact(target, 8))
+        if chunk_id in WAV_DROP_CHUNKS or (chunk_id == b"LIST" and target.read(4) == b"INFO"):
+            target.seek(offset)
+            target.write(b"JUNK")
+            target.seek(offset + 8)
+            write_zeros(target, min(size, end - offset - 8))
+            rewritten += 8 + size
+        offset += 8 + size + (size & 1)
+    return rewritten, 0
+
+
+def strip_audio_metadata(filepath):
+    # Devuelve (bytes reescritos, bytes truncados), o None si el formato no
+    # se puede limpiar sin reescribir el archivo.
+    with open(filepath, "rb") as source:
+        signature = source.read(MPEG_SNIFF_SIZE)
+        if signature[:3] == b"ID3":
+            size = 10 + syncsafe(signature[6:10])
+            source.seek(size + (10 if signature[5] & 0x10 else 0))
+            following = source.read(4)
+        else:
+            following = b""
+    if signature[:4] == b"fLaC" or following == b"fLaC":
+        stripper = strip_flac
+    elif signature[:4] == b"RIFF" and signature[8:12] == b"WAVE":
+        stripper = strip_wav
+    elif signature[:3] == b"ID3" or is_mpeg_audio(signature):
+        stripper = strip_mp3
+    else:
+        return None
+    with open(filepath, "r+b") as target:
+        return stripper(target, os.path.getsize(filepath))
@@ -0,0 +1,177 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Caché persistente de resultados de análisis. Cada archivo se identifica por
+# (ruta, tamaño, mtime, inodo) y, opcionalmente, por un hash de su contenido;
+# si no ha cambiado desde el último análisis se devuelve el resultado guardado
+# sin volver a abrir el documento.
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+DEFAULT_MAX_ENTRIES = 500000
+DEFAULT_MAX_AGE_DAYS = 90
+COMMIT_EVERY = 500
+HASH_BUFFER_SIZE = 1024 * 1024
+# Campos que solo valen para la ejecución que los produjo: los tiempos
+# medidos y el representante de un duplicado
+UNCACHED_FIELDS = ("filename", "cached", "timing", "duplicate_of")
+
+
+def default_cache_path():
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ThotClean", "metadata_cache.sqlite")
+
+
+def file_identity(file_path):
+    stats = os.stat(file_path)
+    return stats.st_size, stats.st_mtime_ns, stats.st_ino
+
+
+def content_hash(file_path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_BUFFER_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MetadataCache:
+    def __init__(self, path=None, use_hash=False, max_entries=DEFAULT_MAX_ENTRIES, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.path = path or default_cache_path()
+        self.use_hash = use_hash
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self.pending_writes = 0
+        self.touched = []
+        self.hashes = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " inode INTEGER NOT NULL,"
+            " hash TEXT,"
+            " result TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+
+    def lookup(self, file_path):
+        key = os.path.abspath(file_path)
+        try:
+            size, mtime_ns, inode = file_identity(file_path)
+        except OSError:
+            self.misses += 1
+            return None
+
+        row = self.connection.execute(
+            "SELECT size, mtime_ns, inode, hash, result FROM entries WHERE path = ?", (key,)
+        ).fetchone()
+        digest = None
+        if self.use_hash:
+            digest = content_hash(file_path)
+            self.hashes[key] = digest
+
+        if row is None or row[:3] != (size, mtime_ns, inode) or (self.use_hash and row[3] != digest):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.touched.append((time.time(), key))
+        result = json.loads(row[4])
+        # Entradas guardadas por versiones que conservaban estos campos
+        for name in UNCACHED_FIELDS:
+            result.pop(name, None)
+        result["filename"] = file_path
+        result["cached"] = True
+        return result
+
+    def store(self, result):
+        identity = result.get("identity")
+        if not identity:
+            return
+        key = os.path.abspath(result["filename"])
+        digest = self.hashes.pop(key, None)
+        if self.use_hash and digest is None:
+            digest = content_hash(result["filename"])
+        stored = {name: value for name, value in result.items() if name not in UNCACHED_FIELDS}
+        self.connection.execute(
+            "INSERT OR REPLACE INTO entries (path, size, mtime_ns, inode, hash, result, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, identity[0], identity[1], identity[2], digest, json.dumps(stored, default=str), time.time())
+        )
+        self.pending_writes += 1
+        if self.pending_writes >= COMMIT_EVERY:
+            self.flush()
+
+    def flush(self):
+        if self.touched:
+            self.connection.executemany("UPDATE entries SET last_used = ? WHERE path = ?", self.touched)
+            self.touched = []
+        self.connection.commit()
+        self.pending_writes = 0
+
+    def evict(self):
+        # Primero las entradas no usadas en max_age_days y después las menos
+        # usadas recientemente hasta quedar por debajo de max_entries.
+        if self.max_age_days:
+            limit = time.time() - self.max_age_days * 86400
+            self.connection.execute("DELETE FROM entries WHERE last_used < ?", (limit,))
+        if self.max_entries:
+            count = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                self.connection.execute(
+                    "DELETE FROM entries WHERE path IN (SELECT path FROM entries ORDER BY last_used LIMIT ?)", (excess,)
+                )
+        self.connection.commit()
+
+    def invalidate(self, path_prefix=None):
+        if path_prefix is None:
+            self.connection.execute("DELETE FROM entries")
+        else:
+            prefix = os.path.abspath(path_prefix)
+            self.connection.execute(
+                "DELETE FROM entries WHERE path = ? OR substr(path, 1, ?) = ?",
+                (prefix, len(prefix) + 1, os.path.join(prefix, ""))
+            )
+        self.connection.commit()
+
+    def close(self):
+        self.flush()
+        self.evict()
+        self.connection.close()
+
+    def summary(self):
+        total = self.hits + self.misses
+        ratio = self.hits / total * 100 if total else 0
+        return f"Caché: {self.hits} aciertos, {self.misses} fallos ({ratio:.1f}% aciertos)"
@@ -0,0 +1,376 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Funciones de análisis y limpieza de metadatos sin dependencia de wx, para que
+# puedan usarse tanto desde la interfaz gráfica como desde thot_engine en
+# servidores sin entorno gráfico. Las bibliotecas de cada formato se importan
+# dentro de sus funciones (ver thot_formats).
+
+import os
+import sys
+from datetime import datetime
+import zipfile
+from thot_formats import FormatHandler, register_format, detect_handler
+from thot_instrument import record_exception
+from thot_sniff import HEADER_SIZE
+from thot_io import open_input
+from thot_walk import Walker
+
+
+def log_to_stderr(message):
+    sys.stderr.write(message if message.endswith("\n") else message + "\n")
+
+
+def plain_value(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(key): plain_value(item) for key, item in value.items()}
+    return str(value)
+
+
+def plain_metadata(metadata):
+    # Los objetos de PyPDF2, mutagen o hachoir mantienen referencias al parser
+    # y no siempre se pueden serializar entre procesos: se convierten a tipos
+    # básicos en cuanto se extraen para que el parser se libere.
+    if metadata is None or isinstance(metadata, str):
+        return metadata
+    if hasattr(metadata, "keys"):
+        return {str(key): plain_value(metadata[key]) for key in metadata.keys()}
+    return str(metadata)
+
+
+def analyze_metadata(filepath, log=None):
+    log = log or log_to_stderr
+    try:
+        handler, header = detect_handler(filepath)
+        if handler is None or handler.analyze is None:
+            return None
+        return handler.analyze(filepath, log, header)
+    except Exception as e:
+        record_exception(e)
+        log(f"ERROR: Error inesperado al analizar los metadatos: {e}")
+
+
+def analyze_pdf(filepath, log, header=None):
+    from PyPDF2 import PdfReader
+
+    with open_input(filepath) as file:
+        pdf = PdfReader(file)
+        if pdf.is_encrypted:
+            log(f"Advertencia: El documento está firmado digitalmente. No se puede analizar.\n")
+        info = pdf.metadata
+        return info
+
+
+# Etiquetas mostradas para cada propiedad de docProps/core.xml, en el orden
+# de presentación de cada formato.
+WORD_CORE_LABELS = [
+    ("Identificador", "identifier"),
+    ("Título", "title"),
+    ("Tema", "subject"),
+    ("Autor", "creator"),
+    ("Última modificación", "lastModifiedBy"),
+    ("Fecha de creación", "created"),
+    ("Última modificación", "modified"),
+    ("Categoría", "category"),
+    ("Idioma", "language"),
+    ("Estado del contenido", "contentStatus"),
+    ("Palabras clave", "keywords"),
+    ("Revisión", "revision"),
+    ("Última impresión", "lastPrinted"),
+    ("Comentarios", "description"),
+    ("Versión", "version")
+]
+EXCEL_CORE_LABELS = [
+    ("Identificador", "identifier"),
+    ("Título", "title"),
+    ("Tema", "subject"),
+    ("Descripción", "description"),
+    ("Autor", "creator"),
+    ("Última modificación", "lastModifiedBy"),
+    ("Fecha de creación", "created"),
+    ("Última modificación", "modified"),
+    ("Categoría", "category"),
+    ("Idioma", "language"),
+    ("Estado del contenido", "contentStatus"),
+    ("Palabras clave", "keywords"),
+    ("Revisión", "revision"),
+    ("Última impresión", "lastPrinted"),
+    ("Versión", "version")
+]
+POWERPOINT_CORE_LABELS = WORD_CORE_LABELS[:10] + [("Tipo de contenido", "contentType")] + WORD_CORE_LABELS[10:]
+# Propiedades de docProps/app.xml que pueden identificar al autor o la empresa
+APP_LABELS = [
+    ("Aplicación", "Application"),
+    ("Versión de la aplicación", "AppVersion"),
+    ("Empresa", "Company"),
+    ("Responsable", "Manager"),
+    ("Plantilla", "Template"),
+    ("Tiempo total de edición", "TotalTime")
+]
+
+
+def analyze_office(filepath, core_labels):
+    from thot_ooxml import read_package_properties
+
+    core, app, custom = read_package_properties(filepath)
+    metadata = {label: core.get(name) or "N/A" for label, name in core_labels}
+    for label, name in APP_LABELS:
+        if name in app:
+            metadata[label] = app[name]
+    for name, value in custom.items():
+        metadata[f"Personalizada: {name}"] = value or "N/A"
+    return metadata
+
+
+def analyze_docx(filepath, log, header=None):
+    return analyze_office(filepath, WORD_CORE_LABELS)
+
+
+def analyze_xlsx(filepath, log, header=None):
+    return analyze_office(filepath, EXCEL_CORE_LABELS)
+
+
+def analyze_pptx(filepath, log, header=None):
+    return analyze_office(filepath, POWERPOINT_CORE_LABELS)
+
+
+def analyze_image(filepath, log, header=None):
+    import io
+    from PIL import Image
+
+    # Si el archivo entero cabe en la cabecera ya leída no se vuelve a abrir
+    if header is not None and len(header) < HEADER_SIZE:
+        image = Image.open(io.BytesIO(header))
+    else:
+        image = Image.open(filepath)
+    metadata = image.info
+    return metadata
+
+
+def creation_time(estadisticas):
+    # st_birthtime no existe en Linux; en Windows st_ctime es la creación
+    timestamp = getattr(estadisticas, "st_birthtime", None)
+    if timestamp is None and os.name == "nt":
+        timestamp = estadisticas.st_ctime
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S") if timestamp is not None else "N/A"
+
+
+def analyze_zip(filepath, log, header=None):
+    from thot_archive import analyze_archive
+
+    # Un zip dentro de otro llega como archivo abierto y no tiene stat propio
+    if hasattr(filepath, "read"):
+        return analyze_archive(filepath, log)
+    estadisticas = os.stat(filepath)
+    metadata = {
+        "Ruta": os.path.abspath(filepath) or "N/A",
+        "Tamaño": estadisticas.st_size or "N/A",
+        "Fecha de creación": creation_time(estadisticas),
+        "Última modificación": datetime.fromtimestamp(estadisticas.st_mtime).strftime("%Y-%m-%d %H:%M:%S") or "N/A",
+        "Último acceso": datetime.fromtimestamp(estadisticas.st_atime).strftime("%Y-%m-%d %H:%M:%S") or "N/A",
+        "Modo permisos": estadisticas.st_mode or "N/A",  
+        "Número inodo": estadisticas.st_ino or "N/A",  
+        "Dispositivo": estadisticas.st_dev or "N/A",  
+        "Número enlaces": estadisticas.st_nlink or "N/A",  
+        "Propietario UID": estadisticas.st_uid or "N/A",
+        "Grupo GID": estadisticas.st_gid or "N/A"
+    }
+    metadata.update(analyze_archive(filepath, log))
+    return metadata
+
+
+def analyze_audio(filepath, log, header=None):
+    from mutagen import File as MutagenFile
+
+    audio = MutagenFile(filepath)
+    return audio.tags if audio else "No tags found"
+
+
+def analyze_video(filepath, log, header=None):
+    from hachoir.parser import createParser, guessParser
+    from hachoir.metadata import extractMetadata
+    from hachoir.stream import InputIOStream
+
+    if hasattr(filepath, "read"):
+        filepath.seek(0)
+        parser = guessParser(InputIOStream(filepath))
+    else:
+        parser = createParser(filepath)
+    if not parser:
+        return "Unable to parse video file"
+    metadata = extractMetadata(parser)
+    return metadata.exportDictionary() if metadata else "No metadata found"
+
+
+def remove_metadata_pdf(filepath, log=None):
+    from PyPDF2 import PdfReader
+    from thot_pdf import strip_pdf_metadata
+
+    log = log or log_to_stderr
+    try:
+        with open(filepath, "rb") as file:
+            encrypted = PdfReader(file).is_encrypted
+        if encrypted:
+            log(f"Advertencia: El documento PDF está firmado digitalmente. No se pueden eliminar los metadatos.\n")
+            return
+        strip_pdf_metadata(filepath)
+    except Exception as e:
+        record_exception(e)
+        log(f"ERROR: Error inesperado al eliminar metadatos del PDF: {e}")
+
+
+def remove_metadata_audio(filepath, log=None):
+    from thot_audio import strip_audio_metadata
+
+    log = log or log_to_stderr
+    # MP3, FLAC y WAV se limpian en el propio archivo sin mover el audio
+    result = strip_audio_metadata(filepath)
+    if result is not None:
+        rewritten, truncated = result
+        log(f"Audio: {rewritten} bytes de etiquetas reescritos y {truncated} truncados; datos de audio sin modificar.")
+        return
+
+    from mutagen import File as MutagenFile
+
+    audio = MutagenFile(filepath, easy=True)
+    if not audio:
+        return f"No metadata found in {filepath}."
+    
+    audio.delete()
+    audio.save()
+
+
+def remove_metadata_video(filepath, log=None):
+    from thot_video import strip_video_metadata
+
+    # MP4/MOV, Matroska y AVI se limpian recorriendo las cajas, elementos o
+    # chunks del contenedor
+    if strip_video_metadata(filepath) is None:
+        raise ValueError("Contenedor de vídeo no reconocido; no se modifica")
+
+def remove_metadata_office(filepath, log=None):
+    log = log or log_to_stderr
+
+    if not zipfile.is_zipfile(filepath):
+        log(f"Formato de archivo no soportado para eliminación de metadatos\n")
+        return
+
+    from thot_ooxml import strip_package_metadata
+    strip_package_metadata(filepath)
+
+def deep_clean_office(filepath, log=None):
+    log = log or log_to_stderr
+
+    if not zipfile.is_zipfile(filepath):
+        log(f"Formato de archivo no soportado para eliminación de metadatos\n")
+        return
+
+    from thot_ooxml_deep import deep_clean_package
+    log(deep_clean_package(filepath).summary())
+
+def remove_metadata_image(filepath, log=None):
+    from thot_images import strip_image_metadata
+
+    # JPEG, PNG y WebP se limpian por segmentos, sin volver a codificar
+    if strip_image_metadata(filepath) is not None:
+        return
+
+    from PIL import Image
+
+    image = Image.open(filepath)
+    info = image.info
+    if info:
+        image.info.clear()
+    image.save(filepath)
+
+def remove_metadata_file(filepath, log=None, deep=False):
+    try:
+        handler, header = detect_handler(filepath)
+        if handler is None or handler.remove is None:
+            return f"Archivo: {os.path.basename(filepath)} - Tipo de archivo no soportado para eliminación de metadatos."
+        if deep and handler.deep_remove is not None:
+            handler.deep_remove(filepath, log)
+        else:
+            handler.remove(filepath, log)
+        return f"Archivo: {os.path.basename(filepath)} - Los metadatos se eliminaron correctamente."
+    except Exception as e:
+        record_exception(e)
+        return f"ERROR: No se pudo procesar el archivo {os.path.basename(filepath)}. Error: {e}"
+
+
+
+def remove_metadata_directory(directory_path, log=None):
+    try:
+        info_list = []
+        for file_path in Walker([directory_path]):
+            try:
+                result = remove_metadata_file(file_path, log)  
+                if result:
+                    info_list.append(result)
+                else:
+                    info_list.append(f"Archivo: {file_path} - No se pudo eliminar los metadatos o no es compatible.")
+            except Exception as file_error:
+                info_list.append(f"ERROR: No se pudo procesar {file_path}. Error: {file_error}")
+        return info_list
+    except Exception as e:
+        return [f"Error general al procesar el directorio: {e}"]
+
+
+
+
+def analyze_metadata_directory(directory_path, log=None):
+    log = log or log_to_stderr
+    try:
+        info_list = []
+        for file_path in Walker([directory_path]):
+            info = analyze_metadata(file_path, log)
+            info_list.append({
+                "filename": file_path,
+                "metadata": plain_metadata(info)
+            })
+        return info_list
+    except Exception as e:
+        log(f"ERROR: Error analyzing files in directory: {e}\n")
+
+
+# mutagen.File importa todos sus formatos en la primera llamada
+MUTAGEN_MODULES = [
+    "mutagen." + name for name in (
+        "aac", "ac3", "aiff", "apev2", "asf", "dsdiff", "dsf", "easyid3", "easymp4", "flac", "id3", "monkeysaudio", "mp3", "mp4",
+        "musepack", "oggflac", "oggopus", "oggspeex", "oggtheora", "oggvorbis", "optimfrog", "smf", "tak", "trueaudio", "wave", "wavpack"
+    )
+]
+
+register_format(FormatHandler("PDF", ['.pdf'], ["PyPDF2"], analyze_pdf, remove_metadata_pdf, imports=["PyPDF2", "thot_pdf"]))
+register_format(FormatHandler("Word", ['.docx'], [], analyze_docx, remove_metadata_office, deep_remove=deep_clean_office,
+                              imports=["thot_ooxml", "thot_ooxml_deep"]))
+register_format(FormatHandler("Excel", ['.xlsx'], [], analyze_xlsx, remove_metadata_office, deep_remove=deep_clean_office,
+                              imports=["thot_ooxml", "thot_ooxml_deep"]))
+register_format(FormatHandler("PowerPoint", ['.pptx'], [], analyze_pptx, remove_metadata_office, deep_remove=deep_clean_office,
+                              imports=["thot_ooxml", "thot_ooxml_deep"]))
+register_format(FormatHandler("Imagen", ['.jpg', '.jpeg', '.png', '.webp', '.tif', '.tiff'], ["PIL"], analyze_image, remove_metadata_image,
+                              kinds=["jpeg", "png", "webp", "tiff"],
+                              imports=["PIL.Image", "PIL.JpegImagePlugin", "PIL.PngImagePlugin", "PIL.TiffImagePlugin", "PIL.WebPImagePlugin",
+                                       "thot_images"]))
+register_format(FormatHandler("ZIP", ['.zip'], [], analyze_zip, imports=["thot_archive"]))
+register_format(FormatHandler("Audio", ['.mp3', '.flac', '.wav', '.ogg'], ["mutagen"], analyze_audio, remove_metadata_audio,
+                              imports=["mutagen", *MUTAGEN_MODULES, "thot_audio"]))
+register_format(FormatHandler("Vídeo", ['.mp4', '.mkv', '.avi', '.mov'], ["hachoir"], analyze_video, remove_metadata_video,
+                              imports=["hachoir.parser", "hachoir.metadata", "hachoir.stream", "thot_video"]))
@@ -0,0 +1,160 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Detección de archivos idénticos mientras se recorre una carpeta. Se agrupan
+# por tamaño; dentro de cada tamaño repetido se compara un hash parcial
+# (principio y final del archivo) y solo si coincide se confirma con el hash
+# completo. Los enlaces duros (mismo dispositivo e inodo) son idénticos sin
+# necesidad de leerlos.
+#
+# El primer archivo de cada contenido se procesa en cuanto aparece, sin
+# esperar al resto del recorrido. Al limpiar, el hash parcial del
+# representante se toma antes; si hace falta el completo (archivos de más de
+# 128 KB) y el representante ya se ha limpiado, la copia ya no coincide y se
+# limpia por su cuenta: el resultado es correcto, solo que no se ahorra ese
+# trabajo.
+
+import hashlib
+import os
+
+from thot_cache import content_hash
+
+PARTIAL_SIZE = 64 * 1024
+
+
+def partial_hash(file_path, size):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as file:
+        digest.update(file.read(PARTIAL_SIZE))
+        if size > PARTIAL_SIZE:
+            file.seek(max(PARTIAL_SIZE, size - PARTIAL_SIZE))
+            digest.update(file.read(PARTIAL_SIZE))
+    return digest.hexdigest()
+
+
+class DedupStats:
+    def __init__(self):
+        self.files = 0
+        self.groups = 0
+        self.duplicates = 0
+        self.hard_links = 0
+        self.saved_bytes = 0
+        self.partial_hashes = 0
+        self.full_hashes = 0
+
+    def summary(self):
+        megabytes = self.saved_bytes / (1024 * 1024)
+        return (
+            f"Duplicados: {self.duplicates} de {self.files} archivos ({megabytes:.1f} MB) resueltos sin volver a procesarlos, "
+            f"en {self.groups} grupos ({self.hard_links} enlaces duros); "
+            f"{self.partial_hashes} hashes parciales y {self.full_hashes} completos"
+        )
+
+
+class Representative:
+    # Primer archivo de un contenido. Los hashes se calculan solo cuando
+    # aparece otro archivo del mismo tamaño, y una sola vez.
+    __slots__ = ("path", "inode", "partial", "full", "copies")
+
+    def __init__(self, path, inode, partial=None):
+        self.path = path
+        self.inode = inode
+        self.partial = partial
+        self.full = None
+        self.copies = 0
+
+
+def find_identical(file_paths, stats=None, snapshot=False):
+    # Genera (ruta, representante) según llegan las rutas. representante es
+    # None si el archivo es el primero con ese contenido, y entonces se
+    # procesa ya; si no, es la ruta del archivo idéntico visto antes. Así no
+    # hay que esperar a recorrer toda la carpeta: solo se leen los archivos
+    # cuyo tamaño ya ha aparecido, y se comparan con los representantes de
+    # ese tamaño por inodo, hash parcial y, si el archivo es mayor que lo que
+    # cubre el hash parcial, hash completo. Con snapshot (limpieza) el hash
+    # parcial de cada representante se toma antes de entregarlo, porque
+    # después se modifica.
+    stats = stats if stats is not None else DedupStats()
+    by_size = {}
+    for file_path in file_paths:
+        try:
+            info = os.stat(file_path)
+        except OSError:
+            yield file_path, None
+            continue
+        stats.files += 1
+        size = info.st_size
+        inode = (info.st_dev, info.st_ino)
+        representatives = by_size.get(size)
+        if representatives is None:
+            representative = Representative(file_path, inode)
+            if snapshot:
+                try:
+                    representative.partial = partial_hash(file_path, size)
+                    stats.partial_hashes += 1
+                except OSError:
+                    pass
+            by_size[size] = [representative]
+            yield file_path, None
+            continue
+
+        match, partial = find_match(file_path, size, inode, representatives, stats)
+        if match is None:
+            representatives.append(Representative(file_path, inode, partial))
+            yield file_path, None
+            continue
+        if match.copies == 0:
+            stats.groups += 1
+        match.copies += 1
+        stats.duplicates += 1
+        stats.saved_bytes += size
+        yield file_path, match.path
+
+
+def find_match(file_path, size, inode, representatives, stats):
+    # Devuelve (representante idéntico o None, hash parcial del archivo)
+    for representative in representatives:
+        if representative.inode == inode:
+            stats.hard_links += 1
+            return representative, None
+    try:
+        partial = partial_hash(file_path, size)
+        stats.partial_hashes += 1
+    except OSError:
+        return None, None
+    full = None
+    for representative in representatives:
+        try:
+            if representative.partial is None:
+                representative.partial = partial_hash(representative.path, size)
+                stats.partial_hashes += 1
+            if representative.partial != partial:
+                continue
+            if size <= 2 * PARTIAL_SIZE:
+                return representative, partial
+            if full is None:
+                full = content_hash(file_path)
+                stats.full_hashes += 1
+            if representative.full is None:
+                representative.full = content_hash(representative.path)
+                stats.full_hashes += 1
+            if representative.full == full:
+                return representative, partial
+        except OSError:
+            continue
+    return None, partial
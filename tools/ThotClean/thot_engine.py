@@ -0,0 +1,423 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Motor por lotes de ThotClean sin interfaz gráfica. Reparte el análisis y la
+# limpieza de cada archivo entre varios procesos y devuelve los resultados en
+# el orden en que terminan. No importa wx, por lo que funciona en servidores.
+#
+# Uso:
+#   python thot_engine.py analyze <ruta> [<ruta> ...] [-j N] [-q]
+#   python thot_engine.py clean <ruta> [<ruta> ...] [-j N] [-q]
+#   python thot_engine.py formats
+#   python thot_engine.py profile <archivo> [--profile-clean] [--profiler pyinstrument]
+#   python thot_engine.py watch <carpeta> [<carpeta> ...] [--debounce S] [--poll]
+#
+# El análisis usa la caché de thot_cache salvo que se indique --no-cache.
+# Con --report informe.jsonl|.csv|.parquet cada resultado se escribe en el
+# informe en cuanto termina (ver thot_report). Con --dedup los archivos
+# idénticos se procesan una sola vez (ver thot_dedup). Con --timing se mide
+# cada archivo y se muestran los tiempos por extensión y los más lentos (ver
+# thot_instrument). Las carpetas se recorren con thot_walk, que admite filtros
+# (--include, --exclude, --min-size, --max-depth...) y descarta los archivos
+# que no son de ningún formato soportado salvo con --all-files. El comando
+# watch limpia los archivos según llegan a las carpetas (ver thot_watch). Con
+# --deep la limpieza de Office también recorre el contenido (ver
+# thot_ooxml_deep).
+
+import argparse
+import os
+import signal
+import sys
+import time
+from collections import OrderedDict, deque
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from thot_core import analyze_metadata, remove_metadata_file, plain_metadata
+from thot_cache import MetadataCache, file_identity
+from thot_dedup import DedupStats, find_identical
+from thot_formats import available_formats
+from thot_instrument import TimingReport, profile_file, run_instrumented
+from thot_io import clone_file
+from thot_report import open_report
+from thot_walk import Walker, add_walk_arguments, walk_options
+from thot_watch import FolderWatcher, DEBOUNCE, POLL_INTERVAL
+
+# Resultados de representantes que se guardan por si aparece una copia más
+# adelante en el recorrido; las copias de uno ya olvidado se procesan aparte
+RESULTS_KEPT = 10000
+
+
+def file_size(file_path):
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
+
+
+def identity_or_none(file_path):
+    try:
+        return file_identity(file_path)
+    except OSError:
+        return None
+
+
+def analyze_job(file_path):
+    warnings = []
+    # La identidad se toma antes de analizar: si el archivo cambia durante el
+    # análisis, la entrada de la caché no coincidirá en el siguiente escaneo.
+    identity = identity_or_none(file_path)
+    info = analyze_metadata(file_path, warnings.append)
+    return {
+        "filename": file_path,
+        "metadata": plain_metadata(info),
+        "warnings": warnings,
+        "size": identity[0] if identity else 0,
+        "identity": identity
+    }
+
+
+def clean_job(file_path, deep=False):
+    warnings = []
+    identity = identity_or_none(file_path)
+    message = remove_metadata_file(file_path, warnings.append, deep)
+    if not message:
+        message = f"Archivo: {file_path} - No se pudo eliminar los metadatos o no es compatible."
+    return {
+        "filename": file_path,
+        "message": message,
+        "warnings": warnings,
+        "size": identity[0] if identity else 0,
+        # Si el archivo no cambió (formato no soportado, sin metadatos...) no
+        # hay nada que copiar a sus duplicados.
+        "modified": identity_or_none(file_path) != identity
+    }
+
+
+def deep_clean_job(file_path):
+    return clean_job(file_path, deep=True)
+
+
+def run_jobs(job, file_paths, workers=None, cancel_event=None, lookup=None, instrument=False):
+    # cancel_event (threading.Event) detiene el trabajo en el siguiente límite
+    # de archivo: no se lanzan más tareas y las pendientes se descartan.
+    # lookup(file_path) puede devolver un resultado ya conocido, que se entrega
+    # directamente sin pasar por el pool. Con instrument cada resultado lleva
+    # sus tiempos en "timing".
+    workers = workers or os.cpu_count() or 1
+    if instrument:
+        job = partial(run_instrumented, job)
+    cancelled = cancel_event.is_set if cancel_event is not None else lambda: False
+    if workers == 1:
+        for file_path in file_paths:
+            if cancelled():
+                return
+            cached = lookup(file_path) if lookup else None
+            yield cached if cached is not None else job(file_path)
+        return
+
+    # Se limita el número de tareas pendientes para no encolar de golpe los
+    # cientos de miles de archivos de un recurso compartido.
+    max_pending = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        try:
+            for file_path in file_paths:
+                if cancelled():
+                    return
+                cached = lookup(file_path) if lookup else None
+                if cached is not None:
+                    yield cached
+                    continue
+                pending.add(executor.submit(job, file_path))
+                if len(pending) < max_pending:
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            while pending and not cancelled():
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def failed(result):
+    message = result.get("message") or ""
+    return message.startswith("ERROR") or any(w.startswith("ERROR") for w in result.get("warnings", []))
+
+
+def duplicate_result(job, result, file_path):
+    # Resultado de un archivo idéntico al ya procesado en result: el análisis
+    # se copia y la limpieza copia los bytes ya limpios del representante.
+    source = result["filename"]
+    if job is not analyze_job:
+        if failed(result):
+            return job(file_path)
+        if result.get("modified"):
+            clone_file(source, file_path)
+            message = f"Archivo: {os.path.basename(file_path)} - Los metadatos se eliminaron correctamente (copia de {source})."
+        else:
+            message = result["message"].replace(os.path.basename(source), os.path.basename(file_path), 1)
+        duplicate = dict(result, filename=file_path, message=message, warnings=[], size=file_size(file_path))
+        duplicate.pop("timing", None)
+    else:
+        duplicate = dict(result, filename=file_path, warnings=list(result.get("warnings", [])))
+        duplicate.pop("cached", None)
+        duplicate.pop("timing", None)
+        duplicate["identity"] = identity_or_none(file_path)
+    duplicate["duplicate_of"] = source
+    return duplicate
+
+
+def run_deduplicated(job, file_paths, workers=None, cancel_event=None, lookup=None, stats=None, instrument=False):
+    # Solo se procesa el primer archivo de cada contenido; sus copias reciben
+    # su resultado en cuanto están las dos cosas: el resultado y la copia.
+    done = OrderedDict()
+    waiting = {}
+    ready = deque()
+    cancelled = cancel_event.is_set if cancel_event is not None else lambda: False
+
+    def representatives():
+        for file_path, representative in find_identical(file_paths, stats, snapshot=job is not analyze_job):
+            if representative is None:
+                waiting[file_path] = []
+                yield file_path
+            elif representative in done:
+                done.move_to_end(representative)
+                ready.append((done[representative], file_path))
+            elif representative in waiting:
+                waiting[representative].append(file_path)
+            else:
+                # Su resultado ya no se guarda: se procesa como uno más
+                if stats is not None:
+                    stats.duplicates -= 1
+                    stats.saved_bytes -= file_size(file_path)
+                yield file_path
+
+    for result in run_jobs(job, representatives(), workers, cancel_event, lookup, instrument):
+        yield result
+        filename = result["filename"]
+        for file_path in waiting.pop(filename, ()):
+            ready.append((result, file_path))
+        done[filename] = result
+        if len(done) > RESULTS_KEPT:
+            done.popitem(last=False)
+        while ready:
+            if cancelled():
+                return
+            source, file_path = ready.popleft()
+            yield duplicate_result(job, source, file_path)
+    while ready and not cancelled():
+        source, file_path = ready.popleft()
+        yield duplicate_result(job, source, file_path)
+
+
+def analyze_files(file_paths, workers=None, cancel_event=None, cache=None, dedup=None, instrument=False):
+    # dedup (DedupStats) activa la deduplicación y recoge sus estadísticas
+    lookup = cache.lookup if cache is not None else None
+    if dedup is not None:
+        results = run_deduplicated(analyze_job, file_paths, workers, cancel_event, lookup, dedup, instrument)
+    else:
+        results = run_jobs(analyze_job, file_paths, workers, cancel_event, lookup, instrument)
+    for result in results:
+        if cache is not None and not result.get("cached"):
+            cache.store(result)
+        yield result
+
+
+class BatchStats:
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+
+    def add(self, result):
+        self.files += 1
+        self.bytes += result.get("size", 0)
+        if failed(result):
+            self.errors += 1
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def summary(self):
+        elapsed = max(self.elapsed(), 1e-9)
+        megabytes = self.bytes / (1024 * 1024)
+        return (
+            f"Procesados {self.files} archivos ({megabytes:.1f} MB) en {elapsed:.2f} s - "
+            f"{self.files / elapsed:.1f} archivos/s, {megabytes / elapsed:.1f} MB/s, "
+            f"{self.errors} errores"
+        )
+
+
+def format_analysis(result):
+    lines = [f"Archivo: {result['filename']}"]
+    metadata = result["metadata"]
+    if isinstance(metadata, dict):
+        for key, value in metadata.items():
+            lines.append(f"  {key}: {value}")
+    elif metadata is not None:
+        lines.append(f"  {metadata}")
+    for warning in result["warnings"]:
+        lines.append(f"  {warning.rstrip()}")
+    return "\n".join(lines) + "\n"
+
+
+def format_clean(result):
+    lines = [result["message"]]
+    for warning in result["warnings"]:
+        lines.append(f"  {warning.rstrip()}")
+    return "\n".join(lines)
+
+
+def watch(args):
+    for path in args.paths:
+        if not os.path.isdir(path):
+            print(f"ERROR: {path} no es una carpeta", file=sys.stderr)
+            return 1
+    log = lambda message: print(message, file=sys.stderr, flush=True)
+    watcher = FolderWatcher(args.paths, deep_clean_job if args.deep else clean_job, args.workers, walk_options(args), args.debounce,
+                            args.poll, args.poll_interval, log)
+    report = open_report(args.report) if args.report else None
+
+    def on_result(result):
+        if report is not None:
+            report.write(result)
+        if not args.quiet:
+            print(format_clean(result), flush=True)
+
+    # Como servicio se detiene con SIGTERM; se termina el archivo en curso
+    signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+    try:
+        watcher.run(on_result, args.initial_scan, args.stats_interval, lambda stats: log(stats.summary()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if report is not None:
+            report.close()
+    print(watcher.stats.summary())
+    return 1 if watcher.stats.errors else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="thot_engine", description="Análisis y limpieza de metadatos por lotes.")
+    parser.add_argument("command", choices=["analyze", "clean", "formats", "profile", "watch"], help="analyze: mostrar metadatos, clean: eliminarlos, formats: listar formatos soportados, profile: perfilar un archivo, watch: limpiar los archivos según llegan")
+    parser.add_argument("paths", nargs="*", help="Archivos o carpetas a procesar")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Número de procesos (por defecto, uno por núcleo)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Mostrar solo el resumen final")
+    parser.add_argument("--no-cache", action="store_true", help="Analizar todos los archivos sin usar la caché")
+    parser.add_argument("--clear-cache", action="store_true", help="Vaciar la caché antes de empezar")
+    parser.add_argument("--cache-path", default=None, help="Ruta del archivo de caché")
+    parser.add_argument("--hash", action="store_true", help="Comprobar también el hash del contenido en la caché")
+    parser.add_argument("--dedup", action="store_true", help="Procesar una sola vez los archivos con el mismo contenido. Los archivos se procesan según aparecen; se leen los de tamaño repetido, y al limpiar una copia de más de 128 KB que aparece después de limpiar su original se limpia por su cuenta")
+    parser.add_argument("--timing", type=int, nargs="?", const=10, default=None, metavar="N", help="Medir cada archivo y mostrar los tiempos por extensión y los N más lentos")
+    parser.add_argument("--profiler", choices=["cprofile", "pyinstrument"], default="cprofile", help="Perfilador para el comando profile")
+    parser.add_argument("--profile-output", default=None, help="Archivo de salida del perfil (por defecto, <archivo>.prof o .html)")
+    parser.add_argument("--profile-clean", action="store_true", help="Perfilar la limpieza en lugar del análisis")
+    parser.add_argument("--deep", action="store_true", help="Limpieza profunda: en Office también autores de cambios y comentarios, revisiones, customXml e imágenes incrustadas")
+    parser.add_argument("--report", default=None, help="Escribir un informe (.jsonl, .csv o .parquet) a medida que terminan los archivos")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE, help="watch: segundos sin cambios antes de limpiar un archivo")
+    parser.add_argument("--poll", action="store_true", help="watch: comparar las carpetas periódicamente en lugar de usar inotify")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL, help="watch: segundos entre comparaciones con --poll")
+    parser.add_argument("--initial-scan", action="store_true", help="watch: limpiar también los archivos que ya están en las carpetas")
+    parser.add_argument("--stats-interval", type=float, default=None, metavar="S", help="watch: mostrar la cola y la latencia cada S segundos")
+    add_walk_arguments(parser)
+    args = parser.parse_intermixed_args(argv)
+
+    if args.command == "formats":
+        for name, extensions, available in available_formats():
+            status = "disponible" if available else "no disponible (falta la biblioteca)"
+            print(f"{name}: {', '.join(extensions)} - {status}")
+        return 0
+    if not args.paths:
+        parser.error("hay que indicar al menos un archivo o carpeta")
+
+    if args.command == "profile":
+        job = (deep_clean_job if args.deep else clean_job) if args.profile_clean else analyze_job
+        for file_path in args.paths:
+            # Un análisis previo carga las bibliotecas del formato para que el
+            # perfil no mida importaciones
+            analyze_job(file_path)
+            extension = ".html" if args.profiler == "pyinstrument" else ".prof"
+            output_path = args.profile_output or os.path.basename(file_path) + extension
+            print(profile_file(job, file_path, output_path, args.profiler))
+            print(f"Perfil guardado en {output_path}")
+        return 0
+
+    if args.command == "watch":
+        return watch(args)
+
+    report = None
+    if args.report:
+        try:
+            report = open_report(args.report)
+        except (ValueError, ImportError) as e:
+            parser.error(f"no se puede crear el informe: {e}")
+
+    walker = Walker(args.paths, walk_options(args), args.walk_threads)
+    cache = None
+    dedup = DedupStats() if args.dedup else None
+    timing = TimingReport(args.timing) if args.timing else None
+    instrument = timing is not None
+    if args.command == "analyze":
+        formatter = format_analysis
+        if not args.no_cache:
+            cache = MetadataCache(args.cache_path, use_hash=args.hash)
+            if args.clear_cache:
+                cache.invalidate()
+        results = analyze_files(walker, args.workers, cache=cache, dedup=dedup, instrument=instrument)
+    else:
+        formatter = format_clean
+        job = deep_clean_job if args.deep else clean_job
+        if dedup is not None:
+            results = run_deduplicated(job, walker, args.workers, stats=dedup, instrument=instrument)
+        else:
+            results = run_jobs(job, walker, args.workers, instrument=instrument)
+
+    stats = BatchStats()
+    try:
+        for result in results:
+            stats.add(result)
+            if timing is not None:
+                timing.add(result)
+            if report is not None:
+                report.write(result)
+            if not args.quiet:
+                print(formatter(result), flush=True)
+    finally:
+        if report is not None:
+            report.close()
+        if cache is not None:
+            cache.close()
+    print(stats.summary())
+    print(walker.summary())
+    if dedup is not None:
+        print(dedup.summary())
+    if timing is not None:
+        print(timing.summary())
+    if cache is not None:
+        print(cache.summary())
+    return 1 if stats.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Registro de formatos soportados. Cada formato declara sus extensiones, las
+# bibliotecas que necesita y las funciones de análisis y limpieza; estas
+# importan su biblioteca la primera vez que se usan, de modo que arrancar
+# ThotClean (o cada proceso del pool) no obliga a cargar PyPDF2, python-docx,
+# mutagen, hachoir... si no hay archivos de ese tipo.
+#
+# El manejador de cada archivo se elige por su contenido (ver thot_sniff), no
+# por la extensión.
+
+import importlib.util
+
+from thot_sniff import sniff_file, sniff_stream
+
+
+class FormatHandler:
+    def __init__(self, name, extensions, modules=(), analyze=None, remove=None, kinds=None, deep_remove=None, imports=()):
+        # kinds: tipos detectados por thot_sniff que atiende este manejador.
+        # deep_remove: limpieza profunda opcional (contenido además de las
+        # propiedades); sin ella la limpieza profunda usa remove.
+        # imports: módulos que analyze y remove importan al usarse.
+        self.name = name
+        self.extensions = tuple(extensions)
+        self.kinds = tuple(kinds) if kinds is not None else tuple(extension[1:] for extension in extensions)
+        self.modules = tuple(modules)
+        self.analyze = analyze
+        self.remove = remove
+        self.deep_remove = deep_remove
+        self.imports = tuple(imports)
+
+    def available(self):
+        # find_spec comprueba si la biblioteca está instalada sin importarla
+        return all(importlib.util.find_spec(module) is not None for module in self.modules)
+
+    def preload(self):
+        for module in self.imports:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                pass  # el análisis o la limpieza informarán del error
+
+    def __repr__(self):
+        return f"FormatHandler({self.name!r}, {self.extensions!r})"
+
+
+FORMATS = []
+HANDLERS_BY_EXTENSION = {}
+HANDLERS_BY_KIND = {}
+
+
+def register_format(handler):
+    FORMATS.append(handler)
+    for extension in handler.extensions:
+        HANDLERS_BY_EXTENSION[extension] = handler
+    for kind in handler.kinds:
+        HANDLERS_BY_KIND[kind] = handler
+    return handler
+
+
+def load_builtin_formats():
+    # thot_core registra los formatos al importarse; se importa aquí y no
+    # arriba porque thot_core importa este módulo
+    importlib.import_module("thot_core")
+
+
+def detect_handler(filepath):
+    # Devuelve (manejador, cabecera); el manejador es None si el contenido no
+    # corresponde a ningún formato soportado.
+    kind, header = sniff_file(filepath)
+    return HANDLERS_BY_KIND.get(kind), header
+
+
+def detect_stream_handler(stream, name=""):
+    # Igual que detect_handler para un archivo abierto (miembro de un zip);
+    # name solo se usa para desempatar por extensión
+    kind, header = sniff_stream(stream, name)
+    return HANDLERS_BY_KIND.get(kind), header
+
+
+def available_formats():
+    return [(handler.name, handler.extensions, handler.available()) for handler in FORMATS]
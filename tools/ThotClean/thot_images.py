@@ -0,0 +1,165 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Eliminación de metadatos de imágenes sin decodificar los píxeles. Se recorren
+# los segmentos (JPEG) o chunks (PNG, WebP) y se copian tal cual salvo los que
+# llevan metadatos, así que la imagen resultante es idéntica píxel a píxel y
+# la memoria usada no depende de la resolución.
+
+import struct
+
+from thot_io import atomic_output, copy_bytes, read_exact
+
+# APP1 (EXIF/XMP), APP13 (IPTC/Photoshop) y COM. APP2 (perfil ICC) se
+# conserva porque afecta a cómo se muestran los colores.
+JPEG_DROP_MARKERS = {0xE1, 0xED, 0xFE}
+# Marcadores sin campo de longitud: TEM, RSTn, SOI y EOI
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8, 0xD9}
+JPEG_SOS = 0xDA
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_DROP_CHUNKS = {b"tEXt", b"iTXt", b"zTXt", b"eXIf", b"tIME"}
+
+WEBP_DROP_CHUNKS = {b"EXIF", b"XMP "}
+# Bits de VP8X que anuncian los chunks EXIF (0x08) y XMP (0x04)
+WEBP_METADATA_FLAGS = 0x08 | 0x04
+
+
+def strip_jpeg(source, target):
+    if read_exact(source, 2) != b"\xff\xd8":
+        raise ValueError("No es un JPEG")
+    target.write(b"\xff\xd8")
+    removed = 0
+
+    while True:
+        byte = read_exact(source, 1)
+        if byte != b"\xff":
+            raise ValueError("Marcador JPEG inválido")
+        marker = read_exact(source, 1)[0]
+        # Bytes de relleno 0xFF antes del marcador
+        while marker == 0xFF:
+            marker = read_exact(source, 1)[0]
+
+        if marker in JPEG_STANDALONE_MARKERS:
+            target.write(bytes((0xFF, marker)))
+            if marker == 0xD9:
+                return removed
+            continue
+
+        length_bytes = read_exact(source, 2)
+        length, = struct.unpack(">H", length_bytes)
+        if marker in JPEG_DROP_MARKERS:
+            source.seek(length - 2, 1)
+            removed += length + 2
+            continue
+
+        target.write(bytes((0xFF, marker)) + length_bytes)
+        copy_bytes(source, target, length - 2)
+        if marker == JPEG_SOS:
+            # Tras el primer SOS van los datos comprimidos (y, en los JPEG
+            # progresivos, más tablas y barridos): se copia todo sin tocar.
+            copy_rest(source, target)
+            return removed
+
+
+def strip_png(source, target):
+    if read_exact(source, 8) != PNG_SIGNATURE:
+        raise ValueError("No es un PNG")
+    target.write(PNG_SIGNATURE)
+    removed = 0
+
+    while True:
+        chunk_header = source.read(8)
+        if not chunk_header:
+            return removed
+        if len(chunk_header) != 8:
+            raise EOFError("Archivo truncado")
+        length, chunk_type = struct.unpack(">I4s", chunk_header)
+        if chunk_type in PNG_DROP_CHUNKS:
+            source.seek(length + 4, 1)
+            removed += length + 12
+            continue
+        target.write(chunk_header)
+        copy_bytes(source, target, length + 4)
+        if chunk_type == b"IEND":
+            return removed
+
+
+def strip_webp(source, target):
+    riff = read_exact(source, 12)
+    if riff[:4] != b"RIFF" or riff[8:12] != b"WEBP":
+        raise ValueError("No es un WebP")
+    # Tamaño del RIFF sin contar los 8 bytes de cabecera; se corrige al final
+    riff_size, = struct.unpack("<I", riff[4:8])
+    target.write(riff)
+    remaining = riff_size - 4
+    removed = 0
+
+    while remaining >= 8:
+        chunk_header = read_exact(source, 8)
+        chunk_type = chunk_header[:4]
+        chunk_size, = struct.unpack("<I", chunk_header[4:8])
+        padded_size = chunk_size + (chunk_size & 1)
+        remaining -= 8 + padded_size
+        if chunk_type in WEBP_DROP_CHUNKS:
+            source.seek(padded_size, 1)
+            removed += 8 + padded_size
+            continue
+        target.write(chunk_header)
+        if chunk_type == b"VP8X":
+            data = bytearray(read_exact(source, padded_size))
+            data[0] &= ~WEBP_METADATA_FLAGS & 0xFF
+            target.write(data)
+        else:
+            copy_bytes(source, target, padded_size)
+
+    target.seek(4)
+    target.write(struct.pack("<I", riff_size - removed))
+    target.seek(0, 2)
+    return removed
+
+
+def copy_rest(source, target):
+    while True:
+        chunk = source.read(1024 * 1024)
+        if not chunk:
+            return
+        target.write(chunk)
+
+
+def stripper_for(signature):
+    # signature: los 12 primeros bytes
+    if signature.startswith(b"\xff\xd8\xff"):
+        return strip_jpeg
+    if signature.startswith(PNG_SIGNATURE):
+        return strip_png
+    if signature[:4] == b"RIFF" and signature[8:12] == b"WEBP":
+        return strip_webp
+    return None
+
+
+def strip_image_metadata(filepath):
+    # Devuelve los bytes eliminados, o None si el formato no se puede limpiar
+    # a nivel de segmentos (p. ej. TIFF) y hay que usar otra vía.
+    with open(filepath, "rb") as source:
+        stripper = stripper_for(source.read(12))
+        if stripper is None:
+            return None
+        source.seek(0)
+        with atomic_output(filepath) as target:
+            return stripper(source, target)
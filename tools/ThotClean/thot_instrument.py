@@ -0,0 +1,192 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Medición opcional del tiempo de cada archivo: tiempo real y de CPU, bytes
+# leídos y escritos, y tipo de la excepción si el manejador del formato
+# falló. Los tiempos se agregan por extensión (histograma y totales) y se
+# guarda la lista de los archivos más lentos. Sin medición activa el único
+# coste es comprobar una variable en los bloques except de thot_core.
+
+import heapq
+import os
+import time
+from collections import Counter
+
+from thot_formats import HANDLERS_BY_EXTENSION, detect_handler
+
+# (límite superior en segundos, etiqueta) de cada barra del histograma
+HISTOGRAM_BUCKETS = ((0.001, "<1ms"), (0.01, "<10ms"), (0.1, "<100ms"), (1.0, "<1s"), (10.0, "<10s"), (float("inf"), ">=10s"))
+PROC_IO = "/proc/self/io"
+
+# Medición en curso en este proceso (los trabajos se ejecutan de uno en uno)
+current_sample = None
+# Manejadores cuyas bibliotecas ya se importaron en este proceso
+preloaded = set()
+
+
+def io_counters():
+    # Bytes leídos y escritos por el proceso (solo Linux)
+    try:
+        with open(PROC_IO) as file:
+            counters = dict(line.split(":") for line in file)
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def record_exception(error):
+    if current_sample is not None:
+        current_sample["exception"] = type(error).__name__
+
+
+def preload_handler(file_path):
+    # Importa las bibliotecas del formato antes de medir, como hace profile:
+    # si no, el primer archivo de cada formato en cada proceso incluiría el
+    # tiempo y la E/S de importarlas.
+    handler = HANDLERS_BY_EXTENSION.get(os.path.splitext(file_path)[1].lower())
+    if handler is None:
+        try:
+            handler = detect_handler(file_path)[0]
+        except OSError:
+            return
+    if handler is not None and handler.name not in preloaded:
+        preloaded.add(handler.name)
+        handler.preload()
+
+
+def run_instrumented(job, file_path):
+    global current_sample
+    preload_handler(file_path)
+    current_sample = sample = {"exception": None}
+    io_before = io_counters()
+    cpu_before = time.thread_time()
+    started = time.perf_counter()
+    try:
+        result = job(file_path)
+    finally:
+        current_sample = None
+    sample["wall"] = time.perf_counter() - started
+    sample["cpu"] = time.thread_time() - cpu_before
+    io_after = io_counters()
+    if io_before and io_after:
+        sample["read_bytes"] = io_after[0] - io_before[0]
+        sample["written_bytes"] = io_after[1] - io_before[1]
+    result["timing"] = sample
+    return result
+
+
+def histogram_bucket(seconds):
+    for limit, label in HISTOGRAM_BUCKETS:
+        if seconds < limit:
+            return label
+    return HISTOGRAM_BUCKETS[-1][1]
+
+
+class ExtensionTimes:
+    __slots__ = ("files", "wall", "cpu", "read_bytes", "written_bytes", "histogram", "exceptions")
+
+    def __init__(self):
+        self.files = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.read_bytes = 0
+        self.written_bytes = 0
+        self.histogram = Counter()
+        self.exceptions = Counter()
+
+
+class TimingReport:
+    def __init__(self, top=10):
+        self.top = top
+        self.extensions = {}
+        self.slowest = []
+        self.cached = 0
+
+    def add(self, result):
+        sample = result.get("timing")
+        if sample is None:
+            # Resultados de la caché o duplicados: no se ha procesado nada
+            self.cached += 1
+            return
+        filename = result["filename"]
+        extension = os.path.splitext(filename)[1].lower() or "(sin extensión)"
+        times = self.extensions.get(extension)
+        if times is None:
+            times = self.extensions[extension] = ExtensionTimes()
+        times.files += 1
+        times.wall += sample["wall"]
+        times.cpu += sample["cpu"]
+        times.read_bytes += sample.get("read_bytes", 0)
+        times.written_bytes += sample.get("written_bytes", 0)
+        times.histogram[histogram_bucket(sample["wall"])] += 1
+        if sample["exception"]:
+            times.exceptions[sample["exception"]] += 1
+
+        entry = (sample["wall"], filename, sample["cpu"], sample["exception"])
+        if len(self.slowest) < self.top:
+            heapq.heappush(self.slowest, entry)
+        elif entry > self.slowest[0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def summary(self):
+        lines = ["Tiempos por extensión:"]
+        for extension, times in sorted(self.extensions.items(), key=lambda item: -item[1].wall):
+            histogram = " ".join(f"{label}:{times.histogram[label]}" for _, label in HISTOGRAM_BUCKETS if times.histogram[label])
+            line = (
+                f"  {extension}: {times.files} archivos, {times.wall:.2f} s reales, {times.cpu:.2f} s CPU, "
+                f"{times.read_bytes / (1024 * 1024):.1f} MB leídos, {times.written_bytes / (1024 * 1024):.1f} MB escritos [{histogram}]"
+            )
+            if times.exceptions:
+                line += " - errores: " + ", ".join(f"{name} x{count}" for name, count in times.exceptions.most_common())
+            lines.append(line)
+        if self.cached:
+            lines.append(f"  {self.cached} resultados sin medir (caché o duplicados)")
+        if self.slowest:
+            lines.append(f"Los {len(self.slowest)} archivos más lentos:")
+            for wall, filename, cpu, exception in sorted(self.slowest, reverse=True):
+                suffix = f" ({exception})" if exception else ""
+                lines.append(f"  {wall * 1000:9.1f} ms  (CPU {cpu * 1000:.1f} ms)  {filename}{suffix}")
+        return "\n".join(lines)
+
+
+def profile_file(job, file_path, output_path, profiler="cprofile"):
+    # Ejecuta job(file_path) con un perfilador y guarda el resultado en
+    # output_path. Devuelve un resumen en texto de las funciones más costosas.
+    if profiler == "pyinstrument":
+        from pyinstrument import Profiler
+
+        profile = Profiler()
+        profile.start()
+        try:
+            job(file_path)
+        finally:
+            profile.stop()
+        with open(output_path, "w", encoding="utf-8") as file:
+            file.write(profile.output_html())
+        return profile.output_text(unicode=True)
+
+    import cProfile
+    import io
+    import pstats
+
+    profile = cProfile.Profile()
+    profile.runcall(job, file_path)
+    profile.dump_stats(output_path)
+    text = io.StringIO()
+    pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(20)
+    return text.getvalue()
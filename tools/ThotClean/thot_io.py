@@ -0,0 +1,117 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Utilidades de E/S compartidas por los limpiadores de formatos.
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+COPY_BUFFER_SIZE = 1024 * 1024
+# ioctl FICLONE de Linux (copia por referencia en Btrfs, XFS...)
+FICLONE = 0x40049409
+# Prefijo de los temporales de atomic_output (thot_watch los ignora)
+TEMP_PREFIX = ".thotclean_"
+
+
+@contextmanager
+def open_input(source):
+    # Acepta una ruta o un archivo ya abierto (p. ej. un miembro de un zip
+    # leído en memoria por thot_archive), que se rebobina y no se cierra.
+    if hasattr(source, "read"):
+        source.seek(0)
+        yield source
+    else:
+        with open(source, "rb") as file:
+            yield file
+
+
+@contextmanager
+def atomic_output(filepath):
+    # Se escribe en un temporal del mismo directorio (mismo sistema de
+    # archivos) y se sustituye el original con os.replace solo si todo fue
+    # bien; si algo falla el original queda intacto.
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, temp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            yield temp_file
+        shutil.copymode(filepath, temp_path)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def copy_bytes(source, target, length, buffer_size=COPY_BUFFER_SIZE):
+    while length:
+        chunk = source.read(min(buffer_size, length))
+        if not chunk:
+            raise EOFError("Archivo truncado")
+        target.write(chunk)
+        length -= len(chunk)
+
+
+def copy_range(source, target, offset, length):
+    # Copia length bytes desde la posición offset de source al final de target
+    # dentro del núcleo (copy_file_range o sendfile), sin pasar los datos por
+    # Python. Si el sistema no lo permite se copia por bloques.
+    target.flush()
+    source_fd = source.fileno()
+    target_fd = target.fileno()
+    end = offset + length
+    for name in ("copy_file_range", "sendfile"):
+        if not hasattr(os, name):
+            continue
+        try:
+            while offset < end:
+                if name == "copy_file_range":
+                    copied = os.copy_file_range(source_fd, target_fd, end - offset, offset)
+                else:
+                    copied = os.sendfile(target_fd, source_fd, offset, end - offset)
+                if not copied:
+                    raise EOFError("Archivo truncado")
+                offset += copied
+            return
+        except OSError:
+            continue
+    source.seek(offset)
+    copy_bytes(source, target, end - offset)
+
+
+def clone_file(source_path, target_path):
+    # Sustituye el contenido de target_path por el de source_path. Se intenta
+    # primero una copia por referencia (reflink), que no duplica los datos en
+    # disco, y si el sistema de archivos no la admite se copia con copy_range.
+    with open(source_path, "rb") as source, atomic_output(target_path) as target:
+        try:
+            import fcntl
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+            return
+        except (ImportError, OSError):
+            pass
+        copy_range(source, target, 0, os.fstat(source.fileno()).st_size)
+
+
+def read_exact(source, length):
+    data = source.read(length)
+    if len(data) != length:
+        raise EOFError("Archivo truncado")
+    return data
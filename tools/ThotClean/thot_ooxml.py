@@ -0,0 +1,171 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Reescritura de paquetes OOXML (.docx, .xlsx, .pptx) de zip a zip. Solo se
+# vuelven a serializar las partes de propiedades del documento; el resto de
+# miembros se copian con sus bytes comprimidos tal cual, sin descomprimir ni
+# volver a comprimir, y sin extraer nada a disco.
+#
+# Para el análisis se leen solo las partes de propiedades desde el directorio
+# central del zip, sin cargar el documento, las hojas ni las diapositivas.
+
+import struct
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+from thot_io import atomic_output, copy_bytes
+
+CORE_PART = "docProps/core.xml"
+APP_PART = "docProps/app.xml"
+CUSTOM_PART = "docProps/custom.xml"
+METADATA_PARTS = (CORE_PART, APP_PART, CUSTOM_PART)
+DATE_PROPERTIES = ("created", "modified", "lastPrinted")
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_w3cdtf(text):
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+def iter_part(package, name):
+    # Devuelve (profundidad, elemento) al cerrarse cada elemento, leyendo la
+    # parte por partes desde el zip. La raíz tiene profundidad 0.
+    try:
+        info = package.getinfo(name)
+    except KeyError:
+        return
+    depth = -1
+    with package.open(info) as stream:
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                continue
+            yield depth, elem
+            depth -= 1
+
+
+def read_simple_part(package, name):
+    # Propiedades que son hijos directos de la raíz (core.xml y app.xml); los
+    # vectores de app.xml (HeadingPairs, TitlesOfParts) no tienen texto propio.
+    props = {}
+    for depth, elem in iter_part(package, name):
+        if depth == 1:
+            text = (elem.text or "").strip()
+            if text:
+                props[local_name(elem.tag)] = text
+            elem.clear()
+    return props
+
+
+def read_custom_part(package):
+    props = {}
+    value = None
+    for depth, elem in iter_part(package, CUSTOM_PART):
+        if depth == 2:
+            value = (elem.text or "").strip()
+        elif depth == 1:
+            name = elem.get("name")
+            if name:
+                props[name] = value or ""
+            value = None
+            elem.clear()
+    return props
+
+
+def read_package_properties(filepath):
+    # Devuelve (core, app, custom) como diccionarios nombre -> texto.
+    with zipfile.ZipFile(filepath, "r") as package:
+        core = read_simple_part(package, CORE_PART)
+        app = read_simple_part(package, APP_PART)
+        custom = read_custom_part(package)
+    for name in DATE_PROPERTIES:
+        if name in core:
+            core[name] = parse_w3cdtf(core[name])
+    return core, app, custom
+
+
+def blank_xml_part(data):
+    # Se conserva el elemento raíz (y su espacio de nombres) para que el
+    # paquete siga siendo válido, pero se eliminan todas las propiedades.
+    root = ET.fromstring(data)
+    for elem in root.iter():
+        elem.clear()
+    return ET.tostring(root, encoding="UTF-8", xml_declaration=True)
+
+
+def copy_member_raw(source, target, info):
+    # Cabecera local: 30 bytes fijos + nombre + campo extra.
+    source.fp.seek(info.header_offset)
+    header = source.fp.read(zipfile.sizeFileHeader)
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    source.fp.seek(info.header_offset + zipfile.sizeFileHeader + name_length + extra_length)
+
+    new_info = zipfile.ZipInfo(info.filename, info.date_time)
+    new_info.compress_type = info.compress_type
+    new_info.comment = info.comment
+    new_info.create_system = info.create_system
+    new_info.create_version = info.create_version
+    new_info.extract_version = info.extract_version
+    new_info.external_attr = info.external_attr
+    new_info.internal_attr = info.internal_attr
+    new_info.CRC = info.CRC
+    new_info.compress_size = info.compress_size
+    new_info.file_size = info.file_size
+    # Los tamaños van en la cabecera local, así que no hay descriptor de datos.
+    new_info.flag_bits = info.flag_bits & ~0x08
+    new_info.header_offset = target.fp.tell()
+
+    target.fp.write(new_info.FileHeader())
+    copy_bytes(source.fp, target.fp, info.compress_size)
+
+    target.filelist.append(new_info)
+    target.NameToInfo[new_info.filename] = new_info
+    target.start_dir = target.fp.tell()
+    target._didModify = True
+
+
+def rewrite_package(filepath, transform):
+    # transform(info, source) devuelve los nuevos bytes del miembro, o None
+    # si el miembro debe copiarse sin tocar.
+    with atomic_output(filepath) as temp_file:
+        with zipfile.ZipFile(filepath, "r") as source, zipfile.ZipFile(temp_file, "w") as target:
+            for info in source.infolist():
+                data = transform(info, source)
+                if data is None:
+                    copy_member_raw(source, target, info)
+                else:
+                    new_info = zipfile.ZipInfo(info.filename, info.date_time)
+                    new_info.compress_type = info.compress_type
+                    new_info.external_attr = info.external_attr
+                    target.writestr(new_info, data)
+
+
+def strip_package_metadata(filepath):
+    def transform(info, source):
+        if info.filename in METADATA_PARTS:
+            return blank_xml_part(source.read(info))
+        return None
+
+    rewrite_package(filepath, transform)
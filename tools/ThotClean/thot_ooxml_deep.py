@@ -0,0 +1,388 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+# Limpieza profunda de paquetes OOXML (.docx, .xlsx, .pptx). Además de las
+# propiedades del documento se eliminan:
+#
+#   - autores, iniciales y fechas de cambios controlados y comentarios, y los
+#     identificadores de revisión w:rsid* (Word);
+#   - autores de comentarios, personas de los comentarios encadenados y
+#     usuarios de las revisiones de libros compartidos (Excel);
+#   - autores de comentarios (PowerPoint);
+#   - las partes customXml, con sus relaciones y tipos de contenido;
+#   - la ruta de la plantilla adjunta;
+#   - EXIF, XMP, IPTC y comentarios de las imágenes incrustadas, sin
+#     recodificarlas (ver thot_images).
+#
+# Las partes XML se reescriben con expat, evento a evento, desde el zip a un
+# temporal, así que la memoria no depende del tamaño de document.xml o de las
+# hojas. Las partes se procesan en paralelo cuando merece la pena y después se
+# monta el paquete; el resto de miembros se copian comprimidos tal cual.
+
+import multiprocessing
+import os
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.parsers import expat
+
+from thot_images import stripper_for
+from thot_io import TEMP_PREFIX, atomic_output, copy_bytes
+from thot_ooxml import METADATA_PARTS, blank_xml_part, copy_member_raw
+
+W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W15 = "http://schemas.microsoft.com/office/word/2012/wordml"
+S = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+RELATIONSHIPS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CONTENT_TYPES = "http://schemas.openxmlformats.org/package/2006/content-types"
+ATTACHED_TEMPLATE = "/attachedTemplate"
+CUSTOM_XML_DIRECTORY = "customXml/"
+
+# Con menos datos que esto arrancar procesos cuesta más de lo que se gana
+PARALLEL_THRESHOLD = 16 * 1024 * 1024
+PARALLEL_WORKERS = 4
+READ_SIZE = 1024 * 1024
+PARSE_BUFFER_SIZE = 64 * 1024
+# Fragmentos de texto acumulados antes de escribir en el temporal
+WRITE_BATCH = 4096
+TEXT_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+ATTRIBUTE_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#9;"})
+
+
+class PartRules:
+    # Los nombres son pares (uri, local); los atributos sin prefijo llevan uri
+    # None. drop_if(nombre, atributos) elimina elementos según sus atributos.
+    def __init__(self, blank_attributes=(), drop_attributes=(), drop_attribute_prefixes=(), drop_elements=(),
+                 blank_text=(), drop_if=None):
+        self.blank_attributes = frozenset(blank_attributes)
+        self.drop_attributes = frozenset(drop_attributes)
+        self.drop_attribute_prefixes = tuple(drop_attribute_prefixes)
+        self.drop_elements = frozenset(drop_elements)
+        self.blank_text = frozenset(blank_text)
+        self.drop_if = drop_if
+
+    def drops_attribute(self, name):
+        if name in self.drop_attributes:
+            return True
+        return any(name[0] == uri and name[1].startswith(prefix) for uri, prefix in self.drop_attribute_prefixes)
+
+
+def drop_relationship(name, attrs):
+    # Relaciones con las partes customXml y con la plantilla adjunta, que es
+    # una ruta externa al archivo .dotx (C:\Users\<usuario>\...)
+    if name != (RELATIONSHIPS, "Relationship"):
+        return False
+    return CUSTOM_XML_DIRECTORY in attrs.get((None, "Target"), "") or attrs.get((None, "Type"), "").endswith(ATTACHED_TEMPLATE)
+
+
+def drop_custom_xml_override(name, attrs):
+    return name == (CONTENT_TYPES, "Override") and attrs.get((None, "PartName"), "").startswith("/" + CUSTOM_XML_DIRECTORY)
+
+
+WORD_RULES = PartRules(
+    blank_attributes=[(W, "author"), (W, "initials"), (W15, "author")],
+    drop_attributes=[(W, "date")],
+    drop_attribute_prefixes=[(W, "rsid")],
+    drop_elements=[(W, "rsids"), (W, "rsid"), (W15, "presenceInfo"), (W, "attachedTemplate")]
+)
+EXCEL_COMMENT_RULES = PartRules(blank_text=[(S, "author")])
+PERSON_RULES = PartRules(blank_attributes=[(None, "displayName"), (None, "userId"), (None, "providerId")])
+REVISION_RULES = PartRules(blank_attributes=[(None, "userName")])
+POWERPOINT_AUTHOR_RULES = PartRules(blank_attributes=[(None, "name"), (None, "initials"), (None, "userId"), (None, "providerId")])
+CONTENT_TYPES_RULES = PartRules(drop_if=drop_custom_xml_override)
+RELS_RULES = PartRules(drop_if=drop_relationship)
+
+# Las hojas de Excel, las diapositivas y los dibujos no llevan autores y se
+# copian sin descomprimir.
+PART_RULES = (
+    (re.compile(r"word/[^/]+\.xml$"), WORD_RULES),
+    (re.compile(r"xl/comments(/comment)?\d*\.xml$"), EXCEL_COMMENT_RULES),
+    (re.compile(r"xl/persons/[^/]+\.xml$"), PERSON_RULES),
+    (re.compile(r"xl/(workbook\.xml|revisions/[^/]+\.xml)$"), REVISION_RULES),
+    (re.compile(r"ppt/(commentAuthors|authors)\.xml$"), POWERPOINT_AUTHOR_RULES),
+    (re.compile(r"\[Content_Types\]\.xml$"), CONTENT_TYPES_RULES),
+)
+MEDIA_RE = re.compile(r"(word|xl|ppt)/media/[^/]+$|docProps/thumbnail\.[^/]+$")
+
+
+class PartSanitizer:
+    # Reescritura de una parte XML con expat, evento a evento. Los nombres se
+    # escriben tal como vienen (prefijos y declaraciones xmlns incluidos) y
+    # solo se resuelven a (uri, local) para comprobar las reglas.
+    def __init__(self, target, rules):
+        self.target = target
+        self.rules = rules
+        self.pieces = []
+        self.open_tag = False
+        self.skip_depth = 0
+        self.blank_depth = 0
+        self.changed = False
+        # Cada ámbito es (prefijo -> uri, caché de nombres resueltos)
+        self.scopes = [({"xml": "http://www.w3.org/XML/1998/namespace"}, {})]
+        self.parser = expat.ParserCreate()
+        self.parser.ordered_attributes = True
+        self.parser.buffer_text = True
+        self.parser.buffer_size = PARSE_BUFFER_SIZE
+        self.parser.XmlDeclHandler = self.declaration
+        self.parser.StartElementHandler = self.start
+        self.parser.EndElementHandler = self.end
+        self.parser.CharacterDataHandler = self.text
+        self.parser.ProcessingInstructionHandler = self.instruction
+        self.parser.CommentHandler = self.comment
+
+    def resolve(self, qname, attribute=False):
+        mapping, cache = self.scopes[-1]
+        key = (qname, attribute)
+        name = cache.get(key)
+        if name is None:
+            prefix, _, local = qname.rpartition(":")
+            # Los atributos sin prefijo no tienen espacio de nombres
+            uri = mapping.get(prefix) if prefix or not attribute else None
+            name = cache[key] = (uri, local)
+        return name
+
+    def write(self, text):
+        self.pieces.append(text)
+        if len(self.pieces) >= WRITE_BATCH:
+            self.flush()
+
+    def flush(self):
+        self.target.write("".join(self.pieces).encode("utf-8"))
+        self.pieces = []
+
+    def close_tag(self):
+        if self.open_tag:
+            self.write(">")
+            self.open_tag = False
+
+    def declaration(self, version, encoding, standalone):
+        # La salida siempre es UTF-8
+        text = f'<?xml version="{version or "1.0"}" encoding="UTF-8"'
+        if standalone != -1:
+            text += ' standalone="yes"' if standalone else ' standalone="no"'
+        self.write(text + "?>\r\n")
+
+    def start(self, qname, attributes):
+        if self.skip_depth:
+            self.skip_depth += 1
+            return
+        mapping = None
+        for index in range(0, len(attributes), 2):
+            attribute = attributes[index]
+            if attribute == "xmlns" or attribute.startswith("xmlns:"):
+                if mapping is None:
+                    mapping = dict(self.scopes[-1][0])
+                mapping[attribute[6:]] = attributes[index + 1]
+        self.scopes.append((mapping, {}) if mapping is not None else self.scopes[-1])
+
+        rules = self.rules
+        name = self.resolve(qname)
+        if name in rules.drop_elements or (rules.drop_if is not None and rules.drop_if(name, self.attribute_dict(attributes))):
+            self.skip_depth = 1
+            self.changed = True
+            return
+        self.close_tag()
+        parts = ["<", qname]
+        for index in range(0, len(attributes), 2):
+            attribute, value = attributes[index], attributes[index + 1]
+            if ":" in attribute and not attribute.startswith("xmlns"):
+                attribute_name = self.resolve(attribute, True)
+            else:
+                attribute_name = (None, attribute)
+            if rules.drops_attribute(attribute_name):
+                self.changed = True
+                continue
+            if value and attribute_name in rules.blank_attributes:
+                value = ""
+                self.changed = True
+            parts.append(f' {attribute}="{value.translate(ATTRIBUTE_ESCAPES)}"')
+        self.write("".join(parts))
+        self.open_tag = True
+        if self.blank_depth or name in rules.blank_text:
+            self.blank_depth += 1
+
+    def attribute_dict(self, attributes):
+        return {self.resolve(attributes[index], True): attributes[index + 1] for index in range(0, len(attributes), 2)}
+
+    def end(self, qname):
+        # Los hijos de un elemento eliminado no abren ámbito
+        if self.skip_depth:
+            self.skip_depth -= 1
+            if not self.skip_depth:
+                self.scopes.pop()
+            return
+        self.scopes.pop()
+        if self.blank_depth:
+            self.blank_depth -= 1
+        if self.open_tag:
+            self.write("/>")
+            self.open_tag = False
+        else:
+            self.write(f"</{qname}>")
+
+    def text(self, data):
+        if self.skip_depth:
+            return
+        if self.blank_depth:
+            self.changed = self.changed or bool(data.strip())
+            return
+        self.close_tag()
+        self.write(data.translate(TEXT_ESCAPES))
+
+    def instruction(self, target, data):
+        if not self.skip_depth:
+            self.close_tag()
+            self.write(f"<?{target} {data}?>")
+
+    def comment(self, data):
+        if not self.skip_depth:
+            self.close_tag()
+            self.write(f"<!--{data}-->")
+
+    def parse(self, source):
+        while True:
+            chunk = source.read(READ_SIZE)
+            self.parser.Parse(chunk, not chunk)
+            if not chunk:
+                break
+        self.flush()
+        return self.changed
+
+
+def sanitize_xml(source, target, rules):
+    # Devuelve True si la parte ha cambiado
+    return PartSanitizer(target, rules).parse(source)
+
+
+def rules_for(name):
+    if name.endswith(".rels"):
+        return RELS_RULES
+    for pattern, rules in PART_RULES:
+        if pattern.match(name):
+            return rules
+    return None
+
+
+def clean_part(filepath, name, directory):
+    # Reescribe un miembro del paquete en un temporal de directory. Devuelve
+    # (nombre, ruta del temporal o None si no cambia, bytes de imagen
+    # eliminados). Es una función de módulo para poder ejecutarse en otro
+    # proceso.
+    fd, temp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, suffix=".part", dir=directory)
+    try:
+        with zipfile.ZipFile(filepath, "r") as package, os.fdopen(fd, "w+b") as target:
+            if name in METADATA_PARTS:
+                target.write(blank_xml_part(package.read(name)))
+                changed, removed = True, 0
+            elif MEDIA_RE.match(name):
+                with package.open(name) as source:
+                    stripper = stripper_for(source.read(12))
+                    source.seek(0)
+                    removed = stripper(source, target) if stripper is not None else 0
+                changed = bool(removed)
+            else:
+                with package.open(name) as source:
+                    changed = sanitize_xml(source, target, rules_for(name))
+                removed = 0
+    except (ValueError, EOFError, expat.ExpatError):
+        # Imagen o XML que no se puede interpretar: se conserva tal cual
+        changed, removed = False, 0
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    if not changed:
+        os.remove(temp_path)
+        return name, None, 0
+    return name, temp_path, removed
+
+
+class DeepCleanStats:
+    def __init__(self):
+        self.parts = 0
+        self.images = 0
+        self.image_bytes = 0
+        self.removed_parts = 0
+
+    def summary(self):
+        return (f"Office: {self.parts} partes XML reescritas, {self.images} imágenes limpiadas "
+                f"({self.image_bytes} bytes de metadatos), {self.removed_parts} partes customXml eliminadas.")
+
+
+def parts_to_clean(package):
+    names = []
+    total = 0
+    for info in package.infolist():
+        name = info.filename
+        if name.startswith(CUSTOM_XML_DIRECTORY):
+            continue
+        if name in METADATA_PARTS or MEDIA_RE.match(name) or rules_for(name) is not None:
+            names.append(name)
+            total += info.file_size
+    return names, total
+
+
+def map_parts(filepath, names, directory, total):
+    # Dentro de un proceso del pool del motor no se abren más procesos
+    if total >= PARALLEL_THRESHOLD and len(names) > 1 and multiprocessing.parent_process() is None:
+        workers = min(PARALLEL_WORKERS, len(names), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(clean_part, [filepath] * len(names), names, [directory] * len(names)))
+    return [clean_part(filepath, name, directory) for name in names]
+
+
+def write_member(target, info, path):
+    new_info = zipfile.ZipInfo(info.filename, info.date_time)
+    new_info.compress_type = info.compress_type
+    new_info.external_attr = info.external_attr
+    size = os.path.getsize(path)
+    with open(path, "rb") as source, target.open(new_info, "w", force_zip64=size >= zipfile.ZIP64_LIMIT) as member:
+        copy_bytes(source, member, size)
+
+
+def deep_clean_package(filepath):
+    stats = DeepCleanStats()
+    directory = os.path.dirname(os.path.abspath(filepath))
+    with zipfile.ZipFile(filepath, "r") as package:
+        names, total = parts_to_clean(package)
+    outputs = {}
+    try:
+        for name, temp_path, removed in map_parts(filepath, names, directory, total):
+            if temp_path is None:
+                continue
+            outputs[name] = temp_path
+            if MEDIA_RE.match(name):
+                stats.images += 1
+                stats.image_bytes += removed
+            else:
+                stats.parts += 1
+
+        with atomic_output(filepath) as temp_file:
+            with zipfile.ZipFile(filepath, "r") as source, zipfile.ZipFile(temp_file, "w") as target:
+                for info in source.infolist():
+                    if info.filename.startswith(CUSTOM_XML_DIRECTORY):
+                        stats.removed_parts += 1
+                    elif info.filename in outputs:
+                        write_member(target, info, outputs[info.filename])
+                    else:
+                        copy_member_raw(source, target, info)
+    finally:
+        for temp_path in outputs.values():
+            os.remove(temp_path)
+    return stats
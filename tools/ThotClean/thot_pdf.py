@@ -0,0 +1,280 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Eliminación de metadatos de PDF sin reconstruir las páginas.
+#
+# Vía rápida: si el PDF tiene una única revisión y el diccionario /Info y el
+# flujo XMP del catálogo (/Metadata) están fuera de flujos de objetos, se
+# sobrescriben en el propio archivo con bytes del mismo tamaño: /Info queda
+# como un diccionario vacío y el XMP como un paquete XMP vacío relleno de
+# espacios. Las tablas xref siguen siendo válidas, no se toca el contenido de
+# las páginas y el coste no depende del tamaño del documento.
+#
+# En el resto de casos (revisiones incrementales que conservan copias
+# antiguas, objetos comprimidos, XMP con filtros) se reescribe el documento
+# conservando marcadores, formularios y adjuntos.
+
+import mmap
+import re
+
+from thot_io import atomic_output
+
+WINDOW_SIZE = 64 * 1024
+OBJECT_HEADER_RE = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj")
+STARTXREF_RE = re.compile(rb"startxref\s+(\d+)")
+EMPTY_XMP_HEAD = b'<?xpacket begin="\xef\xbb\xbf" id="W5M0MpCehiHzreSzNTczkc9d"?><x:xmpmeta xmlns:x="adobe:ns:meta/"/>'
+EMPTY_XMP_TAIL = b'<?xpacket end="w"?>'
+# Entradas del catálogo que se conservan al reescribir
+CATALOG_KEYS = ("/Names", "/AcroForm", "/PageLabels", "/PageMode", "/PageLayout", "/ViewerPreferences", "/Lang", "/MarkInfo")
+WHITESPACE = b" \t\r\n\f\x00"
+
+
+def literal_end(data, index):
+    # Posición siguiente al ")" que cierra la cadena literal de index
+    nesting = 1
+    index += 1
+    length = len(data)
+    while index < length and nesting:
+        char = data[index:index + 1]
+        if char == b"\\":
+            index += 1
+        elif char == b"(":
+            nesting += 1
+        elif char == b")":
+            nesting -= 1
+        index += 1
+    return index
+
+
+def string_span(data, position):
+    # (inicio, fin) de la cadena literal o hexadecimal que empieza en
+    # position, después de los espacios; None si no hay una cadena completa
+    start = position
+    while data[start:start + 1] and data[start:start + 1] in WHITESPACE:
+        start += 1
+    char = data[start:start + 1]
+    if char == b"(":
+        end = literal_end(data, start)
+        return (start, end) if data[end - 1:end] == b")" else None
+    if char == b"<" and data[start + 1:start + 2] != b"<":
+        end = data.find(b">", start)
+        return (start, end + 1) if end >= 0 else None
+    return None
+
+
+def dict_span(data, position):
+    # Devuelve (inicio, fin) del diccionario << ... >> que empieza en position,
+    # teniendo en cuenta cadenas literales, hexadecimales y comentarios.
+    start = data.find(b"<<", position)
+    if start < 0:
+        return None
+    depth = 0
+    index = start
+    length = len(data)
+    while index < length:
+        char = data[index:index + 1]
+        if char == b"<":
+            if data[index + 1:index + 2] == b"<":
+                depth += 1
+                index += 2
+                continue
+            end = data.find(b">", index)
+            if end < 0:
+                return None
+            index = end + 1
+            continue
+        if char == b">" and data[index + 1:index + 2] == b">":
+            depth -= 1
+            index += 2
+            if depth == 0:
+                return start, index
+            continue
+        if char == b"(":
+            index = literal_end(data, index)
+            continue
+        if char == b"%":
+            while index < length and data[index:index + 1] not in (b"\r", b"\n"):
+                index += 1
+            continue
+        index += 1
+    return None
+
+
+def single_revision(data):
+    # Solo hay una sección xref si la última no tiene /Prev ni /XRefStm
+    # (los PDF linealizados también tienen /Prev y pasan por la vía lenta).
+    match = None
+    for match in STARTXREF_RE.finditer(data, max(0, len(data) - 2048)):
+        pass
+    if match is None:
+        return False
+    offset = int(match.group(1))
+    if data[offset:offset + 4] == b"xref":
+        trailer = data.find(b"trailer", offset, match.start() + 1)
+        if trailer < 0:
+            return False
+        span = dict_span(data, trailer)
+    else:
+        span = dict_span(data[offset:offset + WINDOW_SIZE], 0)
+        span = (offset + span[0], offset + span[1]) if span else None
+    if span is None:
+        return False
+    trailer_dict = data[span[0]:span[1]]
+    return b"/Prev" not in trailer_dict and b"/XRefStm" not in trailer_dict
+
+
+def object_offset(reader, reference):
+    offset = reader.xref.get(reference.generation, {}).get(reference.idnum)
+    if offset is None or reference.idnum in reader.xref_objStm:
+        return None
+    return offset
+
+
+def object_window(data, offset, reference):
+    window = data[offset:offset + WINDOW_SIZE]
+    match = OBJECT_HEADER_RE.match(window)
+    if not match or int(match.group(1)) != reference.idnum:
+        return None, None
+    return window, match.end()
+
+
+def blank_value_edit(data, reader, reference):
+    # Las cadenas de /Info guardadas como objetos aparte (/Author 12 0 R)
+    # quedan como una cadena vacía del mismo tamaño: () y espacios
+    offset = object_offset(reader, reference)
+    if offset is None:
+        return None
+    window, body = object_window(data, offset, reference)
+    span = string_span(window, body) if window else None
+    if span is None:
+        return None
+    start, end = span
+    return offset + start, b"()" + b" " * (end - start - 2)
+
+
+def blank_info_edit(data, reader):
+    from PyPDF2.generic import IndirectObject
+
+    reference = reader.trailer.raw_get("/Info") if "/Info" in reader.trailer else None
+    if reference is None:
+        return []
+    # Un /Info directo en el trailer no se puede vaciar sin mover bytes
+    if not isinstance(reference, IndirectObject):
+        return None
+    offset = object_offset(reader, reference)
+    if offset is None:
+        return None
+    window, body = object_window(data, offset, reference)
+    span = dict_span(window, body) if window else None
+    if span is None:
+        return None
+    start, end = span
+    edits = [(offset + start, b"<<" + b" " * (end - start - 4) + b">>")]
+    info = reference.get_object()
+    for key in info:
+        value = info.raw_get(key)
+        if isinstance(value, IndirectObject):
+            edit = blank_value_edit(data, reader, value)
+            if edit is None:
+                return None
+            edits.append(edit)
+    return edits
+
+
+def blank_xmp_edit(data, reader):
+    root = reader.trailer["/Root"].get_object()
+    if "/Metadata" not in root:
+        return []
+    reference = root.raw_get("/Metadata")
+    stream = reference.get_object()
+    if "/Filter" in stream:
+        return None
+    offset = object_offset(reader, reference)
+    if offset is None:
+        return None
+    window, body = object_window(data, offset, reference)
+    span = dict_span(window, body) if window else None
+    if span is None:
+        return None
+    keyword = window.find(b"stream", span[1])
+    if keyword < 0:
+        return None
+    start = keyword + len(b"stream")
+    if window[start:start + 2] == b"\r\n":
+        start += 2
+    elif window[start:start + 1] == b"\n":
+        start += 1
+    else:
+        return None
+
+    length = len(stream._data)
+    start += offset
+    if not data[start + length:start + length + 32].lstrip(WHITESPACE).startswith(b"endstream"):
+        return None
+    padding = length - len(EMPTY_XMP_HEAD) - len(EMPTY_XMP_TAIL)
+    if padding < 0:
+        return None
+    return [(start, EMPTY_XMP_HEAD + b" " * padding + EMPTY_XMP_TAIL)]
+
+
+def strip_pdf_in_place(filepath):
+    # Devuelve True si se limpió por la vía rápida y False si no es posible.
+    from PyPDF2 import PdfReader
+
+    with open(filepath, "rb") as file:
+        reader = PdfReader(file)
+        if reader.is_encrypted:
+            return False
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if not single_revision(data):
+                return False
+            info_edits = blank_info_edit(data, reader)
+            xmp_edits = blank_xmp_edit(data, reader)
+    if info_edits is None or xmp_edits is None:
+        return False
+
+    # Cada cambio ocupa exactamente los mismos bytes que el original
+    with open(filepath, "r+b") as file:
+        for offset, replacement in info_edits + xmp_edits:
+            file.seek(offset)
+            file.write(replacement)
+    return True
+
+
+def rewrite_pdf(filepath):
+    from PyPDF2 import PdfReader, PdfWriter
+    from PyPDF2.generic import NameObject
+
+    with open(filepath, "rb") as file:
+        reader = PdfReader(file)
+        writer = PdfWriter()
+        # append copia las páginas y los marcadores; el resto del catálogo se
+        # copia aparte, excepto /Metadata
+        writer.append(reader)
+        root = reader.trailer["/Root"].get_object()
+        for key in CATALOG_KEYS:
+            if key in root:
+                writer._root_object[NameObject(key)] = root.raw_get(key)
+        writer._info.get_object().clear()
+        with atomic_output(filepath) as output:
+            writer.write(output)
+
+
+def strip_pdf_metadata(filepath):
+    if not strip_pdf_in_place(filepath):
+        rewrite_pdf(filepath)
@@ -0,0 +1,198 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Informes de análisis y limpieza que se escriben a medida que termina cada
+# archivo, con memoria constante: JSONL (un objeto por archivo), CSV y
+# Parquet (una fila por etiqueta: archivo, tamaño, etiqueta, valor). El
+# formato se elige por la extensión. read_report vuelve a cargar un informe
+# como resultados de análisis sin abrir ningún documento.
+
+import csv
+import json
+import os
+
+ROW_GROUP_SIZE = 65536
+REPORT_COLUMNS = ("filename", "size", "tag", "value")
+WARNING_TAG = "Advertencia"
+REPORT_WILDCARD = "JSON Lines (*.jsonl)|*.jsonl|CSV (*.csv)|*.csv|Parquet (*.parquet)|*.parquet"
+
+
+def result_rows(result):
+    # (etiqueta, valor) de un resultado; la etiqueta vacía es texto libre
+    # (metadatos que no son un diccionario o el mensaje de la limpieza).
+    rows = []
+    metadata = result.get("metadata")
+    if isinstance(metadata, dict):
+        rows.extend((str(tag), "" if value is None else str(value)) for tag, value in metadata.items())
+    elif metadata is not None:
+        rows.append(("", str(metadata)))
+    if result.get("message"):
+        rows.append(("", result["message"]))
+    rows.extend((WARNING_TAG, warning.strip()) for warning in result.get("warnings") or ())
+    return rows or [("", "")]
+
+
+def rows_to_results(rows):
+    # Agrupa filas consecutivas (archivo, tamaño, etiqueta, valor) del mismo
+    # archivo en un resultado como los de analyze_job.
+    current = None
+    texts = []
+    for filename, size, tag, value in rows:
+        if current is None or current["filename"] != filename:
+            if current is not None:
+                yield finish_result(current, texts)
+            current = {"filename": filename, "size": int(size or 0), "metadata": {}, "warnings": []}
+            texts = []
+        if tag == WARNING_TAG:
+            current["warnings"].append(value)
+        elif tag:
+            current["metadata"][tag] = value
+        elif value:
+            texts.append(value)
+    if current is not None:
+        yield finish_result(current, texts)
+
+
+def finish_result(result, texts):
+    if not result["metadata"]:
+        result["metadata"] = "\n".join(texts) if texts else None
+    return result
+
+
+class ReportWriter:
+    def __init__(self, path):
+        self.path = path
+        self.files = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, result):
+        self.files += 1
+        self.write_result(result)
+
+
+class JsonlReport(ReportWriter):
+    def __init__(self, path):
+        super().__init__(path)
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write_result(self, result):
+        row = {"filename": result["filename"], "size": result.get("size", 0)}
+        if "metadata" in result:
+            row["metadata"] = result["metadata"]
+        if "message" in result:
+            row["message"] = result["message"]
+        row["warnings"] = [warning.strip() for warning in result.get("warnings") or ()]
+        self.file.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class CsvReport(ReportWriter):
+    def __init__(self, path):
+        super().__init__(path)
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(REPORT_COLUMNS)
+
+    def write_result(self, result):
+        size = result.get("size", 0)
+        self.writer.writerows((result["filename"], size, tag, value) for tag, value in result_rows(result))
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetReport(ReportWriter):
+    # Las filas se acumulan hasta ROW_GROUP_SIZE y se escriben como un grupo
+    # de filas, así que la memoria no depende del número de archivos.
+    def __init__(self, path, row_group_size=ROW_GROUP_SIZE):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        super().__init__(path)
+        self.pa = pa
+        self.row_group_size = row_group_size
+        self.schema = pa.schema([
+            ("filename", pa.string()),
+            ("size", pa.int64()),
+            ("tag", pa.string()),
+            ("value", pa.string())
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.columns = {name: [] for name in REPORT_COLUMNS}
+
+    def write_result(self, result):
+        size = result.get("size", 0)
+        for tag, value in result_rows(result):
+            self.columns["filename"].append(result["filename"])
+            self.columns["size"].append(size)
+            self.columns["tag"].append(tag)
+            self.columns["value"].append(value)
+        if len(self.columns["filename"]) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if self.columns["filename"]:
+            self.writer.write_table(self.pa.table(self.columns, schema=self.schema))
+            self.columns = {name: [] for name in REPORT_COLUMNS}
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+REPORT_TYPES = {".jsonl": JsonlReport, ".csv": CsvReport, ".parquet": ParquetReport}
+
+
+def report_extension(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in REPORT_TYPES:
+        raise ValueError(f"Formato de informe no soportado: {extension or path} (use .jsonl, .csv o .parquet)")
+    return extension
+
+
+def open_report(path):
+    return REPORT_TYPES[report_extension(path)](path)
+
+
+def read_report(path):
+    extension = report_extension(path)
+    if extension == ".jsonl":
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+    elif extension == ".csv":
+        with open(path, encoding="utf-8", newline="") as file:
+            reader = csv.reader(file)
+            next(reader, None)
+            yield from rows_to_results(reader)
+    else:
+        import pyarrow.parquet as pq
+
+        def parquet_rows():
+            for batch in pq.ParquetFile(path).iter_batches(columns=list(REPORT_COLUMNS)):
+                yield from zip(*(batch.column(name).to_pylist() for name in REPORT_COLUMNS))
+
+        yield from rows_to_results(parquet_rows())
@@ -0,0 +1,262 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Detección del formato real de un archivo a partir de sus primeros bytes
+# ("magic bytes"), leídos una sola vez con mmap. Para los zip se consulta el
+# directorio central y [Content_Types].xml para distinguir .docx, .xlsx y
+# .pptx. Los archivos que no coinciden con ningún formato se descartan sin
+# cargar ninguna biblioteca.
+
+import mmap
+import os
+import struct
+import zipfile
+import zlib
+
+HEADER_SIZE = 8192
+# Límite al descomprimir [Content_Types].xml desde el mmap
+CONTENT_TYPES_LIMIT = 1024 * 1024
+
+OOXML_CONTENT_TYPES = (
+    (b"wordprocessingml.document.main", "docx"),
+    (b"spreadsheetml.sheet.main", "xlsx"),
+    (b"presentationml.presentation.main", "pptx"),
+)
+OOXML_MAIN_PARTS = (
+    ("word/document.xml", "docx"),
+    ("xl/workbook.xml", "xlsx"),
+    ("ppt/presentation.xml", "pptx"),
+)
+
+# Marcas de ftyp: HEIF/HEIC, AVIF y CR3 usan el mismo contenedor que MP4,
+# pero en ellos la caja meta es la propia imagen.
+IMAGE_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis", b"mif1", b"msf1", b"avif", b"avis", b"crx "}
+VIDEO_BRANDS = {
+    b"isom", b"iso2", b"iso3", b"iso4", b"iso5", b"iso6", b"mp41", b"mp42", b"mp71", b"avc1",
+    b"M4V ", b"M4VH", b"M4VP", b"qt  ", b"3gp4", b"3gp5", b"3gp6", b"3g2a", b"dash", b"f4v ", b"MSNV", b"XAVC", b"mmp4"
+}
+
+# Tramas MPEG de audio: kbit/s por (versión MPEG-1 o no, bits de capa: 3 = I,
+# 2 = II, 1 = III) e índice, y frecuencias por bits de versión (11 = MPEG-1,
+# 10 = MPEG-2, 00 = MPEG-2.5)
+MPEG_BITRATES = {
+    (True, 3): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 1): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 3): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 1): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MPEG_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+# Bytes que hay que leer para ver dos tramas (la mayor ocupa 2881 bytes)
+MPEG_SNIFF_SIZE = 4096
+
+
+def ftyp_brands(header):
+    # Marca principal seguida de las compatibles
+    size = struct.unpack(">I", header[:4])[0] if len(header) >= 4 else 0
+    end = min(len(header), size)
+    return [header[8:12]] + [header[offset:offset + 4] for offset in range(16, end - 3, 4)]
+
+
+def ftyp_kind(header):
+    brands = ftyp_brands(header)
+    if any(brand in IMAGE_BRANDS for brand in brands):
+        return None
+    if brands[0] == b"qt  ":
+        return "mov"
+    if any(brand in VIDEO_BRANDS for brand in brands):
+        return "mp4"
+    return None
+
+
+def mpeg_frame_length(header):
+    # Longitud de la trama que empieza en header[:4], o None si no es una
+    # cabecera MPEG de audio válida
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 3
+    layer = (header[1] >> 1) & 3
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 3
+    if version == 1 or layer == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    padding = (header[2] >> 1) & 1
+    bitrate = MPEG_BITRATES[(version == 3, layer)][bitrate_index] * 1000
+    sample_rate = MPEG_SAMPLE_RATES[version][sample_rate_index]
+    if layer == 3:
+        return (12 * bitrate // sample_rate + padding) * 4
+    if layer == 1 and version != 3:
+        return 72 * bitrate // sample_rate + padding
+    return 144 * bitrate // sample_rate + padding
+
+
+def is_mpeg_audio(data):
+    # Además de la primera cabecera se exige otra trama justo donde termina,
+    # porque la sincronización sola coincide con el BOM de UTF-16 (FF FE) y
+    # con cualquier dato binario.
+    length = mpeg_frame_length(data[:4])
+    return length is not None and mpeg_frame_length(data[length:length + 4]) is not None
+
+
+def sniff_header(header):
+    if header.startswith(b"%PDF-"):
+        return "pdf"
+    if header.startswith(b"PK\x03\x04") or header.startswith(b"PK\x05\x06"):
+        return "zip"
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header[:4] in (b"II*\x00", b"MM\x00*"):
+        return "tiff"
+    if header.startswith(b"RIFF") and len(header) >= 12:
+        return {b"WEBP": "webp", b"WAVE": "wav", b"AVI ": "avi"}.get(header[8:12])
+    if header.startswith(b"ID3"):
+        return "mp3"
+    if header.startswith(b"fLaC"):
+        return "flac"
+    if header.startswith(b"OggS"):
+        return "ogg"
+    if header.startswith(b"\x1a\x45\xdf\xa3"):
+        return "mkv"
+    if header[4:8] == b"ftyp":
+        return ftyp_kind(header)
+    if header[4:8] in (b"moov", b"mdat", b"wide", b"free"):
+        return "mov"
+    # Tramas MPEG de audio sin etiqueta ID3
+    if is_mpeg_audio(header):
+        return "mp3"
+    # La especificación admite bytes antes de %PDF- dentro del primer KB. Se
+    # comprueba al final porque un zip con un PDF almacenado sin comprimir
+    # también lo contiene.
+    if b"%PDF-" in header[:1024]:
+        return "pdf"
+    return None
+
+
+def central_directory(data):
+    # Devuelve {nombre: (método, tamaño comprimido, desplazamiento local)}
+    end = data.rfind(b"PK\x05\x06", max(0, len(data) - 65557))
+    if end < 0 or end + 22 > len(data):
+        return {}
+    entries, cd_size, cd_offset = struct.unpack("<10xHII", data[end:end + 20])
+    members = {}
+    position = cd_offset
+    for _ in range(entries):
+        if data[position:position + 4] != b"PK\x01\x02":
+            break
+        method, = struct.unpack("<H", data[position + 10:position + 12])
+        compressed_size, = struct.unpack("<I", data[position + 20:position + 24])
+        name_length, extra_length, comment_length = struct.unpack("<HHH", data[position + 28:position + 34])
+        local_offset, = struct.unpack("<I", data[position + 42:position + 46])
+        name = data[position + 46:position + 46 + name_length].decode("utf-8", "replace")
+        members[name] = (method, compressed_size, local_offset)
+        position += 46 + name_length + extra_length + comment_length
+    return members
+
+
+def read_member(data, method, compressed_size, local_offset, limit=CONTENT_TYPES_LIMIT):
+    if data[local_offset:local_offset + 4] != b"PK\x03\x04":
+        return b""
+    name_length, extra_length = struct.unpack("<HH", data[local_offset + 26:local_offset + 30])
+    start = local_offset + 30 + name_length + extra_length
+    raw = data[start:start + compressed_size]
+    if method == 0:
+        return raw[:limit]
+    if method == 8:
+        return zlib.decompressobj(-15).decompress(raw, limit)
+    return b""
+
+
+def ooxml_kind(data, extension=""):
+    try:
+        members = central_directory(data)
+        if "[Content_Types].xml" in members:
+            content_types = read_member(data, *members["[Content_Types].xml"])
+            for content_type, kind in OOXML_CONTENT_TYPES:
+                if content_type in content_types:
+                    return kind
+        for part, kind in OOXML_MAIN_PARTS:
+            if part in members:
+                return kind
+    except (struct.error, zlib.error):
+        pass
+    # Zip64 o directorio dañado: se confía en la extensión si es de Office
+    if extension in (".docx", ".xlsx", ".pptx"):
+        return extension[1:]
+    return None
+
+
+def sniff_file(filepath):
+    # Devuelve (tipo, cabecera). La cabecera se pasa al manejador del formato
+    # para que no tenga que volver a leerla.
+    extension = os.path.splitext(filepath)[1].lower()
+    with open(filepath, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return None, b""
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            header = file.read(HEADER_SIZE)
+            kind = sniff_header(header)
+            if kind == "zip" and extension in (".docx", ".xlsx", ".pptx"):
+                kind = extension[1:]
+            return kind, header
+        with data:
+            header = data[:HEADER_SIZE]
+            kind = sniff_header(header)
+            if kind == "zip":
+                kind = ooxml_kind(data, extension) or kind
+            return kind, header
+
+
+def package_kind(stream, extension=""):
+    # Equivalente de ooxml_kind para un archivo ya abierto (miembro de otro zip)
+    try:
+        with zipfile.ZipFile(stream) as package:
+            names = set(package.namelist())
+            if "[Content_Types].xml" in names:
+                with package.open("[Content_Types].xml") as part:
+                    content_types = part.read(CONTENT_TYPES_LIMIT)
+                for content_type, kind in OOXML_CONTENT_TYPES:
+                    if content_type in content_types:
+                        return kind
+            for part, kind in OOXML_MAIN_PARTS:
+                if part in names:
+                    return kind
+    except (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError, NotImplementedError):
+        pass
+    finally:
+        stream.seek(0)
+    if extension in (".docx", ".xlsx", ".pptx"):
+        return extension[1:]
+    return None
+
+
+def sniff_stream(stream, name=""):
+    # Como sniff_file, para un archivo abierto en memoria o en un temporal
+    extension = os.path.splitext(name)[1].lower()
+    stream.seek(0)
+    header = stream.read(HEADER_SIZE)
+    stream.seek(0)
+    kind = sniff_header(header)
+    if kind == "zip":
+        kind = package_kind(stream, extension) or kind
+    return kind, header
@@ -0,0 +1,361 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+# Eliminación de metadatos de vídeo recorriendo la estructura del contenedor,
+# sin decodificar ni volver a multiplexar.
+#
+# MP4/MOV (ISO-BMFF): se eliminan las cajas udta (incluye ©xyz y las
+# coordenadas GPS) y uuid de XMP, y dentro de moov y de cada pista también las
+# cajas meta de etiquetas (manejador mdir, ID32 o mdta). Una caja meta del
+# nivel superior nunca se toca: en HEIF/AVIF/CR3 contiene la propia imagen, y
+# esos archivos (marcas de ftyp sin vídeo) se rechazan antes de empezar. Solo se reconstruye moov en memoria; el resto de
+# cajas (mdat) se copian con copy_range y los desplazamientos de stco/co64 se
+# corrigen según la nueva posición de los datos. En los MP4 fragmentados
+# (moof), cuyos desplazamientos no están todos en stco/co64, las cajas se
+# sustituyen en el propio archivo por cajas free del mismo tamaño.
+#
+# Matroska/WebM: se sustituyen en el propio archivo las etiquetas (Tags) y el
+# título y la fecha de Info por elementos Void del mismo tamaño, y se rellenan
+# con ceros los nombres de las aplicaciones, así que no cambia ninguna posición
+# referenciada por SeekHead ni Cues.
+#
+# AVI: como en WAV, los chunks LIST/INFO y la fecha de grabación (IDIT) pasan
+# a ser chunks JUNK, tanto en el nivel superior como dentro de hdrl y de cada
+# strl, y en todas las partes RIFF (AVIX) del archivo. Nada se mueve, así que
+# idx1 y los índices OpenDML siguen siendo válidos.
+
+import os
+import struct
+from bisect import bisect_right
+
+from thot_io import atomic_output, copy_range, read_exact
+from thot_sniff import ftyp_brands, ftyp_kind
+
+MP4_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts", b"dinf", b"mvex"}
+MP4_DROP_BOXES = {b"udta"}
+# Manejadores de las cajas meta que solo contienen etiquetas: iTunes (mdir),
+# ID3 (ID32) y claves de QuickTime (mdta, con la ubicación GPS de los móviles)
+MP4_METADATA_HANDLERS = {b"mdir", b"ID32", b"mdta"}
+MP4_TOP_LEVEL = {b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pnot", b"uuid", b"meta", b"udta"}
+XMP_UUID = bytes.fromhex("BE7ACFCB97A942E89C71999491E3AFAC")
+ZERO_BLOCK = bytes(1024 * 1024)
+
+EBML_HEADER = 0x1A45DFA3
+MKV_SEGMENT = 0x18538067
+MKV_CLUSTER = 0x1F43B675
+MKV_INFO = 0x1549A966
+MKV_TAGS = 0x1254C367
+MKV_VOID = 0xEC
+# Dentro de Info: Title y DateUTC se anulan; MuxingApp y WritingApp son
+# obligatorios, así que se conservan con el texto a ceros.
+MKV_INFO_VOID = {0x7BA9, 0x4461}
+MKV_INFO_ZERO = {0x4D80, 0x5741}
+
+AVI_DROP_CHUNKS = {b"IDIT"}
+AVI_CONTAINERS = {b"hdrl", b"strl"}
+
+
+def box_header(data, offset, end):
+    size, box_type = struct.unpack(">I4s", data[offset:offset + 8])
+    header_size = 8
+    if size == 1:
+        size = struct.unpack(">Q", data[offset + 8:offset + 16])[0]
+        header_size = 16
+    elif size == 0:
+        size = end - offset
+    if size < header_size or offset + size > end:
+        raise ValueError("Caja MP4 inválida")
+    return box_type, header_size, size
+
+
+def meta_handler(data, payload, end):
+    # En ISO la caja meta lleva versión y flags antes de hdlr; en QuickTime no
+    for offset in (payload + 4, payload):
+        if offset + 20 <= end and data[offset + 4:offset + 8] == b"hdlr":
+            return data[offset + 16:offset + 20]
+    return None
+
+
+def mp4_dropped(box_type, payload):
+    # Cajas del nivel superior: payload son los primeros bytes del contenido
+    return box_type in MP4_DROP_BOXES or (box_type == b"uuid" and payload[:16] == XMP_UUID)
+
+
+def mp4_child_dropped(data, box_type, payload, end):
+    if box_type == b"meta":
+        return meta_handler(data, payload, end) in MP4_METADATA_HANDLERS
+    return mp4_dropped(box_type, data[payload:payload + 16])
+
+
+def read_top_level_boxes(source, file_size):
+    boxes = []
+    offset = 0
+    while offset + 8 <= file_size:
+        source.seek(offset)
+        # Cabecera más los 16 bytes del identificador de las cajas uuid
+        header = source.read(32)
+        box_type, header_size, size = box_header(header.ljust(16, b"\0"), 0, file_size - offset)
+        boxes.append((box_type, offset, size, header_size, header[header_size:]))
+        offset += size
+    if not boxes or boxes[0][0] not in MP4_TOP_LEVEL:
+        raise ValueError("No es un archivo MP4/MOV")
+    return boxes
+
+
+def rebuild_mp4_children(data, start, end, output, tables, dropped, base):
+    # Copia los hijos de data[start:end] en output sin las cajas de metadatos.
+    # tables recibe (posición en output, tamaño de entrada, número de
+    # entradas) de cada stco/co64 y dropped los rangos eliminados (absolutos).
+    offset = start
+    while offset < end:
+        box_type, header_size, size = box_header(data, offset, end)
+        payload = offset + header_size
+        if mp4_child_dropped(data, box_type, payload, offset + size):
+            dropped.append((base + offset, size, header_size))
+        elif box_type in MP4_CONTAINERS:
+            position = len(output)
+            output += data[offset:payload]
+            rebuild_mp4_children(data, payload, offset + size, output, tables, dropped, base)
+            new_size = len(output) - position
+            if header_size == 16:
+                output[position + 8:position + 16] = struct.pack(">Q", new_size)
+            else:
+                output[position:position + 4] = struct.pack(">I", new_size)
+        else:
+            if box_type in (b"stco", b"co64"):
+                count = struct.unpack(">I", data[payload + 4:payload + 8])[0]
+                entry_size = 4 if box_type == b"stco" else 8
+                tables.append((len(output) + header_size + 8, entry_size, count))
+            output += data[offset:offset + size]
+        offset += size
+
+
+def patch_chunk_offsets(moov, tables, old_starts, new_starts, sizes):
+    for position, entry_size, count in tables:
+        fmt = ">%d%s" % (count, "I" if entry_size == 4 else "Q")
+        end = position + count * entry_size
+        offsets = struct.unpack(fmt, moov[position:end])
+        patched = []
+        for value in offsets:
+            index = bisect_right(old_starts, value) - 1
+            if index < 0 or value >= old_starts[index] + sizes[index] or new_starts[index] is None:
+                raise ValueError("Desplazamiento de bloque fuera de los datos del vídeo")
+            patched.append(value - old_starts[index] + new_starts[index])
+        moov[position:end] = struct.pack(fmt, *patched)
+
+
+def blank_mp4_boxes(filepath, ranges):
+    # Sustituye cada caja por una caja free del mismo tamaño con ceros.
+    blanked = 0
+    with open(filepath, "r+b") as target:
+        for offset, size, header_size in ranges:
+            target.seek(offset + 4)
+            target.write(b"free")
+            target.seek(offset + header_size)
+            remaining = size - header_size
+            while remaining:
+                chunk = ZERO_BLOCK[:min(remaining, len(ZERO_BLOCK))]
+                target.write(chunk)
+                remaining -= len(chunk)
+            blanked += size
+    return blanked
+
+
+def strip_mp4(filepath):
+    file_size = os.path.getsize(filepath)
+    with open(filepath, "rb") as source:
+        boxes = read_top_level_boxes(source, file_size)
+        dropped = []
+        kept = []
+        moov = None
+        tables = []
+        for box_type, offset, size, header_size, head in boxes:
+            if mp4_dropped(box_type, head):
+                dropped.append((offset, size, header_size))
+                continue
+            if box_type == b"moov":
+                source.seek(offset)
+                data = read_exact(source, size)
+                moov = bytearray(data[:header_size])
+                rebuild_mp4_children(data, header_size, size, moov, tables, dropped, offset)
+                if header_size == 16:
+                    moov[8:16] = struct.pack(">Q", len(moov))
+                else:
+                    moov[0:4] = struct.pack(">I", len(moov))
+            kept.append((box_type, offset, size))
+
+        if not dropped:
+            return 0
+        if any(box_type == b"moof" for box_type, _, _ in kept):
+            return blank_mp4_boxes(filepath, dropped)
+
+        # Nueva posición de cada caja conservada; moov no contiene datos de
+        # muestras, así que ningún desplazamiento puede apuntar dentro de ella.
+        old_starts, new_starts, sizes = [], [], []
+        position = 0
+        for box_type, offset, size in kept:
+            old_starts.append(offset)
+            sizes.append(size)
+            new_starts.append(None if box_type == b"moov" else position)
+            position += len(moov) if box_type == b"moov" else size
+        if moov is not None:
+            patch_chunk_offsets(moov, tables, old_starts, new_starts, sizes)
+
+        with atomic_output(filepath) as target:
+            for box_type, offset, size in kept:
+                if box_type == b"moov":
+                    target.write(moov)
+                else:
+                    copy_range(source, target, offset, size)
+    return file_size - position
+
+
+def read_vint(data, position, keep_marker=False):
+    first = data[position]
+    if not first:
+        raise ValueError("Número EBML inválido")
+    width = 9 - first.bit_length()
+    value = int.from_bytes(data[position:position + width], "big")
+    if not keep_marker:
+        value &= (1 << (7 * width)) - 1
+        if value == (1 << (7 * width)) - 1:
+            value = None
+    return value, position + width
+
+
+def read_element(source, position):
+    # Devuelve (id, inicio de los datos, tamaño o None si es desconocido)
+    source.seek(position)
+    header = source.read(12)
+    element_id, offset = read_vint(header, 0, keep_marker=True)
+    size, offset = read_vint(header, offset)
+    return element_id, position + offset, size
+
+
+def void_element(length):
+    # Elemento Void que ocupa exactamente length bytes (mínimo 2).
+    for width in range(1, 9):
+        size = length - 1 - width
+        if 0 <= size < (1 << (7 * width)) - 1:
+            return bytes((MKV_VOID,)) + ((1 << (7 * width)) | size).to_bytes(width, "big") + bytes(size)
+    raise ValueError("Elemento demasiado grande")
+
+
+def strip_matroska(filepath):
+    file_size = os.path.getsize(filepath)
+    edits = []
+    with open(filepath, "rb") as source:
+        element_id, data_start, size = read_element(source, 0)
+        if element_id != EBML_HEADER:
+            raise ValueError("No es un archivo Matroska")
+        position = data_start + size
+        element_id, data_start, size = read_element(source, position)
+        if element_id != MKV_SEGMENT:
+            raise ValueError("Segmento Matroska no encontrado")
+        end = file_size if size is None else min(file_size, data_start + size)
+
+        position = data_start
+        while position < end:
+            element_id, data_start, size = read_element(source, position)
+            if size is None:
+                # Un Cluster de tamaño desconocido (grabación en directo) no
+                # se puede saltar sin recorrer todos sus bloques.
+                break
+            element_end = data_start + size
+            if element_id == MKV_TAGS:
+                edits.append((position, void_element(element_end - position)))
+            elif element_id == MKV_INFO:
+                source.seek(data_start)
+                info = read_exact(source, size)
+                offset = 0
+                while offset < size:
+                    child_id, child_data = read_vint(info, offset, keep_marker=True)
+                    child_size, child_data = read_vint(info, child_data)
+                    if child_size is None:
+                        break
+                    child_end = child_data + child_size
+                    if child_id in MKV_INFO_VOID:
+                        edits.append((data_start + offset, void_element(child_end - offset)))
+                    elif child_id in MKV_INFO_ZERO:
+                        edits.append((data_start + child_data, bytes(child_size)))
+                    offset = child_end
+            position = element_end
+
+    if edits:
+        with open(filepath, "r+b") as target:
+            for offset, replacement in edits:
+                target.seek(offset)
+                target.write(replacement)
+    return sum(len(replacement) for _, replacement in edits)
+
+
+def junk_riff_chunks(target, offset, end):
+    # Recorre los chunks RIFF entre offset y end y devuelve los bytes anulados
+    blanked = 0
+    while offset + 8 <= end:
+        target.seek(offset)
+        chunk_id, size = struct.unpack("<4sI", read_exact(target, 8))
+        chunk_end = min(end, offset + 8 + size)
+        list_type = target.read(4) if chunk_id == b"LIST" else None
+        if chunk_id in AVI_DROP_CHUNKS or list_type == b"INFO":
+            target.seek(offset)
+            target.write(b"JUNK")
+            target.seek(offset + 8)
+            remaining = chunk_end - offset - 8
+            while remaining:
+                chunk = ZERO_BLOCK[:min(remaining, len(ZERO_BLOCK))]
+                target.write(chunk)
+                remaining -= len(chunk)
+            blanked += chunk_end - offset
+        elif list_type in AVI_CONTAINERS:
+            blanked += junk_riff_chunks(target, offset + 12, chunk_end)
+        offset += 8 + size + (size & 1)
+    return blanked
+
+
+def strip_avi(filepath):
+    file_size = os.path.getsize(filepath)
+    blanked = 0
+    offset = 0
+    with open(filepath, "r+b") as target:
+        while offset + 12 <= file_size:
+            target.seek(offset)
+            chunk_id, size, form = struct.unpack("<4sI4s", read_exact(target, 12))
+            if chunk_id != b"RIFF" or form not in (b"AVI ", b"AVIX"):
+                break
+            end = min(file_size, offset + 8 + size)
+            blanked += junk_riff_chunks(target, offset + 12, end)
+            offset = end + (size & 1)
+    return blanked
+
+
+def strip_video_metadata(filepath):
+    # Devuelve los bytes eliminados o anulados, o None si el contenedor no se
+    # puede limpiar por estructura.
+    with open(filepath, "rb") as source:
+        signature = source.read(256)
+    if signature[:4] == b"\x1a\x45\xdf\xa3":
+        return strip_matroska(filepath)
+    if signature[:4] == b"RIFF" and signature[8:12] == b"AVI ":
+        return strip_avi(filepath)
+    if signature[4:8] == b"ftyp" and ftyp_kind(signature) is None:
+        brands = ", ".join(brand.decode("latin-1").strip() for brand in ftyp_brands(signature))
+        raise ValueError(f"No es un vídeo MP4/MOV (marcas de ftyp: {brands}); no se modifica")
+    if signature[4:8] in MP4_TOP_LEVEL:
+        return strip_mp4(filepath)
+    return None
@@ -0,0 +1,367 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+# Recorrido de carpetas para el análisis y la limpieza. Se usa os.scandir,
+# cuyas entradas ya traen el tipo de archivo y guardan el stat tras la primera
+# consulta, y se listan varias carpetas a la vez en hilos para no esperar a
+# cada respuesta de un recurso de red.
+#
+# Los archivos que no interesan se descartan antes de llegar al pool: globs de
+# inclusión y exclusión, tamaño, fecha de modificación, profundidad, carpetas
+# ocultas y archivos cuya extensión no es de un formato registrado. Con
+# sniff_unknown, los archivos de extensión desconocida o sin extensión se
+# aceptan si sus primeros bytes son de un formato registrado. Es opcional
+# porque así la limpieza llega a archivos que por su nombre se omitían. Los
+# enlaces a carpetas solo se siguen si se pide, y entonces cada carpeta se
+# visita una sola vez aunque haya ciclos.
+#
+# Los archivos se entregan a medida que aparecen, así que los primeros se
+# procesan mientras el recorrido sigue.
+
+import fnmatch
+import os
+import queue
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from thot_formats import HANDLERS_BY_EXTENSION, HANDLERS_BY_KIND, load_builtin_formats
+from thot_sniff import MPEG_SNIFF_SIZE, sniff_header
+
+WALK_THREADS = 8
+# Carpetas con archivos encontrados que pueden esperar en la cola a que el
+# pool los pida
+QUEUE_SIZE = 1000
+# sniff_header busca %PDF- en el primer KB y un MP3 sin ID3 necesita ver dos
+# tramas
+SNIFF_SIZE = MPEG_SNIFF_SIZE
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+HIDDEN_ATTRIBUTE = getattr(stat, "FILE_ATTRIBUTE_HIDDEN", 0)
+# Extensiones que nunca son de un formato soportado: se descartan sin abrir el
+# archivo, aunque se pida comprobar por contenido las extensiones desconocidas.
+IGNORED_EXTENSIONS = frozenset((
+    ".exe", ".dll", ".so", ".dylib", ".sys", ".msi", ".bin", ".o", ".a", ".lib",
+    ".iso", ".img", ".vmdk", ".vhd", ".vhdx", ".qcow2", ".dmg",
+    ".tmp", ".temp", ".bak", ".swp", ".lock", ".log", ".pid",
+    ".py", ".pyc", ".pyo", ".c", ".h", ".cpp", ".js", ".css", ".java", ".class", ".go", ".rs",
+    ".txt", ".md", ".csv", ".json", ".xml", ".html", ".htm", ".ini", ".cfg", ".conf", ".yml", ".yaml",
+    ".gz", ".bz2", ".xz", ".zst", ".7z", ".rar", ".tar",
+    ".db", ".sqlite", ".mdb", ".pst", ".ost",
+))
+
+
+def parse_size(text):
+    # "500", "20K", "1.5M", "2G"
+    text = text.strip().upper().rstrip("B")
+    unit = text[-1:] if text[-1:] in SIZE_UNITS else ""
+    return int(float(text[:len(text) - len(unit)]) * SIZE_UNITS[unit])
+
+
+def parse_since(text):
+    return datetime.fromisoformat(text.strip()).timestamp()
+
+
+class WalkOptions:
+    def __init__(self, include=(), exclude=(), min_size=None, max_size=None, modified_since=None,
+                 max_depth=None, hidden=True, follow_symlinks=False, supported_only=True, sniff_unknown=False):
+        # Los globs se comparan con el nombre y con la ruta relativa a la
+        # carpeta de partida (con /). exclude también poda carpetas.
+        # modified_since es una marca de tiempo; max_depth 0 = solo la carpeta
+        # indicada, sin subcarpetas.
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.modified_since = modified_since
+        self.max_depth = max_depth
+        self.hidden = hidden
+        self.follow_symlinks = follow_symlinks
+        self.supported_only = supported_only
+        self.sniff_unknown = sniff_unknown
+        if supported_only:
+            # Los manejadores se registran al importar thot_core; sin esto un
+            # Walker usado por su cuenta no reconocería ningún formato
+            load_builtin_formats()
+
+    def needs_stat(self):
+        return self.min_size is not None or self.max_size is not None or self.modified_since is not None
+
+    def is_hidden(self, entry):
+        if entry.name.startswith("."):
+            return True
+        # En Windows el stat de DirEntry viene del propio listado
+        return bool(HIDDEN_ATTRIBUTE and getattr(entry.stat(follow_symlinks=False), "st_file_attributes", 0) & HIDDEN_ATTRIBUTE)
+
+    def accepts(self, entry, relative_path):
+        # Filtros de archivo; los de carpeta (ocultas, exclude, profundidad)
+        # se aplican durante el recorrido
+        if self.include and not matches(self.include, entry.name, relative_path):
+            return False
+        if self.needs_stat():
+            info = entry.stat()
+            if self.min_size is not None and info.st_size < self.min_size:
+                return False
+            if self.max_size is not None and info.st_size > self.max_size:
+                return False
+            if self.modified_since is not None and info.st_mtime < self.modified_since:
+                return False
+        return not self.supported_only or is_supported(entry, self.sniff_unknown)
+
+    def accepts_path(self, path, root):
+        # Los mismos filtros que aplicaría el recorrido de root a una ruta
+        # suelta (por ejemplo, un archivo nuevo en una carpeta vigilada)
+        relative_path = os.path.relpath(path, root).replace(os.sep, "/")
+        parts = relative_path.split("/")
+        if self.max_depth is not None and len(parts) - 1 > self.max_depth:
+            return False
+        for index, part in enumerate(parts):
+            entry = PathEntry(os.path.join(root, *parts[:index + 1]))
+            if not self.hidden and self.is_hidden(entry):
+                return False
+            if self.exclude and matches(self.exclude, part, "/".join(parts[:index + 1])):
+                return False
+        return self.accepts(entry, relative_path)
+
+
+class PathEntry:
+    # Lo que usan los filtros de os.DirEntry, para una ruta suelta
+    __slots__ = ("name", "path", "info")
+
+    def __init__(self, path):
+        self.name = os.path.basename(path)
+        self.path = path
+        self.info = None
+
+    def stat(self, follow_symlinks=True):
+        if self.info is None:
+            self.info = os.stat(self.path, follow_symlinks=follow_symlinks)
+        return self.info
+
+
+def matches(patterns, name, relative_path):
+    return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern) for pattern in patterns)
+
+
+def is_supported(entry, sniff_unknown=False):
+    extension = os.path.splitext(entry.name)[1].lower()
+    if extension in HANDLERS_BY_EXTENSION:
+        return True
+    if not sniff_unknown or extension in IGNORED_EXTENSIONS:
+        return False
+    # Extensión desconocida: se miran los primeros bytes por si es un formato
+    # soportado con otro nombre (sin extensión, .dat...)
+    try:
+        with open(entry.path, "rb") as file:
+            header = file.read(SNIFF_SIZE)
+    except OSError:
+        return False
+    return sniff_header(header) in HANDLERS_BY_KIND
+
+
+class Walker:
+    # Iterable con las rutas de los archivos que pasan los filtros. Al terminar
+    # quedan en found, skipped y errors los archivos entregados, los
+    # descartados y las carpetas que no se pudieron leer.
+    def __init__(self, paths, options=None, threads=WALK_THREADS):
+        self.paths = list(paths)
+        self.options = options or WalkOptions()
+        self.threads = max(threads, 1)
+        self.found = 0
+        self.skipped = 0
+        self.errors = 0
+        self.finished = False
+        self.lock = threading.Lock()
+
+    def __iter__(self):
+        results = queue.Queue(QUEUE_SIZE)
+        stop = threading.Event()
+        done = threading.Event()
+        lock = self.lock
+        visited = set()
+        # El propio recorrido cuenta como pendiente hasta haber encolado todas
+        # las carpetas de partida
+        pending = [1]
+
+        def put(files):
+            # Si el consumidor deja de leer no hay que quedarse bloqueado
+            while not stop.is_set():
+                try:
+                    results.put(files, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        def enter(directory):
+            # Con enlaces simbólicos una carpeta puede aparecer varias veces
+            if not self.options.follow_symlinks:
+                return True
+            try:
+                info = os.stat(directory)
+            except OSError:
+                with lock:
+                    self.errors += 1
+                return False
+            key = (info.st_dev, info.st_ino)
+            with lock:
+                if key in visited:
+                    return False
+                visited.add(key)
+            return True
+
+        def schedule(directory, root, depth, local=None):
+            # Una subcarpeta pasa a otro hilo solo si hay alguno libre; si no,
+            # la recorre el mismo hilo, sin pasar por el pool.
+            if stop.is_set() or not enter(directory):
+                return
+            with lock:
+                offload = local is None or pending[0] <= self.threads
+                if offload:
+                    pending[0] += 1
+            if offload:
+                executor.submit(scan, directory, root, depth)
+            else:
+                local.append((directory, depth))
+
+        def release():
+            with lock:
+                pending[0] -= 1
+                last = pending[0] == 0
+            if last:
+                done.set()
+
+        def scan(directory, root, depth):
+            local = [(directory, depth)]
+            try:
+                while local and not stop.is_set():
+                    directory, depth = local.pop()
+                    try:
+                        subdirectories = self.scan_directory(directory, root, depth, put, stop)
+                    except OSError:
+                        with lock:
+                            self.errors += 1
+                        continue
+                    for subdirectory in subdirectories:
+                        schedule(subdirectory, root, depth + 1, local)
+            finally:
+                release()
+
+        directories = []
+        for path in self.paths:
+            if os.path.isdir(path):
+                directories.append(path)
+            else:
+                self.found += 1
+                yield path
+        if not directories:
+            self.finished = True
+            return
+
+        executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="thot_walk")
+        try:
+            for directory in directories:
+                schedule(directory, directory, 0)
+            release()
+            while True:
+                try:
+                    file_paths = results.get(timeout=0.1)
+                except queue.Empty:
+                    # Todo lo encontrado se encola antes de marcar el final
+                    if done.is_set() and results.empty():
+                        self.finished = True
+                        return
+                    continue
+                yield from file_paths
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def scan_directory(self, directory, root, depth, put, stop):
+        # Los archivos aceptados de la carpeta se entregan juntos, con una sola
+        # operación sobre la cola y los contadores. Devuelve las subcarpetas.
+        options = self.options
+        use_globs = options.include or options.exclude
+        prefix_length = len(os.path.join(root, ""))
+        files = []
+        skipped = 0
+        subdirectories = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if stop.is_set():
+                    return []
+                try:
+                    if not options.hidden and options.is_hidden(entry):
+                        continue
+                    relative_path = entry.path[prefix_length:].replace(os.sep, "/") if use_globs else None
+                    if options.exclude and matches(options.exclude, entry.name, relative_path):
+                        skipped += entry.is_file()
+                        continue
+                    if entry.is_dir(follow_symlinks=options.follow_symlinks):
+                        if options.max_depth is None or depth < options.max_depth:
+                            subdirectories.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                    if options.accepts(entry, relative_path):
+                        files.append(entry.path)
+                    else:
+                        skipped += 1
+                except OSError:
+                    skipped += 1
+        with self.lock:
+            self.found += len(files)
+            self.skipped += skipped
+        if files:
+            put(files)
+        return subdirectories
+
+    def summary(self):
+        text = f"Recorrido: {self.found} archivos, {self.skipped} descartados por los filtros"
+        if self.errors:
+            text += f", {self.errors} carpetas sin acceso"
+        return text + "."
+
+
+def add_walk_arguments(parser):
+    parser.add_argument("--include", action="append", default=[], metavar="GLOB", help="Procesar solo los archivos que coincidan (se puede repetir)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB", help="Omitir archivos y carpetas que coincidan (se puede repetir)")
+    parser.add_argument("--min-size", type=parse_size, default=None, metavar="TAMAÑO", help="Tamaño mínimo (por ejemplo 10K)")
+    parser.add_argument("--max-size", type=parse_size, default=None, metavar="TAMAÑO", help="Tamaño máximo (por ejemplo 2G)")
+    parser.add_argument("--modified-since", type=parse_since, default=None, metavar="FECHA", help="Solo archivos modificados desde esta fecha (AAAA-MM-DD)")
+    parser.add_argument("--max-depth", type=int, default=None, help="Profundidad máxima de subcarpetas (0 = solo la carpeta indicada)")
+    parser.add_argument("--skip-hidden", action="store_true", help="Omitir archivos y carpetas ocultos")
+    parser.add_argument("--follow-symlinks", action="store_true", help="Seguir los enlaces simbólicos a carpetas")
+    parser.add_argument("--all-files", action="store_true", help="Enviar también los archivos que no parecen de un formato soportado")
+    parser.add_argument("--sniff-unknown", action="store_true", help="Aceptar también los archivos con extensión desconocida o sin extensión cuyo contenido sea de un formato soportado")
+    parser.add_argument("--walk-threads", type=int, default=WALK_THREADS, help="Carpetas que se listan a la vez")
+
+
+def walk_options(args):
+    return WalkOptions(
+        include=args.include,
+        exclude=args.exclude,
+        min_size=args.min_size,
+        max_size=args.max_size,
+        modified_since=args.modified_since,
+        max_depth=args.max_depth,
+        hidden=not args.skip_hidden,
+        follow_symlinks=args.follow_symlinks,
+        supported_only=not args.all_files,
+        sniff_unknown=args.sniff_unknown
+    )
@@ -0,0 +1,390 @@
+# GNU GENERAL PUBLIC LICENSE
+# Version 3, 29 June 2007
+
+# Copyright (C) 2024 Moisés Ceñera Fernández
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+
+# Modo vigilancia: limpia los archivos de una o varias carpetas a medida que
+# llegan, en lugar de recorrerlas enteras cada cierto tiempo. En Linux se usa
+# inotify (por ctypes, sin dependencias); en otros sistemas, o si inotify no
+# está disponible, se compara el estado de las carpetas cada pocos segundos.
+#
+# Un archivo se limpia cuando lleva `debounce` segundos sin cambios desde que
+# se cerró o se movió a la carpeta, para no tocar archivos a medio escribir.
+# Tras limpiarlo se guarda su identidad (tamaño, mtime, inodo): los eventos
+# que provoca la propia limpieza encuentran la misma identidad y se ignoran.
+# La identidad se olvida cuando el archivo se borra o se mueve, y como mucho
+# se recuerdan CLEANED_KEPT archivos (los limpiados hace más tiempo se olvidan
+# antes; si vuelven a cambiar solo se limpian otra vez).
+# Sin eventos pendientes el bucle queda bloqueado en select, sin consumir CPU.
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import selectors
+import socket
+import stat
+import struct
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from thot_io import TEMP_PREFIX
+from thot_walk import Walker, WalkOptions
+
+DEBOUNCE = 0.2
+POLL_INTERVAL = 2.0
+LATENCY_SAMPLES = 1000
+CLEANED_KEPT = 100000
+READ_SIZE = 64 * 1024
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def identity(info):
+    return info.st_size, info.st_mtime_ns, info.st_ino
+
+
+class InotifySource:
+    # read() devuelve las rutas que han cambiado o desaparecido, o None si el
+    # núcleo perdió eventos (cola desbordada) y hay que volver a recorrer las
+    # carpetas.
+    def __init__(self, paths):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self.watches = {}
+        try:
+            for path in paths:
+                self.add_tree(path)
+        except OSError:
+            self.close()
+            raise
+
+    def fileno(self):
+        return self.fd
+
+    def add_watch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            # Sin vigilancias libres (fs.inotify.max_user_watches) se pasa a
+            # comparar las carpetas periódicamente
+            if error == errno.ENOSPC:
+                raise OSError(error, "inotify: límite de vigilancias alcanzado")
+            return
+        self.watches[wd] = directory
+
+    def add_tree(self, directory):
+        # Devuelve los archivos que ya había: una carpeta movida o creada con
+        # contenido no genera eventos para lo que contiene
+        files = []
+        for root, dirs, names in os.walk(directory):
+            self.add_watch(root)
+            files.extend(os.path.join(root, name) for name in names)
+        return files
+
+    def read(self):
+        paths = []
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                return paths
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+                offset += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+                    continue
+                directory = self.watches.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        paths.extend(self.add_tree(path))
+                elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM):
+                    paths.append(path)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingSource:
+    # Compara tamaño, mtime e inodo de todos los archivos en cada lectura
+    fd = None
+
+    def __init__(self, paths, interval=POLL_INTERVAL):
+        self.paths = paths
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def fileno(self):
+        return None
+
+    def scan(self):
+        snapshot = {}
+        for path in Walker(self.paths, WalkOptions(supported_only=False)):
+            try:
+                snapshot[path] = identity(os.stat(path))
+            except OSError:
+                pass
+        return snapshot
+
+    def read(self):
+        snapshot = self.scan()
+        changed = [path for path, key in snapshot.items() if self.snapshot.get(path) != key]
+        changed.extend(path for path in self.snapshot if path not in snapshot)
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def open_source(paths, polling=False, interval=POLL_INTERVAL, log=None):
+    if not polling:
+        try:
+            return InotifySource(paths)
+        except (OSError, AttributeError) as e:
+            if log:
+                log(f"inotify no disponible ({e}); se comparan las carpetas cada {interval:g} s")
+    return PollingSource(paths, interval)
+
+
+class WatchStats:
+    def __init__(self):
+        self.cleaned = 0
+        self.errors = 0
+        self.skipped = 0
+        self.own_writes = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def set_queue_depth(self, depth):
+        self.queue_depth = depth
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def add_latency(self, seconds):
+        self.latencies.append(seconds)
+
+    def summary(self):
+        text = (f"Vigilancia: {self.cleaned} limpiados, {self.errors} errores, {self.skipped} descartados, "
+                f"{self.own_writes} cambios propios ignorados. Cola: {self.queue_depth} (máx. {self.max_queue_depth})")
+        if self.latencies:
+            ordered = sorted(self.latencies)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            text += f". Latencia media {sum(ordered) / len(ordered) * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms"
+        return text + "."
+
+
+class FolderWatcher:
+    # job es la función de limpieza de un archivo (thot_engine.clean_job);
+    # on_result recibe cada resultado. Como mucho hay `workers * 2` archivos
+    # en el pool; el resto espera en pending.
+    def __init__(self, paths, job, workers=None, options=None, debounce=DEBOUNCE, polling=False,
+                 poll_interval=POLL_INTERVAL, log=None):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.job = job
+        self.workers = workers or os.cpu_count() or 1
+        self.options = options or WalkOptions()
+        self.debounce = debounce
+        self.polling = polling
+        self.poll_interval = poll_interval
+        self.log = log
+        self.stats = WatchStats()
+        # ruta -> momento del último evento
+        self.pending = {}
+        # futuro -> (ruta, momento del evento)
+        self.running = {}
+        # rutas que volvieron a cambiar mientras se limpiaban
+        self.dirty = {}
+        # ruta -> identidad tras la última limpieza
+        self.cleaned = {}
+        self.stopped = False
+        self.wake_reader, self.wake_writer = socket.socketpair()
+        self.wake_reader.setblocking(False)
+
+    def stop(self):
+        # Se puede llamar desde otro hilo o desde un manejador de señal
+        self.stopped = True
+        self.wake()
+
+    def wake(self, future=None):
+        try:
+            self.wake_writer.send(b"\0")
+        except OSError:
+            pass
+
+    def root_of(self, path):
+        for root in self.paths:
+            if path == root or path.startswith(os.path.join(root, "")):
+                return root
+        return None
+
+    def touch(self, path, now):
+        if os.path.basename(path).startswith(TEMP_PREFIX):
+            return
+        if any(running_path == path for running_path, _ in self.running.values()):
+            self.dirty[path] = now
+        else:
+            self.pending[path] = now
+
+    def rescan(self, now):
+        for path in Walker(self.paths, self.options):
+            self.touch(path, now)
+
+    def next_timeout(self, now):
+        if not self.pending:
+            return None
+        return max(min(self.pending.values()) + self.debounce - now, 0)
+
+    def dispatch(self, executor, now):
+        capacity = self.workers * 2 - len(self.running)
+        if capacity <= 0:
+            return
+        for path, event_time in sorted(self.pending.items(), key=lambda item: item[1]):
+            if capacity <= 0 or event_time + self.debounce > now:
+                break
+            del self.pending[path]
+            try:
+                info = os.stat(path)
+            except OSError:
+                # Borrado, renombrado o temporal ya sustituido
+                self.cleaned.pop(path, None)
+                continue
+            if not stat.S_ISREG(info.st_mode):
+                continue
+            if self.cleaned.get(path) == identity(info):
+                self.stats.own_writes += 1
+                continue
+            # Se sigue escribiendo (o se cerró y se volvió a abrir): se espera
+            if time.time() - info.st_mtime < self.debounce:
+                self.pending[path] = now
+                continue
+            root = self.root_of(path)
+            if root is None or not self.options.accepts_path(path, root):
+                self.stats.skipped += 1
+                continue
+            future = executor.submit(self.job, path)
+            self.running[future] = (path, event_time)
+            future.add_done_callback(self.wake)
+            capacity -= 1
+
+    def collect(self, on_result):
+        # Se importa aquí y no arriba porque thot_engine importa este módulo
+        from thot_engine import failed
+
+        for future in [future for future in self.running if future.done()]:
+            path, event_time = self.running.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"filename": path, "message": f"ERROR: No se pudo procesar el archivo {path}. Error: {e}", "warnings": []}
+            if failed(result):
+                self.stats.errors += 1
+            else:
+                self.stats.cleaned += 1
+            # Se vuelve a insertar para que quede como la más reciente
+            self.cleaned.pop(path, None)
+            try:
+                self.cleaned[path] = identity(os.stat(path))
+            except OSError:
+                pass
+            if len(self.cleaned) > CLEANED_KEPT:
+                del self.cleaned[next(iter(self.cleaned))]
+            self.stats.add_latency(time.monotonic() - event_time)
+            if path in self.dirty:
+                self.pending[path] = self.dirty.pop(path)
+            if on_result:
+                on_result(result)
+
+    def run(self, on_result=None, initial_scan=False, stats_interval=None, on_stats=None):
+        source = open_source(self.paths, self.polling, self.poll_interval, self.log)
+        selector = selectors.DefaultSelector()
+        selector.register(self.wake_reader, selectors.EVENT_READ)
+        if source.fileno() is not None:
+            selector.register(source.fileno(), selectors.EVENT_READ)
+        next_poll = time.monotonic() + self.poll_interval
+        next_stats = time.monotonic() + stats_interval if stats_interval else None
+        if initial_scan:
+            self.rescan(time.monotonic() - self.debounce)
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                while not self.stopped:
+                    now = time.monotonic()
+                    deadlines = [self.next_timeout(now)]
+                    if source.fileno() is None:
+                        deadlines.append(max(next_poll - now, 0))
+                    if next_stats is not None:
+                        deadlines.append(max(next_stats - now, 0))
+                    deadlines = [deadline for deadline in deadlines if deadline is not None]
+                    # Con trabajos en curso se despierta el callback del futuro
+                    events = selector.select(min(deadlines) if deadlines else None)
+
+                    now = time.monotonic()
+                    for key, _ in events:
+                        if key.fileobj is self.wake_reader:
+                            try:
+                                while self.wake_reader.recv(4096):
+                                    pass
+                            except BlockingIOError:
+                                pass
+                            continue
+                        paths = source.read()
+                        if paths is None:
+                            self.rescan(now)
+                            continue
+                        for path in paths:
+                            self.touch(path, now)
+                    if source.fileno() is None and now >= next_poll:
+                        for path in source.read():
+                            self.touch(path, now)
+                        next_poll = now + self.poll_interval
+
+                    self.collect(on_result)
+                    self.dispatch(executor, now)
+                    self.stats.set_queue_depth(len(self.pending) + len(self.running) + len(self.dirty))
+                    if next_stats is not None and now >= next_stats:
+                        if on_stats:
+                            on_stats(self.stats)
+                        next_stats = now + stats_interval
+                for future in self.running:
+                    future.cancel()
+        finally:
+            selector.close()
+            source.close()